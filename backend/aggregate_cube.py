@@ -0,0 +1,150 @@
+"""
+Materialized aggregate cube
+Pre-aggregates each dataset over its dimensions (state x status x workflow
+x month) into one row per occupied cell holding a count and the sum and
+count of a day measure. Dashboard totals and drill-down slices are
+answered by masking and summing cells instead of scanning rows.
+Percentiles come from the per-state sketches in sketches.py.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CUBE_DEFINITIONS = {
+    'volunteers': {
+        'dimensions': {'state': 'State', 'status': 'Current Status'},
+        'measure': 'days_since_login',
+    },
+    'applicants': {
+        'dimensions': {
+            'state': 'State', 'status': 'Current Status',
+            'workflow': 'Workflow Type', 'month': 'Application Dt'
+        },
+        'measure': 'days_to_start',
+    },
+}
+
+# Date columns become year-month labels when used as a dimension
+MONTH_DIMENSIONS = {'month'}
+
+
+class AggregateCube:
+    """One dataset pre-aggregated over its dimensions"""
+
+    def __init__(self, df: pd.DataFrame, dimensions: Dict[str, str], measure: Optional[str]):
+        self.dimensions = [dim for dim, col in dimensions.items() if col in df.columns]
+        self.measure = measure if measure in df.columns else None
+        self.labels: Dict[str, List[Any]] = {}
+        self.label_codes: Dict[str, Dict[str, int]] = {}
+
+        codes = []
+        for dim in self.dimensions:
+            values = df[dimensions[dim]]
+            if dim in MONTH_DIMENSIONS:
+                values = pd.to_datetime(values, errors='coerce').dt.to_period('M').astype(str)
+                values = values.where(values != 'NaT')
+            dim_codes, uniques = pd.factorize(values, sort=True)
+            # Code 0 is reserved for missing values
+            self.labels[dim] = [None] + [str(value) for value in uniques]
+            self.label_codes[dim] = {label: code for code, label in enumerate(self.labels[dim]) if code}
+            codes.append(dim_codes.astype(np.int64) + 1)
+
+        shape = tuple(len(self.labels[dim]) for dim in self.dimensions)
+        if codes:
+            keys = np.ravel_multi_index(codes, shape)
+        else:
+            keys = np.zeros(len(df), dtype=np.int64)
+        cell_keys, inverse = np.unique(keys, return_inverse=True)
+        cell_count = len(cell_keys)
+
+        self.cell_codes = dict(zip(self.dimensions, np.unravel_index(cell_keys, shape))) if codes else {}
+        self.counts = np.bincount(inverse, minlength=cell_count).astype(np.int64)
+
+        self.measure_sums = np.zeros(cell_count)
+        self.measure_counts = np.zeros(cell_count, dtype=np.int64)
+        if self.measure:
+            values = pd.to_numeric(df[self.measure], errors='coerce').astype('float64').to_numpy()
+            present = ~np.isnan(values)
+            cells, values = inverse[present], values[present]
+            self.measure_sums = np.bincount(cells, weights=values, minlength=cell_count)
+            self.measure_counts = np.bincount(cells, minlength=cell_count).astype(np.int64)
+
+        self.rows = len(df)
+
+    def _mask(self, filters: Dict[str, Optional[str]]) -> np.ndarray:
+        mask = np.ones(len(self.counts), dtype=bool)
+        for dim, value in filters.items():
+            if value is None:
+                continue
+            if dim not in self.labels:
+                raise KeyError(f"Unknown dimension '{dim}'")
+            code = self.label_codes[dim].get(str(value))
+            if code is None:
+                return np.zeros(len(self.counts), dtype=bool)
+            mask &= self.cell_codes[dim] == code
+        return mask
+
+    def _summarize(self, counts, sums, measure_counts) -> Dict[str, Any]:
+        summary = {"count": int(counts)}
+        if self.measure:
+            summary[f"{self.measure}_mean"] = round(float(sums / measure_counts), 1) if measure_counts else None
+        return summary
+
+    def total(self, filters: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, Any]:
+        """Measures over all cells matching the filters"""
+        mask = self._mask(filters or {})
+        return self._summarize(
+            self.counts[mask].sum(), self.measure_sums[mask].sum(), self.measure_counts[mask].sum()
+        )
+
+    def slice(self, filters: Dict[str, Optional[str]], group_by: List[str]) -> List[Dict[str, Any]]:
+        """Measures per combination of the group-by dimensions, within the filters"""
+        unknown = [dim for dim in group_by if dim not in self.labels]
+        if unknown:
+            raise KeyError(f"Unknown dimension '{unknown[0]}'")
+        if not group_by:
+            return [self.total(filters)]
+
+        mask = self._mask(filters)
+        group_codes = [self.cell_codes[dim][mask] for dim in group_by]
+        shape = tuple(len(self.labels[dim]) for dim in group_by)
+        keys = np.ravel_multi_index(group_codes, shape)
+        group_keys, inverse = np.unique(keys, return_inverse=True)
+        n = len(group_keys)
+
+        counts = np.bincount(inverse, weights=self.counts[mask], minlength=n)
+        sums = np.bincount(inverse, weights=self.measure_sums[mask], minlength=n)
+        measure_counts = np.bincount(inverse, weights=self.measure_counts[mask], minlength=n)
+
+        rows = []
+        for i, key_codes in enumerate(zip(*np.unravel_index(group_keys, shape))):
+            row = {dim: self.labels[dim][code] for dim, code in zip(group_by, key_codes)}
+            row.update(self._summarize(counts[i], sums[i], measure_counts[i]))
+            rows.append(row)
+        return rows
+
+    def distinct(self, dim: str, filters: Optional[Dict[str, Optional[str]]] = None) -> int:
+        """Number of non-missing values of a dimension with at least one row"""
+        mask = self._mask(filters or {}) & (self.counts > 0)
+        codes = self.cell_codes[dim][mask]
+        return int(len(np.unique(codes[codes > 0])))
+
+
+def build_cubes(data: Dict[str, pd.DataFrame]) -> Dict[str, AggregateCube]:
+    """Build an AggregateCube for every cached dataset with a cube definition"""
+    cubes = {}
+    for name, definition in CUBE_DEFINITIONS.items():
+        df = data.get(name)
+        if df is None:
+            continue
+        try:
+            cubes[name] = AggregateCube(df, definition['dimensions'], definition['measure'])
+            logger.info(f"Built {name} aggregate cube with {len(cubes[name].counts)} cells")
+        except Exception as e:
+            logger.error(f"Error building {name} aggregate cube: {e}")
+    return cubes
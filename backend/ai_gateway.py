@@ -0,0 +1,339 @@
+"""
+AI gateway for Workers AI calls
+Routes every LLM request through one pooled async HTTP client with a
+concurrency cap and a token-bucket rate limit. Identical in-flight prompts
+share one upstream call, and results are cached by normalized prompt and
+data version. When the upstream is slow or failing, a stale cached answer
+is served while a refresh runs in the background. Token streaming is
+supported, and a local stub backend stands in for Workers AI in tests.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+WORKERS_AI_URL = "https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run/{model}"
+DEFAULT_MODEL = "@cf/meta/llama-3.1-8b-instruct"
+MAX_CACHED_RESPONSES = 512
+
+Messages = List[Dict[str, str]]
+
+
+class GatewayUnavailable(Exception):
+    """No fresh or stale answer could be produced in time"""
+
+
+class RateLimited(GatewayUnavailable):
+    """The request budget is exhausted"""
+
+
+def normalize_prompt(text: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt for cache keys"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class WorkersAIBackend:
+    """Cloudflare Workers AI over the REST API"""
+
+    name = "workers_ai"
+
+    def __init__(self, client: httpx.AsyncClient, account_id: str, api_token: str, model: str = DEFAULT_MODEL):
+        self.client = client
+        self.model = model
+        self.url = WORKERS_AI_URL.format(account_id=account_id, model=model)
+        self.headers = {"Authorization": f"Bearer {api_token}"}
+
+    async def complete(self, messages: Messages) -> str:
+        response = await self.client.post(self.url, headers=self.headers, json={"messages": messages})
+        response.raise_for_status()
+        payload = response.json()
+        if not payload.get("success", True):
+            raise RuntimeError(f"Workers AI error: {payload.get('errors')}")
+        return payload["result"]["response"]
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        body = {"messages": messages, "stream": True}
+        async with self.client.stream("POST", self.url, headers=self.headers, json=body) as response:
+            response.raise_for_status()
+            # Server-sent events: 'data: {"response": "..."}' lines ending with 'data: [DONE]'
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                token = json.loads(data).get("response")
+                if token:
+                    yield token
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class StubBackend:
+    """Deterministic local backend that answers with JSON built from the prompt's context"""
+
+    name = "stub"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def _answer(self, messages: Messages) -> str:
+        context = {}
+        for message in messages:
+            if message["role"] == "system" and "Context:" in message["content"]:
+                try:
+                    context = json.loads(message["content"].split("Context:", 1)[1])
+                except ValueError:
+                    context = {}
+        question = messages[-1]["content"]
+        return json.dumps({
+            "insights": [
+                f"Based on your query '{question}', here are key insights:",
+                f"Current volunteer count: {context.get('total_volunteers', 0)}",
+                f"Geographic coverage: {context.get('geographic_coverage', 0)} states"
+            ],
+            "recommendations": [
+                "Consider expanding recruitment in underserved areas",
+                "Implement automated follow-up for pending applications"
+            ],
+            "confidence": 85
+        })
+
+    async def complete(self, messages: Messages) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        return self._answer(messages)
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        self.calls += 1
+        for token in re.findall(r"\S+\s*", self._answer(messages)):
+            await asyncio.sleep(self.latency_seconds / 20)
+            yield token
+
+    async def aclose(self):
+        pass
+
+
+class TokenBucket:
+    """Requests-per-minute limit with bursts up to the per-minute budget"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(per_minute, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Held across refill, wait and take so concurrent callers are paced one at a time
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, max_wait_seconds: float):
+        deadline = time.monotonic() + max_wait_seconds
+        try:
+            await asyncio.wait_for(self._lock.acquire(), max_wait_seconds)
+        except asyncio.TimeoutError:
+            raise RateLimited("AI request budget exhausted, retry later")
+        try:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    raise RateLimited("AI request budget exhausted, retry later")
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+        finally:
+            self._lock.release()
+
+
+class AIGateway:
+    """Pooled, coalesced, cached and rate-limited access to an LLM backend"""
+
+    def __init__(
+        self,
+        backend,
+        timeout_seconds: float = 20.0,
+        cache_ttl_seconds: float = 900.0,
+        stale_ttl_seconds: float = 86400.0,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 60.0,
+        max_entries: int = MAX_CACHED_RESPONSES
+    ):
+        self.backend = backend
+        self.timeout_seconds = timeout_seconds
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.max_concurrency = max_concurrency
+        self.max_entries = max_entries
+        self.bucket = TokenBucket(requests_per_minute)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "hits": 0, "stale_served": 0, "coalesced": 0, "upstream_calls": 0,
+            "streams": 0, "timeouts": 0, "errors": 0, "rate_limited": 0
+        }
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def cache_key(self, kind: str, prompt: str, version: Any) -> str:
+        material = json.dumps([kind, normalize_prompt(prompt), version, getattr(self.backend, "model", self.backend.name)])
+        return hashlib.sha1(material.encode()).hexdigest()
+
+    def _cached(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        item = self._cache.get(key)
+        if item is None:
+            return None, None
+        created, text = item
+        age = time.monotonic() - created
+        if age > self.stale_ttl_seconds:
+            del self._cache[key]
+            return None, None
+        self._cache.move_to_end(key)
+        return text, age
+
+    def _store(self, key: str, text: str):
+        self._cache[key] = (time.monotonic(), text)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _call(self, key: str, messages: Messages) -> str:
+        """One upstream call under the rate and concurrency limits; the result is cached"""
+        try:
+            await self.bucket.acquire(self.timeout_seconds)
+        except RateLimited:
+            self.stats["rate_limited"] += 1
+            raise
+        async with self.semaphore:
+            self.stats["upstream_calls"] += 1
+            try:
+                text = await self.backend.complete(messages)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"AI backend call failed: {e}")
+                raise
+        self._store(key, text)
+        return text
+
+    def _refresh(self, key: str, messages: Messages) -> asyncio.Task:
+        """The in-flight call for a key, starting one if none is running"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+        task = asyncio.create_task(self._call(key, messages))
+        self._inflight[key] = task
+
+        def done(finished: asyncio.Task):
+            self._inflight.pop(key, None)
+            # Background refreshes nobody awaits must not log unretrieved exceptions
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+        return task
+
+    async def complete(
+        self, kind: str, prompt: str, messages: Messages, version: Any = None,
+        timeout_seconds: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Answer text and where it came from: cache, stale, coalesced or upstream"""
+        key = self.cache_key(kind, prompt, version)
+        text, age = self._cached(key)
+        if text is not None and age <= self.cache_ttl_seconds:
+            self.stats["hits"] += 1
+            return {"text": text, "source": "cache", "age_seconds": round(age, 1)}
+        if text is not None:
+            # Stale-while-revalidate: answer now, refresh in the background
+            self._refresh(key, messages)
+            self.stats["stale_served"] += 1
+            return {"text": text, "source": "stale", "age_seconds": round(age, 1)}
+
+        coalesced = key in self._inflight
+        task = self._refresh(key, messages)
+        try:
+            # Shielded so a timed-out caller leaves the call running to fill the cache
+            text = await asyncio.wait_for(asyncio.shield(task), timeout_seconds or self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise GatewayUnavailable("AI backend timed out")
+        except RateLimited:
+            raise
+        except Exception as e:
+            raise GatewayUnavailable(f"AI backend failed: {e}")
+        return {"text": text, "source": "coalesced" if coalesced else "upstream", "age_seconds": 0.0}
+
+    async def stream(self, kind: str, prompt: str, messages: Messages, version: Any = None) -> AsyncIterator[str]:
+        """Tokens of the answer; a fresh cached answer is replayed as a single chunk"""
+        key = self.cache_key(kind, prompt, version)
+        text, age = self._cached(key)
+        if text is not None and age <= self.cache_ttl_seconds:
+            self.stats["hits"] += 1
+            yield text
+            return
+
+        try:
+            await self.bucket.acquire(self.timeout_seconds)
+        except RateLimited:
+            self.stats["rate_limited"] += 1
+            raise
+        async with self.semaphore:
+            self.stats["streams"] += 1
+            self.stats["upstream_calls"] += 1
+            tokens = []
+            try:
+                async for token in self.backend.stream(messages):
+                    tokens.append(token)
+                    yield token
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"AI backend stream failed: {e}")
+                raise
+        self._store(key, "".join(tokens))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "model": getattr(self.backend, "model", None),
+            "cached_responses": len(self._cache),
+            "inflight": len(self._inflight),
+            **self.stats,
+        }
+
+    async def aclose(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await self.backend.aclose()
+
+
+def parse_insights(text: str) -> Dict[str, Any]:
+    """Insights JSON from a model answer, tolerating prose around the JSON object"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+    return {"insights": [text.strip()], "recommendations": [], "confidence": None}
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark harness
+Generates synthetic data at each requested scale, then runs the FastAPI
+app in-process in a fresh child process per scale and measures load_data
+time (cold CSV parse and warm snapshot load), peak RSS, and p50/p99
+latency under concurrency for every /api/* endpoint and the WebSocket
+feed. Results are written as JSON; pass an earlier result file as
+--baseline to flag regressions.
+
+Usage:
+  python benchmark.py --sizes 10k,100k --output bench.json
+  python benchmark.py --sizes 10k,100k --baseline bench.json --output bench-new.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from synthetic_data import generate, parse_rows
+
+logger = logging.getLogger("benchmark")
+
+BACKEND_DIR = Path(__file__).resolve().parent
+RESULT_FORMAT = 1
+
+# Server settings for repeatable in-process runs: no background reloads,
+# warm-ups, Redis or periodic WebSocket ticks, and the local AI stub
+BENCH_ENV = {
+    "DATA_WATCH_INTERVAL": "0",
+    "DATA_PLANE": "private",
+    "WARMUP_CAPABILITIES": "",
+    "AI_BACKEND": "stub",
+    "REDIS_URL": "redis://127.0.0.1:1/0",
+    "WS_UPDATE_INTERVAL": "3600",
+}
+
+# (name, method, path, query params, JSON body, share of --requests)
+ENDPOINTS = [
+    ("health", "GET", "/api/health", None, None, 1.0),
+    ("data_memory", "GET", "/api/data/memory", None, None, 0.25),
+    ("data_version", "GET", "/api/data/version", None, None, 1.0),
+    ("dashboard_metrics", "GET", "/api/dashboard/metrics", None, None, 1.0),
+    ("donor_summary", "GET", "/api/donors/summary", None, None, 1.0),
+    ("biomed_summary", "GET", "/api/biomed/summary", None, None, 1.0),
+    ("sketch_summary", "GET", "/api/metrics/sketches", None, None, 1.0),
+    ("sketch_percentiles", "GET", "/api/metrics/percentiles/applicants/days_to_start",
+     {"states": "CA,NV,OR,WA", "q": "0.5,0.9"}, None, 1.0),
+    ("sketch_distinct", "GET", "/api/metrics/distinct/volunteers/Zip", {"states": "CA,TX"}, None, 1.0),
+    ("sketch_export", "GET", "/api/metrics/sketches/applicants/export", None, None, 0.25),
+    ("cube_slice","GET", "/api/cube/applicants", {"group_by": "state,status"}, None, 1.0),
+    ("volunteers_page", "GET", "/api/volunteers", {"limit": 100, "state": "CA"}, None, 1.0),
+    ("volunteers_deep_page", "GET", "/api/volunteers", {"limit": 100, "offset": 5000}, None, 1.0),
+    ("applicants_page", "GET", "/api/applicants",
+     {"limit": 100, "status": "General Volunteer", "fields": "ObjectId,State,Application Dt"}, None, 1.0),
+    ("geographic_analysis", "GET", "/api/analytics/geographic", None, None, 0.5),
+    ("geographic_analysis_k8", "GET", "/api/analytics/geographic", {"k": 8}, None, 0.25),
+    ("geo_radius", "GET", "/api/geo/volunteers/radius", {"lat": 36.8, "lon": -119.4, "miles": 50}, None, 1.0),
+    ("geo_bbox", "GET", "/api/geo/applicants/bbox",
+     {"min_lon": -125, "min_lat": 32, "max_lon": -114, "max_lat": 42}, None, 1.0),
+    ("geo_nearest", "GET", "/api/geo/volunteers/nearest", {"lat": 30.27, "lon": -97.74, "k": 25}, None, 1.0),
+    ("map_tiles_info", "GET", "/api/map/tiles", None, None, 1.0),
+    ("map_tile", "GET", "/api/map/tiles/volunteers/4/2/6", None, None, 1.0),
+    ("temporal_month", "GET", "/api/analytics/temporal", {"granularity": "month"}, None, 1.0),
+    ("temporal_week", "GET", "/api/analytics/temporal", {"granularity": "week"}, None, 1.0),
+    ("aggregate_query", "POST", "/api/query", None, {
+        "dataset": "applicants",
+        "group_by": ["State", {"column": "Application Dt", "bucket": "month"}],
+        "filters": [{"column": "Current Status", "op": "ne", "value": "Withdrawn"}],
+        "aggregates": ["count", {"fn": "avg", "column": "days_to_start"}, {"fn": "quantile", "column": "days_to_start", "q": 0.9}],
+    }, 1.0),
+    ("query_schema", "GET", "/api/query/schema", None, None, 1.0),
+    ("export_filtered_csv","GET", "/api/export/volunteers", {"state": "NV", "fields": "ObjectId,State,Zip"}, None, 0.1),
+    ("ai_query", "POST", "/api/ai/query", None, {"query": "Where should we focus recruitment?"}, 0.5),
+    ("ai_query_stream", "POST", "/api/ai/query/stream", None, {"query": "Summarize volunteer coverage"}, 0.25),
+    ("sentiment", "POST", "/api/sentiment", None, {"texts": ["Great shift, well organized", "Nobody showed up"]}, 0.5),
+    ("sentiment_jobs", "GET", "/api/sentiment/bulk", None, None, 1.0),
+    ("data_reload_noop", "POST", "/api/data/reload", None, None, 0.1),
+]
+
+# Routes left out on purpose; any other unlisted route is reported as not benchmarked
+SKIPPED_ROUTES = {
+    "POST /api/sentiment/bulk/{dataset}": "starts a background job that writes files",
+}
+
+# Regressions below these absolute differences are treated as noise
+MIN_DELTAS = {"ms": 2.0, "seconds": 0.05, "mb": 20.0}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    return round(float(np.percentile(values, q)), 3)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 1e6, 1)
+    except ImportError:
+        return None
+
+
+# Child process: one data scale against a freshly imported app
+
+def measure_endpoint(client, method, path, params, body, requests, concurrency) -> Dict[str, Any]:
+    """First-request latency, then latency percentiles of concurrent requests"""
+    def call():
+        started = time.perf_counter()
+        try:
+            response = client.request(method, path, params=params, json=body)
+            status = response.status_code
+            cache = response.headers.get("x-cache")
+        except Exception as e:
+            status, cache = f"error: {type(e).__name__}", None
+        return (time.perf_counter() - started) * 1000, status, cache
+
+    first_ms, first_status, _ = call()
+    requests = max(requests, 1)
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: call(), range(requests)))
+    wall = time.perf_counter() - wall_started
+
+    latencies = [ms for ms, _, _ in results]
+    statuses: Dict[str, int] = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    hits = sum(1 for _, _, cache in results if cache == "HIT")
+    errors = sum(1 for _, status, _ in results if not isinstance(status, int) or status >= 500)
+
+    return {
+        "method": method,
+        "path": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "first_ms": round(first_ms, 3),
+        "first_status": first_status,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "max_ms": round(max(latencies), 3),
+        "throughput_rps": round(requests / wall, 1) if wall > 0 else None,
+        "statuses": statuses,
+        "errors": errors,
+        "cache_hits": hits,
+    }
+
+
+def measure_websocket(client, app_module, clients: int, rounds: int) -> Dict[str, Any]:
+    """Connect latency to the first snapshot, broadcast fan-out latency and resync round trips"""
+    hub = app_module.broadcast_hub
+    connect_ms, fanout_ms, resync_ms = [], [], []
+    sessions = []
+    try:
+        for _ in range(clients):
+            started = time.perf_counter()
+            session = client.websocket_connect("/ws").__enter__()
+            session.receive_text()
+            connect_ms.append((time.perf_counter() - started) * 1000)
+            sessions.append(session)
+
+        for _ in range(rounds):
+            started = time.perf_counter()
+            # Publish on the server's event loop, as the hub's own loop would
+            client.portal.call(hub.publish)
+            for session in sessions:
+                session.receive_text()
+                fanout_ms.append((time.perf_counter() - started) * 1000)
+
+        for session in sessions[:rounds]:
+            started = time.perf_counter()
+            session.send_text("resync")
+            session.receive_text()
+            resync_ms.append((time.perf_counter() - started) * 1000)
+    finally:
+        for session in sessions:
+            try:
+                session.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    return {
+        "clients": clients,
+        "rounds": rounds,
+        "connect_p50_ms": percentile(connect_ms, 50),
+        "connect_p99_ms": percentile(connect_ms, 99),
+        "fanout_p50_ms": percentile(fanout_ms, 50),
+        "fanout_p99_ms": percentile(fanout_ms, 99),
+        "resync_p50_ms": percentile(resync_ms, 50),
+        "resync_p99_ms": percentile(resync_ms, 99),
+        "hub": hub.describe(),
+    }
+
+
+class SnapshotLoads(logging.Handler):
+    """Collects the datasets read from Feather snapshots while attached"""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.datasets = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Loaded ") and " snapshot " in message:
+            self.datasets.append(message.split()[1])
+
+
+def run_scale(args) -> Dict[str, Any]:
+    """Benchmark the app against the data in the current directory"""
+    shutil.rmtree("data/.snapshots", ignore_errors=True)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    started = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    main.load_data()
+    load_cold = time.perf_counter() - started
+    rss_after_load = current_rss_mb()
+    peak_after_load = peak_rss_mb()
+
+    # Drop the in-memory frames so the warm load reads every dataset from its snapshot
+    main.base_frames, main.source_states, main.data_cache = {}, {}, {}
+    snapshot_logger = logging.getLogger("snapshot_cache")
+    snapshot_loads = SnapshotLoads()
+    snapshot_logger.addHandler(snapshot_loads)
+    level = snapshot_logger.level
+    snapshot_logger.setLevel(logging.INFO)
+    try:
+        started = time.perf_counter()
+        main.load_data()
+        load_warm = time.perf_counter() - started
+    finally:
+        snapshot_logger.removeHandler(snapshot_loads)
+        snapshot_logger.setLevel(level)
+    missed = sorted(set(main.data_cache) - set(snapshot_loads.datasets))
+    if missed:
+        raise RuntimeError(f"Warm load did not read snapshots for: {', '.join(missed)}")
+
+    from fastapi.testclient import TestClient
+
+    endpoints = {}
+    with TestClient(main.app) as client:
+        covered = set()
+        for name, method, path, params, body, share in ENDPOINTS:
+            logger.info(f"{args.rows} rows: {name}")
+            endpoints[name] = measure_endpoint(
+                client, method, path, params, body, int(args.requests * share), args.concurrency
+            )
+            covered.add(endpoint_route(main.app, method, path))
+
+        websocket = measure_websocket(client, main, args.ws_clients, args.ws_rounds)
+        uncovered = sorted(
+            f"{method} {route.path}"
+            for route in main.app.routes
+            if getattr(route, "path", "").startswith("/api/")
+            for method in sorted(getattr(route, "methods", None) or [])
+            if method != "HEAD" and f"{method} {route.path}" not in covered
+        )
+
+    return {
+        "rows": args.rows,
+        "datasets": {name: len(df) for name, df in main.data_cache.items()},
+        "import_seconds": round(import_seconds, 3),
+        "load_cold_seconds": round(load_cold, 3),
+        "load_warm_seconds": round(load_warm, 3),
+        "load_warm_snapshots": sorted(snapshot_loads.datasets),
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_after_load_mb": peak_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+        "endpoints": endpoints,
+        "websocket": websocket,
+        "skipped": {route: SKIPPED_ROUTES[route] for route in uncovered if route in SKIPPED_ROUTES},
+        "not_benchmarked": [route for route in uncovered if route not in SKIPPED_ROUTES],
+    }
+
+
+def endpoint_route(app, method: str, path: str) -> str:
+    """'METHOD /route/{template}' matched by a concrete path"""
+    from starlette.routing import Match
+    scope = {"type": "http", "method": method, "path": path, "root_path": "", "query_string": b"", "headers": []}
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{method} {route.path}"
+    return f"{method} {path}"
+
+
+# Parent process: data generation, one child per scale, and comparison
+
+def prepare_data(root: Path, rows: int, seed: int) -> Path:
+    """Directory holding generated data for a scale, reused when already generated"""
+    scale_dir = root / f"rows-{rows}-seed-{seed}"
+    marker = scale_dir / "data" / ".generated.json"
+    if not marker.exists():
+        shutil.rmtree(scale_dir, ignore_errors=True)
+        started = time.perf_counter()
+        sizes = generate(scale_dir / "data", rows, seed)
+        marker.write_text(json.dumps({"rows": rows, "seed": seed, "files": sizes}))
+        logger.info(f"Generated {rows} rows in {time.perf_counter() - started:.1f}s")
+    return scale_dir
+
+
+def run_child(scale_dir: Path, rows: int, args) -> Dict[str, Any]:
+    result_path = scale_dir / "result.json"
+    result_path.unlink(missing_ok=True)
+    env = {**os.environ, **BENCH_ENV}
+    if not args.response_cache:
+        # Entries expire immediately, so every request measures the endpoint itself
+        env["RESPONSE_CACHE_TTL"] = "0"
+    command = [
+        sys.executable, str(Path(__file__).resolve()), "--child",
+        "--rows", str(rows),
+        "--requests", str(args.requests),
+        "--concurrency", str(args.concurrency),
+        "--ws-clients", str(args.ws_clients),
+        "--ws-rounds", str(args.ws_rounds),
+        "--result", str(result_path),
+    ]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=scale_dir, env=env)
+    if completed.returncode != 0 or not result_path.exists():
+        return {"rows": rows, "error": f"benchmark process exited with {completed.returncode}"}
+    result = json.loads(result_path.read_text())
+    result["wall_seconds"] = round(time.perf_counter() - started, 1)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def regression_checks(run: Dict[str, Any]):
+    """(metric name, value, unit) pairs compared against a baseline"""
+    for metric, unit in (("load_cold_seconds", "seconds"), ("load_warm_seconds", "seconds"), ("peak_rss_mb", "mb")):
+        yield metric, run.get(metric), unit
+    for name, endpoint in run.get("endpoints", {}).items():
+        for metric in ("p50_ms", "p99_ms"):
+            yield f"{name}.{metric}", endpoint.get(metric), "ms"
+    for metric in ("connect_p99_ms", "fanout_p99_ms"):
+        yield f"websocket.{metric}", run.get("websocket", {}).get(metric), "ms"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Metrics that got worse than baseline by more than the threshold ratio"""
+    regressions = []
+    for rows, run in current["runs"].items():
+        previous = baseline.get("runs", {}).get(rows)
+        if previous is None:
+            continue
+        before = {metric: value for metric, value, _ in regression_checks(previous)}
+        for metric, value, unit in regression_checks(run):
+            old = before.get(metric)
+            if value is None or old is None:
+                continue
+            if value > old * threshold and value - old > MIN_DELTAS[unit]:
+                regressions.append({
+                    "rows": rows, "metric": metric, "baseline": old, "current": value,
+                    "ratio": round(value / old, 2) if old else None
+                })
+    return regressions
+
+
+def print_summary(results: Dict[str, Any]):
+    for rows, run in results["runs"].items():
+        if "error" in run:
+            print(f"\n{rows} rows: {run['error']}")
+            continue
+        print(f"\n{rows} rows: cold load {run['load_cold_seconds']}s, warm load {run['load_warm_seconds']}s, "
+              f"peak RSS {run['peak_rss_mb']} MB")
+        print(f"  {'endpoint':<26} {'first':>9} {'p50':>9} {'p99':>9} {'rps':>8}  statuses")
+        for name, endpoint in run["endpoints"].items():
+            print(f"  {name:<26} {endpoint['first_ms']:>9.1f} {endpoint['p50_ms']:>9.1f} "
+                  f"{endpoint['p99_ms']:>9.1f} {endpoint['throughput_rps'] or 0:>8.1f}  {endpoint['statuses']}")
+        websocket = run["websocket"]
+        print(f"  websocket: connect p99 {websocket['connect_p99_ms']} ms, "
+              f"fan-out p99 {websocket['fanout_p99_ms']} ms to {websocket['clients']} clients")
+        if run["not_benchmarked"]:
+            print(f"  not benchmarked: {', '.join(run['not_benchmarked'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against synthetic data")
+    parser.add_argument("--sizes", default="10k,100k", help="comma-separated row counts, e.g. 10k,100k,1m,5m")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint (scaled per endpoint)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ws-clients", type=int, default=50)
+    parser.add_argument("--ws-rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-root", default=os.path.join(tempfile.gettempdir(), "commmob-bench"),
+                        help="where generated data is kept between runs")
+    parser.add_argument("--response-cache", action="store_true", help="measure with the response cache enabled")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="ratio over baseline counted as a regression")
+    # Internal: run one scale in this process
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(name)s: %(message)s")
+    logger.setLevel(logging.INFO)
+
+    if args.child:
+        result = run_scale(args)
+        Path(args.result).write_text(json.dumps(result, indent=2, default=str))
+        return 0
+
+    root = Path(args.data_root)
+    results = {
+        "format": RESULT_FORMAT,
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "response_cache": args.response_cache,
+        },
+        "runs": {},
+    }
+    for size in args.sizes.split(","):
+        rows = parse_rows(size)
+        scale_dir = prepare_data(root, rows, args.seed)
+        logger.info(f"Benchmarking {rows} rows")
+        results["runs"][str(rows)] = run_child(scale_dir, rows, args)
+
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        results["baseline"] = {"path": args.baseline, "commit": baseline.get("meta", {}).get("commit")}
+        results["regressions"] = compare(results, baseline, args.threshold)
+        exit_code = 1 if results["regressions"] else 0
+
+    Path(args.output).write_text(json.dumps(results, indent=2, default=str))
+    print_summary(results)
+    for regression in results.get("regressions", []):
+        print(f"REGRESSION {regression['rows']} rows {regression['metric']}: "
+              f"{regression['baseline']} -> {regression['current']} (x{regression['ratio']})")
+    if any("error" in run for run in results["runs"].values()):
+        exit_code = 1
+    print(f"\nResults written to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+WebSocket broadcast hub
+A single publisher computes dashboard metrics once per tick (or as soon as
+the data version changes), diffs them against the last published state
+and serializes one delta message that is fanned out to every client.
+Each client has a bounded send queue drained by its own sender task, so
+a slow client only delays itself: on overflow its queue is replaced by a
+full snapshot, and clients that keep overflowing or stall are closed.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 16
+# Seconds a single send may take before the client is considered stalled
+SEND_TIMEOUT_SECONDS = 10
+# Overflows tolerated before a client is disconnected
+MAX_RESYNCS = 3
+
+
+class ClientChannel:
+    """One connected client and its bounded outgoing queue"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.resyncs = 0
+        self.sent = 0
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class BroadcastHub:
+    """Publishes metric deltas to all WebSocket clients from one task"""
+
+    def __init__(
+        self,
+        compute: Callable[[], Dict[str, Any]],
+        version: Callable[[], int],
+        interval_seconds: float,
+        queue_size: int = DEFAULT_QUEUE_SIZE
+    ):
+        self.compute = compute
+        self.version = version
+        self.interval_seconds = interval_seconds
+        self.queue_size = queue_size
+        self.clients: Dict[int, ClientChannel] = {}
+        self.state: Dict[str, Any] = {}
+        self.seq = 0
+        self._changed: Optional[asyncio.Event] = None
+        self.stats = {"ticks": 0, "deltas": 0, "messages": 0, "resyncs": 0, "disconnects": 0}
+        self.last_tick_ms = None
+
+    @property
+    def changed(self) -> asyncio.Event:
+        # Created on first use so it belongs to the server's event loop
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def notify(self):
+        """Publish on the next loop iteration instead of waiting for the tick"""
+        self.changed.set()
+
+    def envelope(self, message_type: str, data: Dict[str, Any]) -> str:
+        return json.dumps({
+            "type": message_type,
+            "seq": self.seq,
+            "data_version": self.version(),
+            "timestamp": datetime.now().isoformat(),
+            "data": data,
+        }, default=str)
+
+    async def connect(self, websocket: WebSocket) -> ClientChannel:
+        await websocket.accept()
+        channel = ClientChannel(websocket, self.queue_size)
+        # Deltas already queued for other clients are relative to the current state
+        if not self.clients:
+            self.state = self.compute()
+        channel.queue.put_nowait(self.envelope("metrics_snapshot", self.state))
+        channel.task = asyncio.create_task(self._send_loop(channel))
+        self.clients[id(channel)] = channel
+        return channel
+
+    def disconnect(self, channel: ClientChannel):
+        if self.clients.pop(id(channel), None) is None:
+            return
+        channel.closed = True
+        if channel.task is not None and channel.task is not asyncio.current_task():
+            channel.task.cancel()
+
+    def resync(self, channel: ClientChannel):
+        """Replace everything queued for a client with a full snapshot"""
+        while not channel.queue.empty():
+            channel.queue.get_nowait()
+        channel.queue.put_nowait(self.envelope("metrics_snapshot", self.state))
+
+    async def _send_loop(self, channel: ClientChannel):
+        try:
+            while True:
+                message = await channel.queue.get()
+                await asyncio.wait_for(channel.websocket.send_text(message), SEND_TIMEOUT_SECONDS)
+                channel.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Dropping WebSocket client: {e}")
+            await self._close(channel)
+
+    async def _close(self, channel: ClientChannel):
+        self.stats["disconnects"] += 1
+        self.disconnect(channel)
+        try:
+            await channel.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def fan_out(self, message: str):
+        """Queue one serialized message for every client without awaiting any of them"""
+        for channel in list(self.clients.values()):
+            try:
+                channel.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                channel.resyncs += 1
+                self.stats["resyncs"] += 1
+                if channel.resyncs > MAX_RESYNCS:
+                    asyncio.create_task(self._close(channel))
+                else:
+                    self.resync(channel)
+            self.stats["messages"] += 1
+
+    def publish(self):
+        """Compute the current metrics and send the fields that changed"""
+        started = time.perf_counter()
+        state = self.compute()
+        delta = {key: value for key, value in state.items() if self.state.get(key) != value}
+        delta.update({key: None for key in self.state if key not in state})
+        self.state = state
+        self.stats["ticks"] += 1
+
+        if delta:
+            self.seq += 1
+            self.stats["deltas"] += 1
+            self.fan_out(self.envelope("metrics_update", delta))
+        else:
+            # Keeps idle connections alive through proxies
+            self.fan_out(json.dumps({"type": "heartbeat", "seq": self.seq, "timestamp": datetime.now().isoformat()}))
+        self.last_tick_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    async def run(self):
+        logger.info(f"Broadcasting metric updates every {self.interval_seconds}s")
+        while True:
+            try:
+                await asyncio.wait_for(self.changed.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.changed.clear()
+            if not self.clients:
+                continue
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Error publishing metric updates: {e}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.clients),
+            "interval_seconds": self.interval_seconds,
+            "seq": self.seq,
+            "last_tick_ms": self.last_tick_ms,
+            "max_queued": max((channel.queue.qsize() for channel in self.clients.values()), default=0),
+            "queued": sum(channel.queue.qsize() for channel in self.clients.values()),
+            **self.stats,
+        }
@@ -0,0 +1,118 @@
+"""
+Lazy capability registry
+Defers heavy imports and model construction until first use or a
+background warm-up, and tracks load state for health reporting.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# Seconds before a failed capability may be retried
+RETRY_AFTER_SECONDS = 300
+
+
+class CapabilityUnavailable(RuntimeError):
+    """Raised when a capability failed to load"""
+
+
+class Capability:
+    """A heavy dependency or model that is loaded once, on demand"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], description: str = ""):
+        self.name = name
+        self.description = description
+        self._loader = loader
+        self._lock = threading.Lock()
+        self.state = UNLOADED
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.failed_at: Optional[float] = None
+
+    def get(self) -> Any:
+        """Return the loaded value, loading it on first use"""
+        if self.state == READY:
+            return self.value
+
+        with self._lock:
+            if self.state == READY:
+                return self.value
+            if self.state == FAILED and time.monotonic() - self.failed_at < RETRY_AFTER_SECONDS:
+                raise CapabilityUnavailable(f"{self.name} unavailable: {self.error}")
+
+            self.state = LOADING
+            started = time.perf_counter()
+            try:
+                self.value = self._loader()
+            except Exception as e:
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                self.state = FAILED
+                self.error = str(e)
+                self.failed_at = time.monotonic()
+                logger.warning(f"Could not load {self.name}: {e}")
+                raise CapabilityUnavailable(f"{self.name} unavailable: {e}") from e
+
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self.state = READY
+            self.error = None
+            logger.info(f"Loaded {self.name} in {self.load_seconds}s")
+            return self.value
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+            "description": self.description,
+        }
+
+
+class CapabilityRegistry:
+    """Named collection of lazily loaded capabilities"""
+
+    def __init__(self):
+        self._capabilities: Dict[str, Capability] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], description: str = "") -> Capability:
+        capability = Capability(name, loader, description)
+        self._capabilities[name] = capability
+        return capability
+
+    def get(self, name: str) -> Any:
+        """Load (if needed) and return a capability on the calling thread"""
+        return self._capabilities[name].get()
+
+    async def aget(self, name: str) -> Any:
+        """Load (if needed) and return a capability without blocking the event loop"""
+        capability = self._capabilities[name]
+        if capability.state == READY:
+            return capability.value
+        return await asyncio.to_thread(capability.get)
+
+    def is_ready(self, name: str) -> bool:
+        capability = self._capabilities.get(name)
+        return capability is not None and capability.state == READY
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: capability.status() for name, capability in self._capabilities.items()}
+
+    async def warm_up(self, names: Iterable[str]):
+        """Load capabilities one at a time in a worker thread"""
+        for name in names:
+            if name not in self._capabilities:
+                logger.warning(f"Unknown capability in warm-up list: {name}")
+                continue
+            try:
+                await self.aget(name)
+            except CapabilityUnavailable:
+                pass
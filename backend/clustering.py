@@ -0,0 +1,140 @@
+"""
+Cached geographic clustering service
+Fits KMeans over volunteer coordinates once per (data version, k), keeps
+recent models in an LRU, and warm-starts refits from the previous
+version's centers when new data arrives.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLUSTERS = 5
+MAX_CLUSTERS = 50
+# Above this many points, fit with MiniBatchKMeans instead of full KMeans
+MINIBATCH_THRESHOLD = 50_000
+MAX_CACHED_MODELS = 8
+
+
+class ClusterModel:
+    """A fitted clustering of one data version"""
+
+    def __init__(self, version: int, k: int, mean, scale, scaled_centers, labels, inertia, method, fit_seconds):
+        self.version = version
+        self.k = k
+        self.mean = mean
+        self.scale = scale
+        self.scaled_centers = scaled_centers
+        self.labels = labels
+        self.inertia = inertia
+        self.method = method
+        self.fit_seconds = fit_seconds
+
+    @property
+    def centers(self) -> np.ndarray:
+        """Cluster centers in the original x/y coordinate space"""
+        return self.scaled_centers * self.scale + self.mean
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "data_version": self.version,
+            "k": self.k,
+            "method": self.method,
+            "inertia": float(self.inertia),
+            "fit_seconds": self.fit_seconds,
+            "points": int(len(self.labels)),
+        }
+
+
+def coordinate_mask(df: pd.DataFrame) -> np.ndarray:
+    """Rows with both coordinates present, in frame order"""
+    return (df['x'].notna() & df['y'].notna()).to_numpy()
+
+
+class ClusteringService:
+    """Per-(version, k) cache of fitted models with warm-started refits"""
+
+    def __init__(self, max_models: int = MAX_CACHED_MODELS):
+        self.max_models = max_models
+        self._models: "OrderedDict[tuple, ClusterModel]" = OrderedDict()
+        # Most recent model for each k, used to seed refits on new versions
+        self._latest: Dict[int, ClusterModel] = {}
+        self._lock = threading.Lock()
+        # Serializes fits so concurrent requests for the same key share one fit
+        self._fit_lock = threading.Lock()
+
+    def cached(self, version: int, k: int) -> Optional[ClusterModel]:
+        with self._lock:
+            model = self._models.get((version, k))
+            if model is not None:
+                self._models.move_to_end((version, k))
+            return model
+
+    def get(self, df: pd.DataFrame, version: int, k: int, ml) -> ClusterModel:
+        """Return the model for this version and k, fitting it if needed
+
+        ``ml`` is the loaded sklearn capability namespace.
+        """
+        model = self.cached(version, k)
+        if model is not None:
+            return model
+
+        with self._fit_lock:
+            model = self.cached(version, k)
+            if model is not None:
+                return model
+
+            model = self._fit(df, version, k, ml, self._latest.get(k))
+            with self._lock:
+                self._models[(version, k)] = model
+                self._latest[k] = model
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+            return model
+
+    def _fit(self, df, version, k, ml, previous: Optional[ClusterModel]) -> ClusterModel:
+        started = time.perf_counter()
+        coords = df.loc[coordinate_mask(df), ['x', 'y']].to_numpy(dtype=np.float64)
+        if len(coords) < k:
+            raise ValueError(f"Need at least {k} geocoded rows to form {k} clusters")
+
+        mean = coords.mean(axis=0)
+        scale = coords.std(axis=0)
+        scale[scale == 0] = 1.0
+        scaled = (coords - mean) / scale
+
+        # Seed from the previous version's centers, re-expressed in the new scaling
+        init, n_init = 'k-means++', 10
+        if previous is not None and previous.version != version:
+            init = (previous.centers - mean) / scale
+            n_init = 1
+
+        if len(coords) > MINIBATCH_THRESHOLD:
+            method = "minibatch_kmeans"
+            estimator = ml.MiniBatchKMeans(
+                n_clusters=k, init=init, n_init=n_init if n_init == 1 else 3,
+                batch_size=4096, random_state=42
+            )
+        else:
+            method = "kmeans"
+            estimator = ml.KMeans(n_clusters=k, init=init, n_init=n_init, random_state=42)
+
+        with telemetry.stage("kmeans_fit"):
+            labels = estimator.fit_predict(scaled)
+        fit_seconds = round(time.perf_counter() - started, 3)
+        warm = " (warm start)" if n_init == 1 else ""
+        logger.info(f"Fitted {method} k={k} on {len(coords)} points for version {version} in {fit_seconds}s{warm}")
+
+        return ClusterModel(
+            version, k, mean, scale, estimator.cluster_centers_,
+            labels.astype(np.int16), estimator.inertia_, method, fit_seconds
+        )
@@ -0,0 +1,157 @@
+"""
+Data directory watcher with incremental ingestion
+Tracks each source CSV by size, mtime and a sha256 of its parsed prefix.
+Files that only grew, with the parsed prefix byte-for-byte unchanged, are
+read from the last parsed byte offset so just the appended rows are
+parsed; any other change falls back to a full reload. Checks and reloads run off the event loop.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Read size while hashing a parsed prefix
+HASH_CHUNK_SIZE = 1 << 20
+
+UNCHANGED = 'unchanged'
+APPENDED = 'appended'
+REPLACED = 'replaced'
+MISSING = 'missing'
+
+
+class SourceState:
+    """What has been parsed from one source file"""
+
+    def __init__(self, path: Path, size: int, mtime_ns: int, offset: int, header: bytes, digest, rows: int):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.offset = offset    # bytes parsed, always at a line boundary
+        self.header = header    # header line including its newline
+        self.digest = digest    # sha256 of the parsed prefix, extended as rows are appended
+        self.rows = rows
+
+    def describe(self) -> Dict:
+        return {"path": str(self.path), "size": self.size, "rows": self.rows}
+
+
+def prefix_digest(handle, offset: int):
+    """sha256 of every byte before offset"""
+    digest = hashlib.sha256()
+    handle.seek(0)
+    remaining = offset
+    while remaining > 0:
+        chunk = handle.read(min(HASH_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest
+
+
+def read_header(handle) -> bytes:
+    handle.seek(0)
+    return handle.readline()
+
+
+def scan_source(path: Path, rows: int) -> SourceState:
+    """State of a fully parsed file"""
+    stat = path.stat()
+    with open(path, 'rb') as handle:
+        header = read_header(handle)
+        return SourceState(path, stat.st_size, stat.st_mtime_ns, stat.st_size, header, prefix_digest(handle, stat.st_size), rows)
+
+
+def detect_change(state: Optional[SourceState], path: Path) -> str:
+    """How a source file changed since it was last parsed"""
+    if not path.exists():
+        return MISSING
+    if state is None:
+        return REPLACED
+
+    stat = path.stat()
+    if stat.st_size == state.size and stat.st_mtime_ns == state.mtime_ns:
+        return UNCHANGED
+    if stat.st_size < state.offset:
+        return REPLACED
+
+    with open(path, 'rb') as handle:
+        if read_header(handle) != state.header:
+            return REPLACED
+        # Rows edited anywhere in the parsed prefix need a full reload
+        if prefix_digest(handle, state.offset).hexdigest() != state.digest.hexdigest():
+            return REPLACED
+    return APPENDED
+
+
+def read_appended(state: SourceState) -> Tuple[Optional[pd.DataFrame], SourceState]:
+    """Parse rows appended after the state's offset, up to the last complete line"""
+    stat = state.path.stat()
+    with open(state.path, 'rb') as handle:
+        handle.seek(state.offset)
+        tail = handle.read(stat.st_size - state.offset)
+        # A partially written last line is left for the next poll
+        end = tail.rfind(b'\n') + 1
+        tail = tail[:end]
+        offset = state.offset + end
+
+        delta = None
+        if tail.strip():
+            delta = pd.read_csv(io.BytesIO(state.header + tail))
+        rows = state.rows + (len(delta) if delta is not None else 0)
+
+    digest = state.digest.copy()
+    digest.update(tail)
+    return delta, SourceState(state.path, stat.st_size, stat.st_mtime_ns, offset, state.header, digest, rows)
+
+
+def source_changes(paths: Dict[str, Path], states: Dict[str, SourceState]) -> Dict[str, str]:
+    """Sources that changed, appeared or disappeared since they were parsed"""
+    changes = {}
+    for name, path in paths.items():
+        change = detect_change(states.get(name), path)
+        if change == MISSING and name not in states:
+            continue
+        if change != UNCHANGED:
+            changes[name] = change
+    return changes
+
+
+class DataWatcher:
+    """Polls for changes and triggers a reload when there are any"""
+
+    def __init__(
+        self,
+        changes: Callable[[], Dict[str, str]],
+        reload: Callable[[], Awaitable[None]],
+        interval_seconds: float
+    ):
+        self.changes = changes
+        self.reload = reload
+        self.interval_seconds = interval_seconds
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    async def run(self):
+        logger.info(f"Watching for data changes every {self.interval_seconds}s")
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                changes = await asyncio.to_thread(self.changes)
+                if changes:
+                    logger.info(f"Data changed: {changes}")
+                    await self.reload()
+                    self.reloads += 1
+                    self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error reloading changed data: {e}")
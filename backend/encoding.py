@@ -0,0 +1,278 @@
+"""
+Columnar response encoding with content negotiation
+Encodes DataFrames straight from their columns as row JSON, columnar JSON,
+Arrow IPC or MessagePack (chosen by the Accept header), and compresses
+large bodies with brotli or gzip (chosen by Accept-Encoding).
+"""
+
+import gzip
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.commmob.columnar+json"
+ARROW = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+
+MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.apache.arrow.file": ARROW,
+}
+
+# Bodies smaller than this are not worth compressing
+COMPRESSION_MIN_BYTES = 1024
+
+# float32 columns carry about 7 significant digits; without orjson they are
+# written with this many decimals (about 0.1 m for coordinates)
+FLOAT32_FALLBACK_DECIMALS = 6
+
+
+def available_media_types() -> List[str]:
+    types = [JSON, COLUMNAR_JSON]
+    if pa is not None:
+        types.append(ARROW)
+    if msgpack is not None:
+        types.append(MSGPACK)
+    return types
+
+
+def parse_weighted(header: Optional[str]) -> List[tuple]:
+    """(value, quality) pairs of a comma-separated header with q parameters, in header order"""
+    if not header:
+        return []
+
+    weighted = []
+    for part in header.split(","):
+        fields = [field.strip() for field in part.split(";")]
+        if not fields[0]:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            if param.lower().startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weighted.append((fields[0].lower(), quality))
+    return weighted
+
+
+def parse_accept(header: Optional[str]) -> List[str]:
+    """Media types from an Accept header, highest quality first"""
+    ranked = [
+        (-quality, order, MEDIA_TYPE_ALIASES.get(media_type, media_type))
+        for order, (media_type, quality) in enumerate(parse_weighted(header))
+        if quality > 0
+    ]
+    return [media_type for _, _, media_type in sorted(ranked)]
+
+
+def negotiate(request: Request) -> str:
+    """Pick the response media type, falling back to row JSON"""
+    available = available_media_types()
+    for media_type in parse_accept(request.headers.get("accept")):
+        if media_type in available:
+            return media_type
+    return JSON
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize plain Python/numpy values to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str).encode()
+
+
+def float32_values(values: np.ndarray) -> np.ndarray:
+    """float32 values as the float64 nearest their shortest decimal form, so JSON shows no float32 noise"""
+    if orjson is not None:
+        # orjson writes each float32 in the fewest digits that read back to it
+        encoded = orjson.dumps(np.ascontiguousarray(values), option=orjson.OPT_SERIALIZE_NUMPY)
+        return np.array(orjson.loads(encoded), dtype=np.float64)
+    return np.round(values.astype(np.float64), FLOAT32_FALLBACK_DECIMALS)
+
+
+def _is_float32(series: pd.Series) -> bool:
+    return isinstance(series.dtype, np.dtype) and series.dtype == np.float32
+
+
+def _json_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """The frame with float32 columns widened to their shortest decimal values for to_json"""
+    float32 = [col for col in df.columns if _is_float32(df[col])]
+    if not float32:
+        return df
+    df = df.copy(deep=False)
+    for col in float32:
+        df[col] = float32_values(df[col].to_numpy())
+    return df
+
+
+def _column_json(series: pd.Series) -> bytes:
+    if _is_float32(series):
+        if orjson is not None:
+            return orjson.dumps(np.ascontiguousarray(series.to_numpy()), option=orjson.OPT_SERIALIZE_NUMPY)
+        series = pd.Series(float32_values(series.to_numpy()))
+    return series.to_json(orient="values", date_format="iso").encode()
+
+
+def _join_object(members: List[tuple]) -> bytes:
+    """Assemble a JSON object from (key, pre-encoded value) pairs"""
+    parts = [dumps(key) + b":" + value for key, value in members]
+    return b"{" + b",".join(parts) + b"}"
+
+
+def _meta_members(meta: Dict[str, Any]) -> List[tuple]:
+    return [(key, dumps(value)) for key, value in meta.items()]
+
+
+def encode_row_json(frames: Dict[str, pd.DataFrame], meta: Dict[str, Any]) -> bytes:
+    members = [
+        (name, _json_frame(df).to_json(orient="records", date_format="iso").encode())
+        for name, df in frames.items()
+    ]
+    return _join_object(members + _meta_members(meta))
+
+
+def encode_columnar_json(frames: Dict[str, pd.DataFrame], meta: Dict[str, Any]) -> bytes:
+    members = []
+    for name, df in frames.items():
+        columns = [
+            (str(col), _column_json(df[col]))
+            for col in df.columns
+        ]
+        members.append((name, _join_object([
+            ("columns", _join_object(columns)),
+            ("length", dumps(len(df))),
+        ])))
+    return _join_object(members + _meta_members(meta))
+
+
+def encode_arrow(frames: Dict[str, pd.DataFrame], meta: Dict[str, Any]) -> bytes:
+    if len(frames) != 1:
+        raise ValueError("Arrow responses carry exactly one frame")
+
+    name, df = next(iter(frames.items()))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Envelope fields travel in the schema metadata
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"commmob.frame"] = name.encode()
+    metadata[b"commmob.meta"] = dumps(meta)
+    table = table.replace_schema_metadata(metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _msgpack_column(series: pd.Series) -> list:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def encode_msgpack(frames: Dict[str, pd.DataFrame], meta: Dict[str, Any]) -> bytes:
+    body = {
+        name: {
+            "columns": {str(col): _msgpack_column(df[col]) for col in df.columns},
+            "length": len(df),
+        }
+        for name, df in frames.items()
+    }
+    # Round-trip meta through JSON so numpy scalars become plain values
+    body.update(json.loads(dumps(meta)))
+    return msgpack.packb(body, use_bin_type=True)
+
+
+ENCODERS = {
+    JSON: encode_row_json,
+    COLUMNAR_JSON: encode_columnar_json,
+    ARROW: encode_arrow,
+    MSGPACK: encode_msgpack,
+}
+
+
+def available_encodings() -> List[str]:
+    """Content codings we can produce, preferred first"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """Best content coding the client accepts with q > 0, or None for identity"""
+    qualities: Dict[str, float] = {}
+    for coding, quality in parse_weighted(header):
+        qualities.setdefault(coding, quality)
+    # '*' covers codings the header does not name
+    wildcard = qualities.get("*", 0.0)
+
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(request: Request, body: bytes, headers: Dict[str, str]) -> bytes:
+    """Compress the body with the best encoding the client accepts"""
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding == "br":
+        headers["Content-Encoding"] = "br"
+        return brotli.compress(body, quality=4)
+    if encoding == "gzip":
+        headers["Content-Encoding"] = "gzip"
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+
+def frame_response(
+    request: Request,
+    frames: Dict[str, pd.DataFrame],
+    meta: Optional[Dict[str, Any]] = None,
+    status_code: int = 200
+) -> Response:
+    """Encode named DataFrames plus envelope fields in the negotiated format"""
+    meta = meta or {}
+    media_type = negotiate(request)
+    if media_type == ARROW and len(frames) != 1:
+        media_type = COLUMNAR_JSON
+
+    with telemetry.stage("serialization"):
+        body = ENCODERS[media_type](frames, meta)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    with telemetry.stage("compression"):
+        body = compress(request, body, headers)
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
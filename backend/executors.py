@@ -0,0 +1,143 @@
+"""
+Managed executors for CPU-bound request work
+Runs pandas, encoding and sklearn work on a shared thread pool so the
+event loop stays free for lightweight endpoints and WebSocket traffic.
+Each lane caps how many of its jobs run at once and how many may wait;
+jobs still queued when the client disconnects are cancelled.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+# Seconds between client disconnect checks while a job waits or runs
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+class ComputeRejected(Exception):
+    """The lane's queue is full"""
+
+
+class ComputeCancelled(Exception):
+    """The client disconnected before the job finished"""
+
+
+class ComputeLane:
+    """Concurrency limit, queue bound and counters for one class of endpoints"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.active = 0
+        self.peak_queued = 0
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "cancelled": 0}
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def describe(self) -> Dict[str, Any]:
+        finished = self.stats["completed"] + self.stats["failed"]
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            **self.stats,
+            "avg_wait_ms": round(self.wait_seconds / finished * 1000, 2) if finished else None,
+            "avg_run_ms": round(self.run_seconds / finished * 1000, 2) if finished else None,
+        }
+
+
+class ComputeExecutor:
+    """Thread pool shared by named lanes"""
+
+    def __init__(self, max_workers: int, lanes: Dict[str, Tuple[int, int]]):
+        self.max_workers = max_workers
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="compute")
+        self.lanes = {
+            name: ComputeLane(name, concurrency, queue) for name, (concurrency, queue) in lanes.items()
+        }
+
+    async def _until_disconnected(self, request: Optional[Request], task: asyncio.Future) -> bool:
+        """Wait for a task; False if the client went away first"""
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return True
+            if request is not None and await request.is_disconnected():
+                return False
+
+    async def run(self, lane_name: str, request: Optional[Request], fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool once a slot in the lane is free"""
+        lane = self.lanes[lane_name]
+        if lane.queued >= lane.max_queue:
+            lane.stats["rejected"] += 1
+            raise ComputeRejected(f"Too many queued {lane_name} requests, retry shortly")
+
+        loop = asyncio.get_running_loop()
+        queued_at = time.monotonic()
+        lane.queued += 1
+        lane.peak_queued = max(lane.peak_queued, lane.queued)
+        acquire = asyncio.ensure_future(lane.semaphore.acquire())
+        try:
+            acquired = await self._until_disconnected(request, acquire)
+        finally:
+            lane.queued -= 1
+        if not acquired:
+            acquire.cancel()
+            # The slot may have been granted just before the cancel
+            if acquire.done() and not acquire.cancelled():
+                lane.semaphore.release()
+            lane.stats["cancelled"] += 1
+            raise ComputeCancelled("Client disconnected while queued")
+
+        lane.active += 1
+        started_at = time.monotonic()
+        lane.wait_seconds += started_at - queued_at
+
+        def finished(future: concurrent.futures.Future):
+            lane.active -= 1
+            lane.semaphore.release()
+            if future.cancelled():
+                lane.stats["cancelled"] += 1
+                return
+            lane.run_seconds += time.monotonic() - started_at
+            lane.stats["failed" if future.exception() is not None else "completed"] += 1
+
+        # The slot is released when the thread finishes, not when the caller stops waiting
+        future = self.pool.submit(functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(finished, f))
+
+        result = asyncio.wrap_future(future)
+        if not await self._until_disconnected(request, result):
+            # Only jobs that have not started yet can be cancelled
+            future.cancel()
+            result.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise ComputeCancelled("Client disconnected before the result was ready")
+        return result.result()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "lanes": {name: lane.describe() for name, lane in self.lanes.items()},
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,164 @@
+"""
+Streaming export engine
+Encodes a dataset to CSV, NDJSON or Parquet in fixed-size row chunks that
+are written to the response as they are produced, so exports never touch
+disk and memory stays bounded by the chunk size.
+"""
+
+import zlib
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_ROWS = 50_000
+
+EXPORT_FORMATS = {
+    "csv": {"media_type": "text/csv", "extension": "csv"},
+    "ndjson": {"media_type": "application/x-ndjson", "extension": "ndjson"},
+    "parquet": {"media_type": "application/vnd.apache.parquet", "extension": "parquet"},
+}
+
+
+class ExportError(ValueError):
+    """Raised for unsupported export requests"""
+
+
+def validate_export(fmt: str, compression: Optional[str]):
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and pq is None:
+        raise ExportError("Parquet export requires pyarrow")
+    if compression not in (None, "gzip"):
+        raise ExportError(f"Unsupported compression '{compression}'")
+    if compression and fmt == "parquet":
+        raise ExportError("Parquet exports are compressed internally; omit compression")
+
+
+def export_filename(dataset: str, fmt: str, compression: Optional[str], timestamp: str) -> str:
+    filename = f"{dataset}_export_{timestamp}.{EXPORT_FORMATS[fmt]['extension']}"
+    return f"{filename}.gz" if compression == "gzip" else filename
+
+
+def export_media_type(fmt: str, compression: Optional[str]) -> str:
+    return "application/gzip" if compression == "gzip" else EXPORT_FORMATS[fmt]["media_type"]
+
+
+def iter_chunks(
+    df: pd.DataFrame,
+    positions: Optional[np.ndarray],
+    columns: Optional[List[str]],
+    chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """Materialize matching rows one chunk at a time"""
+    column_positions = slice(None) if columns is None else [df.columns.get_loc(col) for col in columns]
+    total = len(df) if positions is None else len(positions)
+
+    for start in range(0, total, chunk_rows):
+        if positions is None:
+            rows = slice(start, min(start + chunk_rows, total))
+        else:
+            rows = positions[start:start + chunk_rows]
+        yield df.iloc[rows, column_positions]
+
+
+def encode_csv(chunks: Iterator[pd.DataFrame], empty: pd.DataFrame) -> Iterator[bytes]:
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+    if header:
+        # No matching rows; still emit the header line
+        yield empty.to_csv(index=False).encode()
+
+
+def encode_ndjson(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    for chunk in chunks:
+        if len(chunk):
+            lines = chunk.to_json(orient="records", lines=True, date_format="iso")
+            # Older pandas omit the trailing newline; chunks must stay line-delimited
+            yield (lines if lines.endswith("\n") else lines + "\n").encode()
+
+
+class _DrainableSink:
+    """Write-only file object whose buffered bytes can be taken between writes"""
+
+    def __init__(self):
+        self._parts = []
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def encode_parquet(chunks: Iterator[pd.DataFrame], empty: pd.DataFrame) -> Iterator[bytes]:
+    """One Parquet row group per chunk, flushed to the stream as it is written"""
+    sink = _DrainableSink()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression="snappy")
+        writer.write_table(table.cast(writer.schema))
+        data = sink.drain()
+        if data:
+            yield data
+
+    if writer is None:
+        # No matching rows; still emit a valid file with the schema
+        table = pa.Table.from_pandas(empty, preserve_index=False)
+        writer = pq.ParquetWriter(sink, table.schema, compression="snappy")
+    writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(parts: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(
+    df: pd.DataFrame,
+    positions: Optional[np.ndarray],
+    columns: Optional[List[str]],
+    fmt: str,
+    compression: Optional[str] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[bytes]:
+    """Encoded export body as a stream of byte chunks"""
+    chunks = iter_chunks(df, positions, columns, chunk_rows)
+    empty = df.iloc[0:0] if columns is None else df.iloc[0:0][columns]
+    if fmt == "csv":
+        parts = encode_csv(chunks, empty)
+    elif fmt == "ndjson":
+        parts = encode_ndjson(chunks)
+    else:
+        parts = encode_parquet(chunks, empty)
+
+    if compression == "gzip":
+        parts = gzip_stream(parts)
+    return parts
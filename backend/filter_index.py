@@ -0,0 +1,163 @@
+"""
+Inverted filter indexes for list endpoints
+Maps each value of a filterable column to the sorted row positions holding
+it, so filtered pages are answered by intersecting position arrays instead
+of scanning and copying the whole frame.
+"""
+
+import logging
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns each list endpoint can filter on
+FILTER_COLUMNS = {
+    'volunteers': ['Current Status', 'State'],
+    'applicants': ['Current Status', 'Workflow Type'],
+}
+
+EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+# rows: the materialized page; start: index of its first row within the matches;
+# positions: absolute row positions of the page
+PageSelection = namedtuple('PageSelection', ['rows', 'total', 'start', 'positions'])
+
+
+def build_postings(series: pd.Series) -> Dict[str, np.ndarray]:
+    """Value -> sorted int64 row positions for one column"""
+    codes, uniques = pd.factorize(series, sort=False)
+    # A stable sort keeps positions ascending within each value
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    # Missing values get code -1 and sort first; skip them
+    start = int((codes < 0).sum())
+    postings = {}
+    for code, value in enumerate(uniques):
+        end = start + counts[code]
+        postings[str(value)] = order[start:end].astype(np.int64)
+        start = end
+    return postings
+
+
+class FilterIndex:
+    """Posting lists for the filterable columns of one dataset"""
+
+    def __init__(self, df: pd.DataFrame, columns, key_column: Optional[str] = None):
+        self.row_count = len(df)
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {
+            col: build_postings(df[col]) for col in columns if col in df.columns
+        }
+        self.row_keys = pd.Index(df[key_column]) if key_column in df.columns else None
+
+    def position_of(self, key, hint: int) -> int:
+        """Current row position of a stable row key, trusting the hint when it still matches"""
+        if self.row_keys is None:
+            return hint
+        if 0 <= hint < self.row_count and self.row_keys[hint] == key:
+            return hint
+        if self.row_keys.is_unique:
+            found = self.row_keys.get_indexer([key])[0]
+            return int(found) if found >= 0 else hint
+        # Duplicate keys: resume from the occurrence closest to where the last page ended
+        matches = self.row_keys.get_indexer_non_unique([key])[0]
+        matches = matches[matches >= 0]
+        if len(matches) == 0:
+            return hint
+        return int(matches[np.argmin(np.abs(matches - hint))])
+
+    def covers(self, filters: Dict[str, Optional[str]]) -> bool:
+        """Whether every active filter column is indexed"""
+        return all(col in self.postings for col, value in filters.items() if value)
+
+    def lookup(self, filters: Dict[str, Optional[str]]) -> Optional[np.ndarray]:
+        """Row positions matching every filter, or None when nothing is filtered"""
+        active = {col: value for col, value in filters.items() if value}
+        if not active:
+            return None
+
+        lists = []
+        for col, value in active.items():
+            if col not in self.postings:
+                raise KeyError(f"Column '{col}' is not indexed")
+            lists.append(self.postings[col].get(value, EMPTY_POSITIONS))
+
+        # Intersect smallest first so each step shrinks the candidate set fastest
+        lists.sort(key=len)
+        positions = lists[0]
+        for other in lists[1:]:
+            if len(positions) == 0:
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+
+def build_filter_indexes(data: Dict[str, pd.DataFrame], key_column: Optional[str] = None) -> Dict[str, FilterIndex]:
+    """Build a FilterIndex for every cached dataset with filterable columns"""
+    indexes = {}
+    for name, columns in FILTER_COLUMNS.items():
+        if name in data:
+            indexes[name] = FilterIndex(data[name], columns, key_column)
+            logger.info(f"Built filter index for {name} on {list(indexes[name].postings)}")
+    return indexes
+
+
+def match_positions(
+    df: pd.DataFrame,
+    index: Optional[FilterIndex],
+    filters: Dict[str, Optional[str]]
+) -> Optional[np.ndarray]:
+    """Sorted row positions matching the filters, or None when nothing is filtered"""
+    if index is not None and index.row_count == len(df) and index.covers(filters):
+        return index.lookup(filters)
+
+    # No usable index; fall back to a boolean scan
+    active = {col: value for col, value in filters.items() if value}
+    if not active:
+        return None
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in active.items():
+        mask &= (df[col] == value).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def select_page(
+    df: pd.DataFrame,
+    index: Optional[FilterIndex],
+    filters: Dict[str, Optional[str]],
+    offset: int,
+    limit: int,
+    columns: Optional[List[str]] = None,
+    after: Optional[Dict] = None
+) -> PageSelection:
+    """Materialize only the requested page (and columns) of rows matching the filters
+
+    ``after`` is a decoded cursor ({"key", "position"}); when given, the page
+    starts just past that row and ``offset`` is ignored.
+    """
+    usable_index = index is not None and index.row_count == len(df)
+    positions = match_positions(df, index, filters)
+
+    total = len(df) if positions is None else len(positions)
+
+    if after is not None:
+        last = index.position_of(after["key"], after["position"]) if usable_index else after["position"]
+        if positions is None:
+            start = last + 1
+        else:
+            start = int(np.searchsorted(positions, last, side='right'))
+    else:
+        start = offset
+    start = max(start, 0)
+
+    if positions is None:
+        page_positions = np.arange(start, min(start + limit, total), dtype=np.int64)
+    else:
+        page_positions = positions[start:start + limit]
+
+    column_positions = slice(None) if columns is None else [df.columns.get_loc(col) for col in columns]
+    rows = df.iloc[page_positions, column_positions]
+    return PageSelection(rows, total, start, page_positions)
@@ -0,0 +1,233 @@
+"""
+Bounded-memory CSV ingestion
+Reads a source CSV in fixed-size chunks with fixed source dtypes, runs the
+dataset's enhance and schema steps on each chunk, and appends the result
+into column storage preallocated from a newline count of the file, so
+peak memory is the final frame plus one chunk rather than several copies
+of the whole file. Categorical columns are merged into one dictionary as
+chunks arrive. Independent source files are ingested in parallel.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import schemas
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "200000"))
+# Source files parsed at once; the C parser releases the GIL while tokenizing
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+DATE_FORMAT = "%m/%d/%Y"
+COUNT_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Dates in the extracts' MM/DD/YYYY format, inferring the format only for values that do not match"""
+    # Extracts repeat a few thousand distinct dates, so each is parsed once
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.to_datetime(uniques, format=DATE_FORMAT, errors='coerce')
+    missed = parsed.isna() & (uniques.astype(str).str.strip() != '')
+    if missed.any():
+        parsed[missed] = pd.to_datetime(uniques[missed], format='mixed', errors='coerce')
+    result = parsed.to_numpy().take(codes)
+    result[codes == -1] = np.datetime64('NaT')
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def source_dtypes(name: str) -> Dict[str, str]:
+    """Fixed parse dtypes for a dataset's declared columns, so every chunk parses alike"""
+    schema = schemas.DATASET_SCHEMAS.get(name)
+    if schema is None:
+        return {}
+    dtypes = {col: 'float64' for col in schema['float32']}
+    # Read as text; the schema turns them into categories after enhancement
+    dtypes.update({col: 'str' for col in schema['categories']})
+    return dtypes
+
+
+def estimate_rows(path: Path) -> int:
+    """Data rows in a CSV, counted as newlines (exact unless fields contain line breaks)"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as handle:
+        while True:
+            block = handle.read(COUNT_BLOCK_BYTES)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+class NumpyColumn:
+    """Preallocated array for a column with a NumPy dtype"""
+
+    def __init__(self, dtype, capacity: int):
+        self.values = np.empty(capacity, dtype=dtype)
+
+    def put(self, start: int, series: pd.Series) -> bool:
+        array = series.to_numpy()
+        dtype = np.result_type(self.values.dtype, array.dtype)
+        if dtype == object:
+            return False
+        if dtype != self.values.dtype:
+            # e.g. an integer column whose later chunk has missing values
+            self.values = self.values.astype(dtype)
+        self.values[start:start + len(array)] = array
+        return True
+
+    def grow(self, capacity: int):
+        values = np.empty(capacity, dtype=self.values.dtype)
+        values[:len(self.values)] = self.values
+        self.values = values
+
+    def finish(self, rows: int):
+        return self.values[:rows]
+
+
+class CategoricalColumn:
+    """Preallocated codes plus one category dictionary shared by all chunks"""
+
+    def __init__(self, capacity: int):
+        self.codes = np.full(capacity, -1, dtype=np.int32)
+        self.categories = pd.Index([])
+        # Kept when every chunk has the same fixed dtype, e.g. ordered gift bands
+        self.dtype: Optional[pd.CategoricalDtype] = None
+        self.chunks = 0
+
+    def put(self, start: int, series: pd.Series) -> bool:
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            return False
+        self.dtype = series.dtype if self.chunks == 0 or series.dtype == self.dtype else None
+        self.chunks += 1
+        chunk_categories = series.cat.categories
+        new = chunk_categories.difference(self.categories)
+        if len(new):
+            self.categories = self.categories.append(new)
+        mapping = np.append(self.categories.get_indexer(chunk_categories), -1).astype(np.int32)
+        # Code -1 (missing) indexes the trailing -1
+        self.codes[start:start + len(series)] = mapping[series.cat.codes.to_numpy()]
+        return True
+
+    def grow(self, capacity: int):
+        codes = np.full(capacity, -1, dtype=np.int32)
+        codes[:len(self.codes)] = self.codes
+        self.codes = codes
+
+    def finish(self, rows: int):
+        if self.dtype is not None:
+            # Codes were assigned in the shared dtype's own category order
+            return pd.Categorical.from_codes(self.codes[:rows], dtype=self.dtype)
+        column = pd.Categorical.from_codes(self.codes[:rows], categories=self.categories)
+        # Sorted like a single astype('category') over the whole column
+        try:
+            return column.reorder_categories(self.categories.sort_values())
+        except TypeError:
+            return column
+
+
+class ChunkedColumn:
+    """Extension and object columns, concatenated once at the end"""
+
+    def __init__(self):
+        self.parts: List[pd.Series] = []
+
+    def put(self, start: int, series: pd.Series) -> bool:
+        self.parts.append(series.reset_index(drop=True))
+        return True
+
+    def grow(self, capacity: int):
+        pass
+
+    def finish(self, rows: int):
+        return pd.concat(self.parts, ignore_index=True) if self.parts else pd.Series([], dtype=object)
+
+
+class FrameBuilder:
+    """Appends enhanced chunks into column storage sized for the expected rows"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        self.rows = 0
+        self.columns: Dict[str, object] = {}
+
+    def _column_for(self, series: pd.Series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return CategoricalColumn(self.capacity)
+        if isinstance(series.dtype, np.dtype) and series.dtype != object:
+            return NumpyColumn(series.dtype, self.capacity)
+        return ChunkedColumn()
+
+    def _to_chunked(self, name: str) -> ChunkedColumn:
+        """Fall back to concatenation when a column's chunks do not share a storable type"""
+        chunked = ChunkedColumn()
+        if self.rows:
+            chunked.parts.append(pd.Series(self.columns[name].finish(self.rows)))
+        self.columns[name] = chunked
+        return chunked
+
+    def append(self, chunk: pd.DataFrame):
+        n = len(chunk)
+        if self.rows + n > self.capacity:
+            self.capacity = max(self.rows + n, int(self.capacity * 1.5))
+            for column in self.columns.values():
+                column.grow(self.capacity)
+
+        if not self.columns:
+            self.columns = {name: self._column_for(chunk[name]) for name in chunk.columns}
+        elif list(chunk.columns) != list(self.columns):
+            # Enhancement failed or differed on this chunk; keep the first chunk's columns
+            logger.warning(f"Chunk columns differ from the first chunk: {sorted(set(chunk.columns) ^ set(self.columns))}")
+            chunk = chunk.reindex(columns=list(self.columns))
+
+        for name, column in list(self.columns.items()):
+            if not column.put(self.rows, chunk[name]):
+                self._to_chunked(name).put(self.rows, chunk[name])
+        self.rows += n
+
+    def finish(self) -> pd.DataFrame:
+        return pd.DataFrame({name: column.finish(self.rows) for name, column in self.columns.items()}, copy=False)
+
+
+def read_chunked(name: str, path: Path, enhance: Callable[[pd.DataFrame], pd.DataFrame],
+                 chunk_rows: Optional[int] = None) -> pd.DataFrame:
+    """Parse, enhance and compact a CSV one chunk at a time"""
+    builder = FrameBuilder(estimate_rows(path))
+    reader = pd.read_csv(path, chunksize=chunk_rows or CHUNK_ROWS, dtype=source_dtypes(name))
+    with reader:
+        while True:
+            with telemetry.stage("csv_parse"):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            with telemetry.stage(f"enhance.{name}"):
+                chunk = enhance(chunk)
+            with telemetry.stage("apply_schema"):
+                chunk = schemas.apply_schema(name, chunk)
+            builder.append(chunk)
+
+    with telemetry.stage("assemble"):
+        df = builder.finish()
+    # Categories were merged across chunks; the schema makes any fallback columns compact again
+    return schemas.apply_schema(name, df)
+
+
+def ingest_parallel(jobs: Dict[str, Callable[[], object]]) -> Dict[str, object]:
+    """Run independent load jobs on up to INGEST_WORKERS threads; results keyed like jobs"""
+    if len(jobs) <= 1 or INGEST_WORKERS <= 1:
+        return {name: job() for name, job in jobs.items()}
+    with ThreadPoolExecutor(max_workers=min(INGEST_WORKERS, len(jobs)), thread_name_prefix="ingest") as pool:
+        futures = {name: pool.submit(job) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -3,39 +3,55 @@ CommMob Data Analytics Backend
 Advanced Python backend with Cloudflare AI integration
 """
 
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import pandas as pd
 import numpy as np
 import asyncio
+import hashlib
 import json
 import os
+from functools import partial
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import logging
 from pathlib import Path
-
-# AI and ML imports
-import cloudflare
-from transformers import pipeline
-import torch
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-import plotly.graph_objects as go
-import plotly.express as px
-
-# Geographic analysis
-import geopandas as gpd
-from shapely.geometry import Point
-import folium
+from types import SimpleNamespace
 
 # Real-time features
 from collections import defaultdict
 import redis
-import socketio
+
+# Local modules
+import snapshot_cache
+import schemas
+from filter_index import build_filter_indexes, match_positions, select_page
+from encoding import frame_response
+import export_engine
+from spatial_index import SPATIAL_DATASETS, SpatialIndexCache
+from map_tiles import MAX_TILE_ZOOM, MIN_TILE_ZOOM, TileService
+from temporal import GRANULARITIES, build_temporal_rollups, select_periods, series_dict
+from aggregate_cube import build_cubes
+from response_cache import ResponseCache
+from clustering import DEFAULT_CLUSTERS, MAX_CLUSTERS, ClusteringService
+from pagination import ROW_KEY, InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint, parse_fields
+from capabilities import CapabilityRegistry, CapabilityUnavailable
+from broadcast_hub import BroadcastHub
+from fundraising import build_summaries
+from query_engine import InvalidQuery, QueryEngine
+from sketches import DEFAULT_QUANTILES, build_sketches
+import telemetry
+from ingest import ingest_parallel, parse_dates, read_chunked
+from sentiment_service import SentimentService, attach_scores
+from ai_gateway import AIGateway, GatewayUnavailable, RateLimited, StubBackend, WorkersAIBackend, parse_insights
+import httpx
+from executors import ComputeCancelled, ComputeExecutor, ComputeRejected
+from data_watcher import (
+    APPENDED, MISSING, UNCHANGED, DataWatcher, detect_change, read_appended, scan_source, source_changes
+)
+import shared_data
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -44,6 +60,24 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Response cache for read endpoints (registered before CORS so cached replies get CORS headers)
+response_cache = ResponseCache(
+    cached_prefixes=[
+        "/api/dashboard/metrics",
+        "/api/analytics/",
+        "/api/volunteers",
+        "/api/applicants",
+        "/api/cube/",
+        "/api/map/tiles/",
+        "/api/geo/",
+        "/api/donors/",
+        "/api/biomed/",
+        "/api/metrics/"
+    ],
+    ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+)
+app.middleware("http")(response_cache.middleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -53,81 +87,328 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics (outermost, so cached replies and CORS preflights are measured too)
+app.add_middleware(telemetry.MetricsMiddleware, routes=app.router.routes)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global variables
 data_cache = {}
+filter_indexes = {}
+spatial_indexes = SpatialIndexCache()
+# Incremented on every load so derived caches can key on it
+data_version = 0
+clustering = ClusteringService()
+map_tiles = TileService()
+# Ad-hoc group-by queries over the live frames
+query_engine = QueryEngine(threads=int(os.getenv("QUERY_THREADS", "0")))
+temporal_rollups = {}
+aggregate_cubes = {}
+fundraising_summaries = {}
+# Mergeable quantile, distinct-count and top-k sketches per dataset
+sketches = {}
+# Parsed frames and source file states of the live version, reused by incremental reloads
+base_frames = {}
+source_states = {}
+data_load_info = {}
+reload_lock = None
+data_watcher = None
 websocket_connections = []
 redis_client = None
 
-# Initialize Cloudflare AI
-cloudflare_client = None
-if os.getenv("CLOUDFLARE_API_TOKEN"):
-    cloudflare_client = cloudflare.Cloudflare(
-        api_token=os.getenv("CLOUDFLARE_API_TOKEN")
+# Cloudflare Workers AI (or the local stub) behind the AI gateway, created on startup
+ai_gateway = None
+
+# Heavy ML, geo and plotting dependencies are loaded on first use
+def load_sklearn():
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.decomposition import PCA
+    from sklearn.neighbors import BallTree
+    return SimpleNamespace(
+        KMeans=KMeans, MiniBatchKMeans=MiniBatchKMeans, StandardScaler=StandardScaler,
+        PCA=PCA, BallTree=BallTree
     )
 
-# Initialize ML models
-sentiment_analyzer = None
-try:
-    sentiment_analyzer = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest")
-except Exception as e:
-    logger.warning(f"Could not load sentiment analyzer: {e}")
+def load_geo():
+    import geopandas as gpd
+    from shapely.geometry import Point
+    import folium
+    return SimpleNamespace(gpd=gpd, Point=Point, folium=folium)
 
-# WebSocket manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+def load_plotly():
+    import plotly.graph_objects as go
+    import plotly.express as px
+    return SimpleNamespace(go=go, px=px)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+def load_socketio():
+    import socketio
+    return socketio
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+def load_sentiment_analyzer():
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest")
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+capabilities = CapabilityRegistry()
+capabilities.register("sklearn", load_sklearn, "scikit-learn clustering and preprocessing")
+capabilities.register("geo", load_geo, "geopandas, shapely and folium")
+capabilities.register("plotly", load_plotly, "plotly figures")
+capabilities.register("socketio", load_socketio, "python-socketio server")
+capabilities.register("sentiment_analyzer", load_sentiment_analyzer, "RoBERTa sentiment pipeline")
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                self.active_connections.remove(connection)
+# Micro-batched inference around the sentiment pipeline
+sentiment = SentimentService(
+    lambda: capabilities.get("sentiment_analyzer"),
+    max_batch_size=int(os.getenv("SENTIMENT_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("SENTIMENT_MAX_WAIT_MS", "10")),
+    torch_threads=int(os.getenv("SENTIMENT_TORCH_THREADS", "2"))
+)
+sentiment_jobs = {}
+
+# Capabilities loaded in the background once the server is up
+WARMUP_CAPABILITIES = [
+    name.strip() for name in os.getenv("WARMUP_CAPABILITIES", "sklearn").split(",") if name.strip()
+]
+
+# Thread pool for CPU-heavy endpoints; lane -> (concurrent jobs, queued jobs)
+COMPUTE_LANES = {
+    "analytics": (2, 16),
+    "datasets": (4, 64),
+    "geo": (4, 64),
+    "query": (4, 64),
+    "tiles": (8, 128)
+}
+compute = ComputeExecutor(
+    max_workers=int(os.getenv("COMPUTE_THREADS", str(max(4, min(16, 2 * (os.cpu_count() or 1)))))),
+    lanes=COMPUTE_LANES
+)
+
+async def offload(lane, request, fn, *args):
+    """Run blocking work on the compute pool under the lane's limits"""
+    try:
+        return await compute.run(lane, request, fn, *args)
+    except ComputeRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ComputeCancelled as e:
+        raise HTTPException(status_code=499, detail=str(e))
 
-manager = ConnectionManager()
 
 # Data loading functions
 def load_data():
     """Load and cache CSV data"""
-    global data_cache
-    
     try:
-        # Load volunteer data
-        volunteer_path = Path("data/Volunteer 2025.csv")
-        if volunteer_path.exists():
-            data_cache['volunteers'] = pd.read_csv(volunteer_path)
-            logger.info(f"Loaded {len(data_cache['volunteers'])} volunteer records")
-        
-        # Load applicant data
-        applicant_path = Path("data/Applicants 2025.csv")
-        if applicant_path.exists():
-            data_cache['applicants'] = pd.read_csv(applicant_path)
-            logger.info(f"Loaded {len(data_cache['applicants'])} applicant records")
-        
-        # Process and enhance data
-        if 'volunteers' in data_cache:
-            data_cache['volunteers'] = enhance_volunteer_data(data_cache['volunteers'])
-        
-        if 'applicants' in data_cache:
-            data_cache['applicants'] = enhance_applicant_data(data_cache['applicants'])
-            
+        publish_data_snapshot(build_data_snapshot(base_frames, source_states, data_version + 1))
     except Exception as e:
         logger.error(f"Error loading data: {e}")
 
+async def reload_data(force=False):
+    """Build the next data version off the event loop, then swap it in"""
+    async with reload_lock:
+        if not force and not await asyncio.to_thread(data_changes):
+            return
+        snapshot = await asyncio.to_thread(build_data_snapshot, base_frames, source_states, data_version + 1)
+        publish_data_snapshot(snapshot)
+
+def data_changes():
+    """Changed sources, or for attached workers a newer shared version"""
+    if shared_data.is_enabled() and not shared_data.try_become_loader():
+        handle = shared_data.current_handle()
+        if handle is not None and handle["version"] != data_version:
+            return {"shared": handle["version"]}
+        return {}
+    return source_changes({name: path for name, (path, _) in DATA_SOURCES.items()}, source_states)
+
+def build_data_snapshot(previous_frames, previous_states, version):
+    """Load the next version's frames, from sources or the shared data plane, and derive every index"""
+    frames = None
+    if shared_data.is_enabled() and not shared_data.try_become_loader():
+        # Another worker loads the data; attach to its memory-mapped copy
+        handle = shared_data.wait_for_handle(SHARED_ATTACH_TIMEOUT)
+        if handle is not None:
+            frames = shared_data.attach(handle)
+            states, modes = {}, {name: 'shared' for name in frames}
+            version = handle["version"]
+        else:
+            logger.warning(f"No shared data published within {SHARED_ATTACH_TIMEOUT}s, loading privately")
+    
+    if frames is None:
+        frames, states, modes = load_frames(previous_frames, previous_states)
+        if shared_data.is_loader() and shared_data.is_enabled():
+            # Versions keep increasing across loader restarts so workers never go backwards
+            published = shared_data.read_handle()
+            version = max(version, published["version"] + 1 if published else 0)
+            handle = shared_data.publish(version, frames, source_signature())
+            frames = shared_data.attach(handle)
+    
+    return derive_snapshot(frames, states, modes, version)
+
+def load_frames(previous_frames, previous_states):
+    """Parse changed sources, only appended rows when files grew, and reuse the rest"""
+    frames, states, modes, jobs = {}, {}, {}, {}
+    for name, (path, enhance) in DATA_SOURCES.items():
+        change = detect_change(previous_states.get(name), path)
+        if change == MISSING:
+            continue
+        if change == UNCHANGED and name in previous_frames:
+            frames[name], states[name], modes[name] = previous_frames[name], previous_states[name], 'reused'
+        elif change == APPENDED and name in previous_frames:
+            jobs[name] = partial(append_dataset, name, previous_frames[name], previous_states[name], enhance)
+            modes[name] = 'appended'
+        else:
+            jobs[name] = partial(load_dataset, name, path, enhance)
+            modes[name] = 'full'
+    
+    # Independent sources are parsed in parallel
+    for name, (df, state) in ingest_parallel(jobs).items():
+        frames[name], states[name] = df, state
+    
+    for name in DATA_SOURCES:
+        if name in frames:
+            logger.info(f"Loaded {len(frames[name])} {name} records ({modes[name]})")
+    return frames, states, modes
+
+def derive_snapshot(frames, states, modes, version):
+    """Derived columns and indexes for one data version"""
+    # Derived columns go on shallow copies so frames of the live version are never mutated
+    data = {name: df.copy(deep=False) for name, df in frames.items()}
+    
+    # Time-relative fields are not stored in snapshots
+    if 'volunteers' in data:
+        data['volunteers'] = refresh_volunteer_recency(data['volunteers'])
+    
+    # Sentiment labels scored offline by the bulk job
+    for name in data:
+        data[name] = attach_scores(name, data[name])
+    
+    memory_bytes = {}
+    for name, df in data.items():
+        memory_bytes[name] = schemas.memory_report(df)['total_bytes']
+        logger.info(f"{name} frame uses {memory_bytes[name] / 1e6:.1f} MB")
+    
+    derived = {}
+    with telemetry.stage("derive.filter_indexes"):
+        # Index filterable columns for the list endpoints
+        derived['filter_indexes'] = build_filter_indexes(data, key_column=ROW_KEY)
+    with telemetry.stage("derive.map_tiles"):
+        # Precompute map density aggregates for every zoom level
+        derived['map_tiles'] = map_tiles.build(data)
+    with telemetry.stage("derive.temporal_rollups"):
+        # Precompute weekly, monthly and quarterly applicant trends
+        derived['temporal_rollups'] = build_temporal_rollups(data.get('applicants'))
+    with telemetry.stage("derive.aggregate_cubes"):
+        # Materialize the state x status x workflow x month aggregate cube
+        derived['aggregate_cubes'] = build_cubes(data)
+    with telemetry.stage("derive.fundraising_summaries"):
+        # Donor and blood-drive totals served to the executive dashboard
+        derived['fundraising_summaries'] = build_summaries(data)
+    with telemetry.stage("derive.sketches"):
+        # Updated from the previous version's sketches when a source only grew
+        derived['sketches'] = build_sketches(data, modes, sketches)
+    
+    return SimpleNamespace(
+        version=version,
+        frames=frames,
+        states={name: state for name, state in states.items() if state is not None},
+        modes=modes,
+        data=data,
+        memory_bytes=memory_bytes,
+        loaded_at=datetime.now().isoformat(),
+        **derived
+    )
+
+def publish_data_snapshot(snapshot):
+    """Swap in a new data version in one step on the event loop thread.
+    
+    Handlers read these globals without awaiting in between, so each request
+    sees a single consistent version.
+    """
+    global data_cache, filter_indexes, temporal_rollups, aggregate_cubes, data_version
+    global fundraising_summaries, sketches
+    global base_frames, source_states, data_load_info
+    
+    data_cache = snapshot.data
+    filter_indexes = snapshot.filter_indexes
+    temporal_rollups = snapshot.temporal_rollups
+    aggregate_cubes = snapshot.aggregate_cubes
+    fundraising_summaries = snapshot.fundraising_summaries
+    sketches = snapshot.sketches
+    map_tiles.install(snapshot.map_tiles, snapshot.version)
+    query_engine.install(snapshot.data, snapshot.version)
+    base_frames = snapshot.frames
+    source_states = snapshot.states
+    data_load_info = {"loaded_at": snapshot.loaded_at, "modes": snapshot.modes}
+    data_version = snapshot.version
+    
+    telemetry.record_frames(snapshot.memory_bytes, {name: len(df) for name, df in data_cache.items()})
+    
+    # Cached responses from earlier data are no longer valid
+    response_cache.set_version(f"{data_version}-{source_signature()}")
+    broadcast_hub.notify()
+    logger.info(f"Published data version {data_version}")
+
+def source_signature():
+    """Short hash of the data files and pipeline versions, shared by workers loading the same data"""
+    parts = [str(snapshot_cache.SNAPSHOT_FORMAT_VERSION)]
+    for path in sorted(Path("data").glob("*.csv")):
+        stat = path.stat()
+        parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+def load_dataset(name, path, enhance):
+    """Load an enhanced dataset and the source state it was parsed from"""
+    before = scan_source(path, 0)
+    df = read_dataset(name, path, enhance)
+    state = scan_source(path, len(df))
+    # A file that changed while being read is reloaded in full on the next poll
+    if (state.size, state.mtime_ns) != (before.size, before.mtime_ns):
+        state = None
+    return df, state
+
+def parse_dataset(name, path, enhance):
+    """Parse, enhance and compact a source CSV in bounded-memory chunks"""
+    return read_chunked(name, path, enhance)
+
+def enhance_frame(name, df, enhance):
+    with telemetry.stage(f"enhance.{name}"):
+        df = enhance(df)
+    with telemetry.stage("apply_schema"):
+        return schemas.apply_schema(name, df)
+
+def read_dataset(name, path, enhance):
+    """Load an enhanced dataset from its snapshot, reparsing the CSV only when it changed"""
+    if not snapshot_cache.is_available():
+        return parse_dataset(name, path, enhance)
+    
+    fingerprint = snapshot_cache.file_fingerprint(path)
+    with telemetry.stage("snapshot_load"):
+        df = snapshot_cache.load_snapshot(name, fingerprint)
+    if df is not None:
+        return df
+    
+    df = parse_dataset(name, path, enhance)
+    with telemetry.stage("snapshot_save"):
+        snapshot_cache.save_snapshot(name, fingerprint, df)
+    return df
+
+def append_dataset(name, frame, state, enhance):
+    """Parse and enhance only the rows appended to a source file"""
+    with telemetry.stage("csv_parse_append"):
+        delta, state = read_appended(state)
+    if delta is None:
+        return frame, state
+    
+    delta = enhance_frame(name, delta, enhance)
+    # Categories differ between the two parts, so the schema is reapplied to the result
+    df = schemas.apply_schema(name, pd.concat([frame, delta], ignore_index=True))
+    logger.info(f"Appended {len(delta)} {name} rows")
+    
+    if snapshot_cache.is_available() and state.offset == state.size:
+        with telemetry.stage("snapshot_save"):
+            snapshot_cache.save_snapshot(name, snapshot_cache.file_fingerprint(state.path), df)
+    return df, state
+
 def enhance_volunteer_data(df):
     """Enhance volunteer data with computed fields"""
     try:
@@ -144,15 +425,27 @@ def enhance_volunteer_data(df):
             'Event Based Volunteer': 'Event-Based'
         }).fillna('Other')
         
-        # Calculate days since last activity
-        df['Last Login'] = pd.to_datetime(df['Last Login'], errors='coerce')
-        df['days_since_login'] = (datetime.now() - df['Last Login']).dt.days
+        # Convert dates
+        date_columns = ['Last Login', 'Vol Start Dt', 'Volunteer Since Date']
+        for col in date_columns:
+            if col in df.columns:
+                df[col] = parse_dates(df[col])
         
         return df
     except Exception as e:
         logger.error(f"Error enhancing volunteer data: {e}")
         return df
 
+def refresh_volunteer_recency(df):
+    """Recompute fields relative to the current time"""
+    try:
+        # Calculate days since last activity
+        df['days_since_login'] = schemas.to_small_int((datetime.now() - df['Last Login']).dt.days)
+        return df
+    except Exception as e:
+        logger.error(f"Error refreshing volunteer recency: {e}")
+        return df
+
 def enhance_applicant_data(df):
     """Enhance applicant data with computed fields"""
     try:
@@ -163,7 +456,7 @@ def enhance_applicant_data(df):
         # Convert dates
         date_columns = ['Application Dt', 'Vol Start Dt', 'Inactive Dt']
         for col in date_columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = parse_dates(df[col])
         
         # Calculate processing times
         df['days_to_start'] = (df['Vol Start Dt'] - df['Application Dt']).dt.days
@@ -181,23 +474,133 @@ def enhance_applicant_data(df):
         logger.error(f"Error enhancing applicant data: {e}")
         return df
 
+GIFT_BANDS = [5000, 10000, 25000, 50000, np.inf]
+GIFT_BAND_LABELS = ['5K-10K', '10K-25K', '25K-50K', '50K+']
+
+def enhance_donor_data(df):
+    """Enhance major donor data with computed fields"""
+    try:
+        # Headers carry a byte-order mark and padding, e.g. ' Gift $ '
+        df.columns = df.columns.str.replace('\ufeff', '').str.strip()
+        
+        # Parse currency strings such as ' $24,000 ' in one vectorized pass
+        df['gift_amount'] = pd.to_numeric(
+            df['Gift $'].astype(str).str.replace(r'[$,\s]', '', regex=True), errors='coerce'
+        )
+        df['gift_band'] = pd.cut(df['gift_amount'], bins=[0] + GIFT_BANDS, labels=['<5K'] + GIFT_BAND_LABELS, right=False)
+        
+        # Coordinates use the same x/y names as the other datasets
+        df = df.rename(columns={'X': 'x', 'Y': 'y'})
+        df['x'] = pd.to_numeric(df['x'], errors='coerce')
+        df['y'] = pd.to_numeric(df['y'], errors='coerce')
+        
+        return df
+    except Exception as e:
+        logger.error(f"Error enhancing donor data: {e}")
+        return df
+
+BIOMED_COUNT_COLUMNS = ['Drives', 'RBC Products Collected', 'RBC Product Projection']
+
+def enhance_biomed_data(df):
+    """Enhance Biomed blood-drive data with computed fields"""
+    try:
+        df.columns = df.columns.str.replace('\ufeff', '').str.strip()
+        
+        # Counts may be formatted like '1,250'
+        for col in BIOMED_COUNT_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[,\s]', '', regex=True), errors='coerce')
+        
+        # Coordinates use the same x/y names as the other datasets
+        df = df.rename(columns={'Long': 'x', 'Lat': 'y'})
+        df['x'] = pd.to_numeric(df['x'], errors='coerce')
+        df['y'] = pd.to_numeric(df['y'], errors='coerce')
+        
+        return df
+    except Exception as e:
+        logger.error(f"Error enhancing biomed data: {e}")
+        return df
+
+# Source files and the enhance function applied to each
+DATA_SOURCES = {
+    'volunteers': (Path("data/Volunteer 2025.csv"), enhance_volunteer_data),
+    'applicants': (Path("data/Applicants 2025.csv"), enhance_applicant_data),
+    'donors': (Path("data/>$5K donors past 12 months.csv"), enhance_donor_data),
+    'biomed': (Path("data/Biomed.csv"), enhance_biomed_data)
+}
+
+# Seconds between checks of the data directory (0 disables hot reload)
+DATA_WATCH_INTERVAL = float(os.getenv("DATA_WATCH_INTERVAL", "60"))
+# With DATA_PLANE=shared: seconds a worker waits for the loader's first version,
+# and seconds between checks for newer versions when hot reload is off
+SHARED_ATTACH_TIMEOUT = float(os.getenv("SHARED_ATTACH_TIMEOUT", "120"))
+SHARED_DATA_POLL = float(os.getenv("SHARED_DATA_POLL", "2"))
+
 # API Routes
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup"""
-    global redis_client
+    global redis_client, data_watcher, reload_lock, ai_gateway
     
     # Load data
     load_data()
     
+    # Pick up changed or appended extracts (or a newer shared version) without a restart
+    reload_lock = asyncio.Lock()
+    if DATA_WATCH_INTERVAL > 0 or shared_data.is_enabled():
+        data_watcher = DataWatcher(
+            changes=data_changes,
+            reload=reload_data,
+            interval_seconds=DATA_WATCH_INTERVAL if DATA_WATCH_INTERVAL > 0 else SHARED_DATA_POLL
+        )
+        app.state.watch_task = asyncio.create_task(data_watcher.run())
+    
+    # Pooled, cached access to the AI backend
+    backend = build_ai_backend()
+    if backend is not None:
+        ai_gateway = AIGateway(
+            backend,
+            timeout_seconds=AI_TIMEOUT_SECONDS,
+            cache_ttl_seconds=float(os.getenv("AI_CACHE_TTL", "900")),
+            stale_ttl_seconds=float(os.getenv("AI_STALE_TTL", "86400")),
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", "4")),
+            requests_per_minute=float(os.getenv("AI_REQUESTS_PER_MINUTE", "60"))
+        )
+        logger.info(f"AI gateway using {backend.name} backend")
+    
+    # Component counters exported as gauges on /metrics
+    telemetry.register_component("response_cache", response_cache.describe)
+    telemetry.register_component("compute", compute.describe)
+    telemetry.register_component("websockets", broadcast_hub.describe)
+    telemetry.register_component("sentiment", sentiment.describe)
+    telemetry.register_component("query_engine", query_engine.describe)
+    telemetry.register_component("sketches", describe_sketches)
+    if ai_gateway is not None:
+        telemetry.register_component("ai_gateway", ai_gateway.describe)
+    
+    # Push metric updates to WebSocket clients
+    app.state.broadcast_task = asyncio.create_task(broadcast_hub.run())
+    
+    # Warm up heavy capabilities without delaying startup
+    app.state.warmup_task = asyncio.create_task(capabilities.warm_up(WARMUP_CAPABILITIES))
+    
     # Initialize Redis if available
     try:
-        redis_client = redis.Redis(host='localhost', port=6379, db=0)
+        redis_client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
         redis_client.ping()
+        response_cache.attach_redis(redis_client)
         logger.info("Redis connected successfully")
-    except:
+    except Exception:
+        redis_client = None
         logger.warning("Redis not available, using in-memory cache")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work"""
+    compute.shutdown()
+    if ai_gateway is not None:
+        await ai_gateway.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -220,33 +623,122 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "data_loaded": len(data_cache) > 0,
-        "cloudflare_ai": cloudflare_client is not None,
-        "ml_models": sentiment_analyzer is not None
+        "cloudflare_ai": ai_gateway is not None and ai_gateway.backend.name == "workers_ai",
+        "ml_models": capabilities.is_ready("sentiment_analyzer"),
+        "capabilities": capabilities.status(),
+        "data_version": data_version,
+        "response_cache": response_cache.describe(),
+        "compute": compute.describe(),
+        "websockets": broadcast_hub.describe(),
+        "ai_gateway": ai_gateway.describe() if ai_gateway else None,
+        "sentiment": sentiment.describe(),
+        "query_engine": query_engine.describe(),
+        "sketches": describe_sketches()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    if not telemetry.is_available():
+        raise HTTPException(status_code=503, detail="prometheus-client is not installed")
+    body, content_type = telemetry.exposition()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/data/memory")
+async def get_data_memory():
+    """Memory report for each cached dataset"""
+    return {
+        "datasets": {name: schemas.memory_report(df) for name, df in data_cache.items()},
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/api/data/version")
+async def get_data_version():
+    """Current data version and the state of each source file"""
+    return {
+        "data_version": data_version,
+        **data_load_info,
+        "sources": {name: state.describe() for name, state in source_states.items()},
+        "data_plane": {
+            "mode": "shared" if shared_data.is_enabled() else "private",
+            "loader": shared_data.is_loader() if shared_data.is_enabled() else True,
+            "handle": shared_data.read_handle() if shared_data.is_enabled() else None
+        },
+        "watcher": {
+            "interval_seconds": data_watcher.interval_seconds,
+            "reloads": data_watcher.reloads,
+            "last_error": data_watcher.last_error
+        } if data_watcher else None
+    }
+
+@app.post("/api/data/reload")
+async def trigger_data_reload():
+    """Reload changed data sources now instead of waiting for the watcher"""
+    try:
+        await reload_data()
+        return await get_data_version()
+    except Exception as e:
+        logger.error(f"Error reloading data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def dashboard_metrics():
+    """Headline metrics answered from the aggregate cubes"""
+    volunteer_cube = aggregate_cubes.get('volunteers')
+    applicant_cube = aggregate_cubes.get('applicants')
+    
+    total_volunteers = volunteer_cube.rows if volunteer_cube else 0
+    total_applicants = applicant_cube.rows if applicant_cube else 0
+    avg_days_to_start = 0
+    if applicant_cube:
+        avg_days_to_start = applicant_cube.total()['days_to_start_mean'] or 0
+    
+    donors = fundraising_summaries.get('donors', {})
+    biomed = fundraising_summaries.get('biomed', {})
+    
+    # Percentiles merged from the per-state sketches instead of sorting the frames
+    processing, inactive, recency = {}, {}, {}
+    if 'applicants' in sketches:
+        processing = sketches['applicants'].quantiles('days_to_start', (0.5, 0.9))
+        inactive = sketches['applicants'].quantiles('days_to_inactive', (0.5, 0.9))
+    if 'volunteers' in sketches:
+        recency = sketches['volunteers'].quantiles('days_since_login', (0.5, 0.9))
+    
+    return {
+        "total_volunteers": total_volunteers,
+        "total_applicants": total_applicants,
+        "active_volunteers": volunteer_cube.total({'status': 'General Volunteer'})['count'] if volunteer_cube else 0,
+        "conversion_rate": round((total_volunteers / total_applicants * 100), 2) if total_applicants > 0 else 0,
+        "geographic_coverage": volunteer_cube.distinct('state') if volunteer_cube else 0,
+        "avg_days_to_start": avg_days_to_start,
+        "median_days_to_start": processing.get('p50'),
+        "p90_days_to_start": processing.get('p90'),
+        "median_days_to_inactive": inactive.get('p50'),
+        "p90_days_to_inactive": inactive.get('p90'),
+        "median_days_since_login": recency.get('p50'),
+        "p90_days_since_login": recency.get('p90'),
+        "total_donors": donors.get('total_donors', 0),
+        "total_donations": donors.get('total_donations', 0),
+        "avg_donation_amount": donors.get('average_gift', 0),
+        "top_donation_amount": donors.get('top_gift', 0),
+        "total_blood_drives": biomed.get('total_blood_drives', 0),
+        "total_products_collected": biomed.get('total_products_collected', 0),
+        "avg_products_per_drive": biomed.get('avg_products_per_drive', 0),
+        "completed_drives": biomed.get('completed_drives', 0)
     }
 
 @app.get("/api/dashboard/metrics")
 async def get_dashboard_metrics():
     """Get dashboard metrics with AI insights"""
     try:
-        volunteers = data_cache.get('volunteers', pd.DataFrame())
-        applicants = data_cache.get('applicants', pd.DataFrame())
-        
-        if volunteers.empty and applicants.empty:
+        if not aggregate_cubes:
             raise HTTPException(status_code=404, detail="No data available")
         
         # Calculate basic metrics
-        metrics = {
-            "total_volunteers": len(volunteers),
-            "total_applicants": len(applicants),
-            "active_volunteers": len(volunteers[volunteers['Current Status'] == 'General Volunteer']),
-            "conversion_rate": round((len(volunteers) / len(applicants) * 100), 2) if len(applicants) > 0 else 0,
-            "geographic_coverage": volunteers['State'].nunique() if not volunteers.empty else 0,
-            "avg_days_to_start": round(applicants['days_to_start'].mean(), 1) if not applicants.empty else 0
-        }
+        metrics = dashboard_metrics()
         
-        # Generate AI insights if Cloudflare AI is available
+        # Generate AI insights if an AI backend is configured
         ai_insights = None
-        if cloudflare_client:
+        if ai_gateway:
             try:
                 ai_insights = await generate_ai_insights(metrics)
             except Exception as e:
@@ -258,282 +750,845 @@ async def get_dashboard_metrics():
             "timestamp": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting dashboard metrics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def fundraising_response(name, label):
+    summary = fundraising_summaries.get(name)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No {label} data available")
+    return {**summary, "data_version": data_version, "timestamp": datetime.now().isoformat()}
+
+@app.get("/api/donors/summary")
+async def get_donor_summary():
+    """Precomputed major-donor totals, gift distribution and largest gifts"""
+    return fundraising_response('donors', 'donor')
+
+@app.get("/api/biomed/summary")
+async def get_biomed_summary():
+    """Precomputed blood-drive totals and breakdowns by status, account type, state and year"""
+    return fundraising_response('biomed', 'Biomed')
+
+# Sketch endpoints
+MAX_SKETCH_QUANTILES = 10
+
+def parse_quantiles(q):
+    """Quantiles from a comma-separated query parameter, e.g. 0.5,0.9,0.99"""
+    if not q:
+        return DEFAULT_QUANTILES
+    try:
+        qs = tuple(float(part) for part in q.split(',') if part.strip())
+    except ValueError:
+        qs = ()
+    if not qs or len(qs) > MAX_SKETCH_QUANTILES or any(not 0 <= value <= 1 for value in qs):
+        raise HTTPException(
+            status_code=400,
+            detail=f"q must list 1 to {MAX_SKETCH_QUANTILES} comma-separated numbers between 0 and 1"
+        )
+    return qs
+
+def dataset_sketches(dataset):
+    found = sketches.get(dataset)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"No sketches for '{dataset}'; available: {', '.join(sketches)}")
+    return found
+
+def parse_groups(states):
+    return [state.strip() for state in states.split(',') if state.strip()] if states else None
+
+def describe_sketches():
+    return {
+        "bytes": sum(found.memory_bytes() for found in sketches.values()),
+        "datasets": {
+            name: {"rows": found.rows, "groups": len(found.groups()), "bytes": found.memory_bytes()}
+            for name, found in sketches.items()
+        }
+    }
+
+@app.get("/api/metrics/sketches")
+async def get_sketch_summary(q: Optional[str] = None, top: int = 10):
+    """Approximate percentiles, distinct counts and top values of every sketched dataset"""
+    try:
+        qs = parse_quantiles(q)
+        if not 1 <= top <= 50:
+            raise HTTPException(status_code=400, detail="top must be between 1 and 50")
+        
+        return {
+            "datasets": {name: found.summary(qs, top) for name, found in sketches.items()},
+            "data_version": data_version,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error summarizing sketches: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/metrics/percentiles/{dataset}/{column}")
+async def get_sketch_percentiles(dataset: str, column: str, states: Optional[str] = None, q: Optional[str] = None):
+    """Percentiles of a day measure per state and merged over the selected states (a region)"""
+    try:
+        found = dataset_sketches(dataset)
+        if column not in found.quantile_sketches:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No percentile sketch for '{column}'; available: {', '.join(found.quantile_sketches)}"
+            )
+        qs = parse_quantiles(q)
+        selected = parse_groups(states)
+        per_group = found.quantile_sketches[column]
+        
+        return {
+            "dataset": dataset,
+            "column": column,
+            "group_by": found.definition['group'],
+            "states": selected,
+            "overall": found.quantiles(column, qs, selected),
+            "groups": {
+                label: found.quantiles(column, qs, [label])
+                for label in (selected or sorted(per_group)) if label in per_group
+            },
+            "data_version": data_version
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing percentiles for {dataset}.{column}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/metrics/distinct/{dataset}/{column}")
+async def get_sketch_distinct(dataset: str, column: str, states: Optional[str] = None):
+    """Approximate distinct values of a column, overall or over the selected states"""
+    try:
+        found = dataset_sketches(dataset)
+        if column not in found.distinct_sketches:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No distinct-count sketch for '{column}'; available: {', '.join(found.distinct_sketches)}"
+            )
+        selected = parse_groups(states)
+        
+        return {
+            "dataset": dataset,
+            "column": column,
+            "states": selected,
+            "distinct": found.distinct(column, selected),
+            "data_version": data_version
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error counting distinct {dataset}.{column}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/metrics/sketches/{dataset}/export")
+async def export_sketches(dataset: str):
+    """Serialized sketches, to be merged with DatasetSketches.from_dict(...).merge(...) elsewhere"""
+    found = dataset_sketches(dataset)
+    return {"data_version": data_version, "sketches": found.to_dict()}
+
+@app.get("/api/cube/{dataset}")
+async def get_cube_slice(
+    dataset: str,
+    state: Optional[str] = None,
+    status: Optional[str] = None,
+    workflow: Optional[str] = None,
+    month: Optional[str] = None,
+    group_by: Optional[str] = None
+):
+    """Drill-down slice of the aggregate cube, optionally grouped by dimensions"""
+    try:
+        cube = aggregate_cubes.get(dataset)
+        if cube is None:
+            raise HTTPException(status_code=404, detail=f"No aggregate cube for '{dataset}'")
+        
+        filters = {'state': state, 'status': status, 'workflow': workflow, 'month': month}
+        dimensions = [dim.strip() for dim in group_by.split(',') if dim.strip()] if group_by else []
+        unsupported = [dim for dim, value in filters.items() if value and dim not in cube.dimensions]
+        unsupported += [dim for dim in dimensions if dim not in cube.dimensions]
+        if unsupported:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{dataset} cube has no '{unsupported[0]}' dimension; available: {', '.join(cube.dimensions)}"
+            )
+        
+        return {
+            "dataset": dataset,
+            "dimensions": cube.dimensions,
+            "filters": {dim: value for dim, value in filters.items() if value},
+            "group_by": dimensions,
+            "rows": cube.slice(filters, dimensions),
+            "data_version": data_version
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error slicing {dataset} cube: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Largest page the list endpoints serve
+MAX_PAGE_SIZE = 10000
+
+def paginate_dataset(request, name, df, index, filters, limit, offset, fields, cursor):
+    """Build one list-endpoint page, resuming from an opaque cursor when given"""
+    try:
+        columns = parse_fields(fields, df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    fingerprint = filter_fingerprint(name, filters)
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, fingerprint)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # Apply filters and pagination through the inverted index
+    with telemetry.stage("filtering"):
+        page = select_page(df, index, filters, offset, limit, columns, after)
+    
+    next_cursor = None
+    if len(page.positions) > 0 and page.start + len(page.positions) < page.total and ROW_KEY in df.columns:
+        last_position = int(page.positions[-1])
+        next_cursor = encode_cursor(df[ROW_KEY].iat[last_position], last_position, fingerprint)
+    
+    return frame_response(request, {"data": page.rows}, {
+        "total": page.total,
+        "limit": limit,
+        "offset": page.start,
+        "next_cursor": next_cursor
+    })
+
 @app.get("/api/volunteers")
 async def get_volunteers(
-    limit: int = 100,
-    offset: int = 0,
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
     status: Optional[str] = None,
-    state: Optional[str] = None
+    state: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
-    """Get volunteer data with filtering"""
+    """Get volunteer data with filtering, field projection and cursor pagination"""
     try:
         volunteers = data_cache.get('volunteers', pd.DataFrame())
         
         if volunteers.empty:
             raise HTTPException(status_code=404, detail="No volunteer data available")
         
-        # Apply filters
-        filtered_data = volunteers.copy()
-        
-        if status:
-            filtered_data = filtered_data[filtered_data['Current Status'] == status]
-        
-        if state:
-            filtered_data = filtered_data[filtered_data['State'] == state]
-        
-        # Pagination
-        total = len(filtered_data)
-        paginated_data = filtered_data.iloc[offset:offset + limit]
-        
-        return {
-            "data": paginated_data.to_dict('records'),
-            "total": total,
-            "limit": limit,
-            "offset": offset
-        }
+        filters = {'Current Status': status, 'State': state}
+        return await offload(
+            "datasets", request, paginate_dataset,
+            request, 'volunteers', volunteers, filter_indexes.get('volunteers'), filters, limit, offset, fields, cursor
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting volunteers: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/applicants")
 async def get_applicants(
-    limit: int = 100,
-    offset: int = 0,
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
     status: Optional[str] = None,
-    workflow: Optional[str] = None
+    workflow: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
-    """Get applicant data with filtering"""
+    """Get applicant data with filtering, field projection and cursor pagination"""
     try:
         applicants = data_cache.get('applicants', pd.DataFrame())
         
         if applicants.empty:
             raise HTTPException(status_code=404, detail="No applicant data available")
         
-        # Apply filters
-        filtered_data = applicants.copy()
-        
-        if status:
-            filtered_data = filtered_data[filtered_data['Current Status'] == status]
-        
-        if workflow:
-            filtered_data = filtered_data[filtered_data['Workflow Type'] == workflow]
-        
-        # Pagination
-        total = len(filtered_data)
-        paginated_data = filtered_data.iloc[offset:offset + limit]
-        
-        return {
-            "data": paginated_data.to_dict('records'),
-            "total": total,
-            "limit": limit,
-            "offset": offset
-        }
+        filters = {'Current Status': status, 'Workflow Type': workflow}
+        return await offload(
+            "datasets", request, paginate_dataset,
+            request, 'applicants', applicants, filter_indexes.get('applicants'), filters, limit, offset, fields, cursor
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting applicants: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def geographic_analysis(request, volunteers, version, k, ml):
+    """Clustered volunteer locations with per-state counts"""
+    # Filter valid coordinates
+    geo_data = volunteers.dropna(subset=['x', 'y'])
+    
+    if geo_data.empty:
+        raise HTTPException(status_code=404, detail="No geographic data available")
+    
+    model = clustering.get(volunteers, version, k, ml)
+    
+    geo_data = geo_data.assign(cluster=model.labels)
+    
+    # State distribution
+    state_counts = geo_data['State'].value_counts()
+    state_distribution = state_counts[state_counts > 0].to_dict()
+    
+    return frame_response(request, {"geographic_data": geo_data}, {
+        "state_distribution": state_distribution,
+        "cluster_centers": model.centers.tolist(),
+        "clustering": model.summary(),
+        "total_locations": len(geo_data)
+    })
+
 @app.get("/api/analytics/geographic")
-async def get_geographic_analysis():
+async def get_geographic_analysis(request: Request, k: int = DEFAULT_CLUSTERS):
     """Get geographic analysis with clustering"""
     try:
+        if not 2 <= k <= MAX_CLUSTERS:
+            raise HTTPException(status_code=400, detail=f"k must be between 2 and {MAX_CLUSTERS}")
+        
         volunteers = data_cache.get('volunteers', pd.DataFrame())
+        version = data_version
         
         if volunteers.empty:
             raise HTTPException(status_code=404, detail="No volunteer data available")
         
-        # Filter valid coordinates
-        geo_data = volunteers.dropna(subset=['x', 'y'])
+        # Clustering is cached per data version and k; fits and encoding run off the event loop.
+        # sklearn is passed even on a cache hit: the model can be evicted while the request queues.
+        ml = await capabilities.aget("sklearn")
+        return await offload("analytics", request, geographic_analysis, request, volunteers, version, k, ml)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in geographic analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Spatial query endpoints
+MAX_SPATIAL_RESULTS = 5000
+
+async def spatial_dataset(request, dataset):
+    """Frame and spatial index for a dataset, or an HTTP error"""
+    if dataset not in SPATIAL_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset}'")
+    df = data_cache.get(dataset)
+    version = data_version
+    if df is None or df.empty:
+        raise HTTPException(status_code=404, detail=f"No {dataset} data available")
+    try:
+        ml = await capabilities.aget("sklearn")
+    except CapabilityUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Spatial index for {dataset} is not available: {e}")
+    # Built on the first query of each data version, off the event loop
+    index = await offload("geo", request, spatial_indexes.get, dataset, df, version, ml.BallTree)
+    return df, index
+
+def spatial_rows(df, positions, fields, distances=None):
+    """Materialize the matched rows (and requested columns), nearest first"""
+    try:
+        columns = parse_fields(fields, df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    column_positions = slice(None) if columns is None else [df.columns.get_loc(col) for col in columns]
+    rows = df.iloc[positions, column_positions]
+    if distances is not None:
+        rows = rows.assign(distance_miles=np.round(distances, 3))
+    return rows
+
+def radius_query(request, df, index, lat, lon, miles, limit, fields):
+    positions, distances = index.within_radius(lat, lon, miles)
+    rows = spatial_rows(df, positions[:limit], fields, distances[:limit])
+    
+    return frame_response(request, {"data": rows}, {
+        "total": len(positions),
+        "limit": limit,
+        "center": {"lat": lat, "lon": lon},
+        "miles": miles
+    })
+
+def bbox_query(request, df, index, bbox, limit, fields):
+    positions = index.within_bbox(*bbox)
+    rows = spatial_rows(df, positions[:limit], fields)
+    
+    return frame_response(request, {"data": rows}, {
+        "total": len(positions),
+        "limit": limit,
+        "bbox": bbox
+    })
+
+def nearest_query(request, df, index, lat, lon, k, fields):
+    positions, distances = index.nearest(lat, lon, k)
+    rows = spatial_rows(df, positions, fields, distances)
+    
+    return frame_response(request, {"data": rows}, {
+        "total": len(positions),
+        "center": {"lat": lat, "lon": lon},
+        "k": k
+    })
+
+def validate_point(lat, lon):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat must be within ±90 and lon within ±180")
+
+@app.get("/api/geo/{dataset}/radius")
+async def get_within_radius(
+    request: Request,
+    dataset: str,
+    lat: float,
+    lon: float,
+    miles: float = 25.0,
+    limit: int = 1000,
+    fields: Optional[str] = None
+):
+    """Rows within a radius (miles) of a point, nearest first"""
+    try:
+        validate_point(lat, lon)
+        if miles <= 0:
+            raise HTTPException(status_code=400, detail="miles must be positive")
+        limit = max(0, min(limit, MAX_SPATIAL_RESULTS))
         
-        if geo_data.empty:
-            raise HTTPException(status_code=404, detail="No geographic data available")
+        df, index = await spatial_dataset(request, dataset)
+        return await offload("geo", request, radius_query, request, df, index, lat, lon, miles, limit, fields)
         
-        # Perform clustering analysis
-        coordinates = geo_data[['x', 'y']].values
-        scaler = StandardScaler()
-        scaled_coords = scaler.fit_transform(coordinates)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in radius query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/geo/{dataset}/bbox")
+async def get_within_bbox(
+    request: Request,
+    dataset: str,
+    min_lon: float,
+    min_lat: float,
+    max_lon: float,
+    max_lat: float,
+    limit: int = 1000,
+    fields: Optional[str] = None
+):
+    """Rows inside a viewport bounding box"""
+    try:
+        validate_point(min_lat, min_lon)
+        validate_point(max_lat, max_lon)
+        if min_lat > max_lat:
+            raise HTTPException(status_code=400, detail="min_lat must not exceed max_lat")
+        limit = max(0, min(limit, MAX_SPATIAL_RESULTS))
         
-        # K-means clustering
-        kmeans = KMeans(n_clusters=5, random_state=42)
-        clusters = kmeans.fit_predict(scaled_coords)
+        df, index = await spatial_dataset(request, dataset)
+        bbox = [min_lon, min_lat, max_lon, max_lat]
+        return await offload("geo", request, bbox_query, request, df, index, bbox, limit, fields)
         
-        geo_data['cluster'] = clusters
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in bounding box query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/geo/{dataset}/nearest")
+async def get_nearest(
+    request: Request,
+    dataset: str,
+    lat: float,
+    lon: float,
+    k: int = 10,
+    fields: Optional[str] = None
+):
+    """The k rows nearest to a point, e.g. a disaster location"""
+    try:
+        validate_point(lat, lon)
+        if not 1 <= k <= MAX_SPATIAL_RESULTS:
+            raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_SPATIAL_RESULTS}")
         
-        # State distribution
-        state_distribution = geo_data['State'].value_counts().to_dict()
+        df, index = await spatial_dataset(request, dataset)
+        return await offload("geo", request, nearest_query, request, df, index, lat, lon, k, fields)
         
-        # Cluster centers
-        cluster_centers = scaler.inverse_transform(kmeans.cluster_centers_)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in nearest query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Map aggregation endpoints
+@app.get("/api/map/tiles")
+async def get_map_tiles_info():
+    """Datasets, status groups and zoom range available as density tiles"""
+    return {
+        **map_tiles.stats(),
+        "min_zoom": MIN_TILE_ZOOM,
+        "max_zoom": MAX_TILE_ZOOM
+    }
+
+def map_tile_response(request, dataset, z, x, y):
+    version = map_tiles.version
+    cells = map_tiles.tile(dataset, z, x, y)
+    
+    return frame_response(request, {"cells": cells}, {
+        "dataset": dataset,
+        "z": z,
+        "x": x,
+        "y": y,
+        "data_version": version,
+        "total": int(cells['count'].sum()) if len(cells) else 0
+    })
+
+@app.get("/api/map/tiles/{dataset}/{z}/{x}/{y}")
+async def get_map_tile(request: Request, dataset: str, z: int, x: int, y: int):
+    """Density cells (counts per status, plus sums where configured) for one map tile"""
+    try:
+        if dataset not in map_tiles.datasets:
+            raise HTTPException(status_code=404, detail=f"No map aggregates for '{dataset}'")
+        if not MIN_TILE_ZOOM <= z <= MAX_TILE_ZOOM:
+            raise HTTPException(status_code=400, detail=f"z must be between {MIN_TILE_ZOOM} and {MAX_TILE_ZOOM}")
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise HTTPException(status_code=400, detail="Tile coordinates out of range for zoom level")
         
-        return {
-            "geographic_data": geo_data.to_dict('records'),
-            "state_distribution": state_distribution,
-            "cluster_centers": cluster_centers.tolist(),
-            "total_locations": len(geo_data)
-        }
+        return await offload("tiles", request, map_tile_response, request, dataset, z, x, y)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in geographic analysis: {e}")
+        logger.error(f"Error building map tile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/analytics/temporal")
-async def get_temporal_analysis():
+async def get_temporal_analysis(
+    granularity: str = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
     """Get temporal analysis with trend detection"""
     try:
-        applicants = data_cache.get('applicants', pd.DataFrame())
+        if granularity not in GRANULARITIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"granularity must be one of {', '.join(GRANULARITIES)}"
+            )
         
-        if applicants.empty:
+        if not temporal_rollups:
             raise HTTPException(status_code=404, detail="No applicant data available")
         
-        # Monthly application trends
-        applicants['month'] = pd.to_datetime(applicants['Application Dt']).dt.to_period('M')
-        monthly_trends = applicants.groupby('month').size().to_dict()
-        
-        # Conversion trends
-        conversion_trends = applicants.groupby('month')['Current Status'].apply(
-            lambda x: (x == 'General Volunteer').sum() / len(x) * 100
-        ).to_dict()
+        # Read from the rollups precomputed for this data version
+        table = select_periods(temporal_rollups[granularity], start, end)
         
-        # Processing time trends
-        processing_trends = applicants.groupby('month')['days_to_start'].mean().to_dict()
-        
-        return {
-            "monthly_applications": monthly_trends,
-            "conversion_trends": conversion_trends,
-            "processing_trends": processing_trends
+        applications = series_dict(table['applications'])
+        result = {
+            "granularity": granularity,
+            "applications": applications,
+            "conversions": series_dict(table['conversions']),
+            "conversion_trends": series_dict(table['conversion_rate'], 2),
+            "processing_trends": series_dict(table['processing_mean'], 1),
+            "processing_percentiles": {
+                column.replace('processing_', ''): series_dict(table[column], 1)
+                for column in table.columns if column.startswith('processing_p')
+            }
         }
+        if granularity == "month":
+            result["monthly_applications"] = applications
         
+        return result
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in temporal analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/query")
+async def run_aggregate_query(request: Request, payload: Dict[str, Any]):
+    """Group-by/filter/aggregate query over one dataset, compiled to parameterized SQL"""
+    try:
+        result = await offload("query", request, query_engine.execute, payload)
+        return frame_response(request, {"rows": result["result"]}, result["meta"])
+        
+    except HTTPException:
+        raise
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error running aggregate query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/query/schema")
+async def get_query_schema():
+    """Columns, operators and aggregates available to /api/query"""
+    return query_engine.schema()
+
+# AI endpoints
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
+# Dashboard loads wait at most this long for fresh insights
+AI_INSIGHTS_TIMEOUT = float(os.getenv("AI_INSIGHTS_TIMEOUT", "3"))
+
+AI_SYSTEM_PROMPT = (
+    "You are an analytics assistant for American Red Cross volunteer and applicant data. "
+    "Answer with a JSON object with keys insights (list of strings), recommendations "
+    "(list of strings) and confidence (0-100)."
+)
+
+def build_ai_backend():
+    """Backend named by AI_BACKEND; Workers AI by default when a Cloudflare token is set"""
+    api_token = os.getenv("CLOUDFLARE_API_TOKEN")
+    backend = os.getenv("AI_BACKEND", "workers_ai" if api_token else "")
+    if backend == "stub":
+        return StubBackend()
+    if backend == "workers_ai" and api_token:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(AI_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(max_connections=int(os.getenv("AI_MAX_CONNECTIONS", "20")), max_keepalive_connections=10)
+        )
+        return WorkersAIBackend(
+            client, os.getenv("CLOUDFLARE_ACCOUNT_ID", ""), api_token,
+            os.getenv("CLOUDFLARE_AI_MODEL", "@cf/meta/llama-3.1-8b-instruct")
+        )
+    return None
+
+def ai_messages(question: str, context: Dict):
+    return [
+        {"role": "system", "content": f"{AI_SYSTEM_PROMPT}\nContext: {json.dumps(context, default=str)}"},
+        {"role": "user", "content": question}
+    ]
+
+def ai_query_text(query: Dict[str, str]):
+    """The query text, or an HTTP error when AI is unavailable or the query is empty"""
+    if not ai_gateway:
+        raise HTTPException(status_code=503, detail="AI backend not configured")
+    
+    user_query = query.get("query", "")
+    if not user_query:
+        raise HTTPException(status_code=400, detail="Query is required")
+    return user_query
+
 @app.post("/api/ai/query")
 async def process_ai_query(query: Dict[str, str]):
     """Process natural language query with Cloudflare AI"""
     try:
-        if not cloudflare_client:
-            raise HTTPException(status_code=503, detail="Cloudflare AI not configured")
-        
-        user_query = query.get("query", "")
-        if not user_query:
-            raise HTTPException(status_code=400, detail="Query is required")
-        
-        # Get context data
-        volunteers = data_cache.get('volunteers', pd.DataFrame())
-        applicants = data_cache.get('applicants', pd.DataFrame())
+        user_query = ai_query_text(query)
         
-        context = {
-            "total_volunteers": len(volunteers),
-            "total_applicants": len(applicants),
-            "geographic_coverage": volunteers['State'].nunique() if not volunteers.empty else 0
-        }
-        
-        # Process with Cloudflare AI
-        ai_response = await process_cloudflare_ai_query(user_query, context)
+        # Answers are cached per normalized query and data version
+        answer = await ai_gateway.complete(
+            "query", user_query, ai_messages(user_query, dashboard_metrics()), version=data_version
+        )
         
         return {
             "query": user_query,
-            "response": ai_response,
+            "response": parse_insights(answer["text"]),
+            "source": answer["source"],
             "timestamp": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "60"})
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing AI query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def process_cloudflare_ai_query(query: str, context: Dict):
-    """Process query with Cloudflare AI"""
-    try:
-        # This would integrate with Cloudflare AI API
-        # For now, return a mock response
-        return {
-            "insights": [
-                f"Based on your query '{query}', here are key insights:",
-                f"Current volunteer count: {context.get('total_volunteers', 0)}",
-                f"Geographic coverage: {context.get('geographic_coverage', 0)} states"
-            ],
-            "recommendations": [
-                "Consider expanding recruitment in underserved areas",
-                "Implement automated follow-up for pending applications"
-            ],
-            "confidence": 85
-        }
-    except Exception as e:
-        logger.error(f"Cloudflare AI query error: {e}")
-        return {"error": "AI processing failed"}
+@app.post("/api/ai/query/stream")
+async def stream_ai_query(query: Dict[str, str]):
+    """Stream the answer to a natural language query as server-sent events"""
+    user_query = ai_query_text(query)
+    messages = ai_messages(user_query, dashboard_metrics())
+    version = data_version
+    
+    async def events():
+        try:
+            async for token in ai_gateway.stream("query", user_query, messages, version=version):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming AI query: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 async def generate_ai_insights(metrics: Dict):
     """Generate AI insights for dashboard metrics"""
     try:
-        # Mock AI insights generation
-        return {
-            "insights": [
-                f"Volunteer conversion rate of {metrics.get('conversion_rate', 0)}% is within industry standards",
-                f"Geographic coverage spans {metrics.get('geographic_coverage', 0)} states",
-                f"Average processing time of {metrics.get('avg_days_to_start', 0)} days is efficient"
-            ],
-            "recommendations": [
-                "Focus on improving conversion rates in low-performing regions",
-                "Implement predictive analytics for volunteer retention"
-            ],
-            "confidence": 88
-        }
+        prompt = "Summarize the key insights and recommendations for these dashboard metrics."
+        answer = await ai_gateway.complete(
+            "insights", prompt, ai_messages(prompt, metrics), version=data_version,
+            timeout_seconds=AI_INSIGHTS_TIMEOUT
+        )
+        return {**parse_insights(answer["text"]), "source": answer["source"]}
+    except GatewayUnavailable as e:
+        logger.warning(f"AI insights unavailable: {e}")
+        return None
     except Exception as e:
         logger.error(f"AI insights generation error: {e}")
         return None
 
-# WebSocket endpoint for real-time updates
+# Sentiment endpoints
+MAX_SENTIMENT_TEXTS = 256
+
+@app.post("/api/sentiment")
+async def score_sentiment(payload: Dict[str, Any]):
+    """Sentiment label and score for each text, batched with concurrent requests"""
+    try:
+        texts = payload.get("texts")
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise HTTPException(status_code=400, detail="texts must be a list of strings")
+        if len(texts) > MAX_SENTIMENT_TEXTS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_SENTIMENT_TEXTS} texts per request")
+        
+        return {
+            "results": await sentiment.score(texts),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except CapabilityUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error scoring sentiment: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def read_source_column(dataset, column):
+    """One column of a dataset's source CSV with its row keys, for columns the cache prunes"""
+    path = DATA_SOURCES[dataset][0]
+    return pd.read_csv(path, usecols=[ROW_KEY, column], dtype={column: 'str'})
+
+async def run_sentiment_job(key, dataset, df, column):
+    """Score a column in the background, then publish a data version that includes it"""
+    try:
+        if column in df.columns:
+            result = await asyncio.to_thread(sentiment.score_column, dataset, df, column)
+        else:
+            source = await asyncio.to_thread(read_source_column, dataset, column)
+            result = await asyncio.to_thread(sentiment.score_column, dataset, source, column, ROW_KEY)
+        await reload_data(force=True)
+        sentiment_jobs[key].update(status="done", finished_at=datetime.now().isoformat(), **result)
+    except Exception as e:
+        logger.error(f"Sentiment job {key} failed: {e}")
+        sentiment_jobs[key].update(status="failed", error=str(e))
+
+@app.post("/api/sentiment/bulk/{dataset}")
+async def start_sentiment_job(dataset: str, column: str):
+    """Score every value of a free-text column offline into <column>_sentiment columns"""
+    df = data_cache.get(dataset)
+    if df is None:
+        raise HTTPException(status_code=404, detail=f"No {dataset} data available")
+    if column not in df.columns:
+        # Free text is not kept in memory; score it from the source file and attach by row key
+        try:
+            header = pd.read_csv(DATA_SOURCES[dataset][0], nrows=0).columns
+        except Exception as e:
+            logger.error(f"Error reading {dataset} source header: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        if column not in header:
+            raise HTTPException(status_code=400, detail=f"{dataset} has no column '{column}'")
+        if ROW_KEY not in header or ROW_KEY not in df.columns:
+            raise HTTPException(status_code=400, detail=f"{dataset} rows have no {ROW_KEY} to attach scores to")
+    
+    key = f"{dataset}.{column}"
+    if sentiment_jobs.get(key, {}).get("status") == "running":
+        raise HTTPException(status_code=409, detail=f"Sentiment job for {key} is already running")
+    
+    sentiment_jobs[key] = {"status": "running", "started_at": datetime.now().isoformat()}
+    sentiment_jobs[key]["task"] = asyncio.create_task(run_sentiment_job(key, dataset, df, column))
+    return {"job": key, "status": "running"}
+
+@app.get("/api/sentiment/bulk")
+async def get_sentiment_jobs():
+    """Status of bulk sentiment jobs"""
+    return {
+        "jobs": {
+            key: {field: value for field, value in job.items() if field != "task"}
+            for key, job in sentiment_jobs.items()
+        }
+    }
+
+# WebSocket endpoint for real-time updates, fed by one publisher with per-client bounded queues
+broadcast_hub = BroadcastHub(
+    compute=dashboard_metrics,
+    version=lambda: data_version,
+    interval_seconds=float(os.getenv("WS_UPDATE_INTERVAL", "30"))
+)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time data updates"""
-    await manager.connect(websocket)
+    channel = await broadcast_hub.connect(websocket)
     try:
         while True:
-            # Send periodic updates
-            await asyncio.sleep(30)
-            
-            # Get latest metrics
-            volunteers = data_cache.get('volunteers', pd.DataFrame())
-            applicants = data_cache.get('applicants', pd.DataFrame())
+            # Updates are pushed by the hub; clients may ask for a full snapshot
+            message = await websocket.receive_text()
+            if message.strip() == "resync":
+                broadcast_hub.resync(channel)
             
-            update_data = {
-                "type": "metrics_update",
-                "data": {
-                    "total_volunteers": len(volunteers),
-                    "total_applicants": len(applicants),
-                    "timestamp": datetime.now().isoformat()
-                }
-            }
-            
-            await manager.send_personal_message(json.dumps(update_data), websocket)
-            
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the hub already closed this client, e.g. after it fell behind
+        pass
+    finally:
+        broadcast_hub.disconnect(channel)
 
 # Data export endpoints
-@app.get("/api/export/volunteers")
-async def export_volunteers(format: str = "csv"):
-    """Export volunteer data"""
+EXPORT_FILTER_PARAMS = {
+    'status': 'Current Status',
+    'state': 'State',
+    'workflow': 'Workflow Type'
+}
+
+@app.get("/api/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    compression: Optional[str] = None,
+    status: Optional[str] = None,
+    state: Optional[str] = None,
+    workflow: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Stream a filtered volunteer or applicant export as CSV, NDJSON or Parquet"""
     try:
-        volunteers = data_cache.get('volunteers', pd.DataFrame())
+        if dataset not in ('volunteers', 'applicants'):
+            raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset}'")
         
-        if volunteers.empty:
-            raise HTTPException(status_code=404, detail="No volunteer data available")
+        df = data_cache.get(dataset, pd.DataFrame())
+        if df.empty:
+            raise HTTPException(status_code=404, detail=f"No {dataset} data available")
         
-        if format == "csv":
-            filename = f"volunteers_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            volunteers.to_csv(filename, index=False)
-            return FileResponse(filename, media_type='text/csv', filename=filename)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported format")
-            
+        try:
+            export_engine.validate_export(format, compression)
+            columns = parse_fields(fields, df)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Same filters as the list endpoints
+        params = {'status': status, 'state': state, 'workflow': workflow}
+        filters = {}
+        for param, value in params.items():
+            if value:
+                column = EXPORT_FILTER_PARAMS[param]
+                if column not in df.columns:
+                    raise HTTPException(status_code=400, detail=f"{dataset} cannot be filtered by {param}")
+                filters[column] = value
+        positions = match_positions(df, filter_indexes.get(dataset), filters)
+        
+        filename = export_engine.export_filename(
+            dataset, format, compression, datetime.now().strftime('%Y%m%d_%H%M%S')
+        )
+        return StreamingResponse(
+            export_engine.stream_export(df, positions, columns, format, compression),
+            media_type=export_engine.export_media_type(format, compression),
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error exporting volunteers: {e}")
+        logger.error(f"Error exporting {dataset}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+"""
+Multi-resolution map aggregation
+Bins geocoded rows into Web Mercator grid cells (CELL_BITS x CELL_BITS
+cells per slippy-map tile) at every zoom level, counting rows per status
+(and summing a measure where configured), and serves per-tile slices
+through an LRU tile cache keyed by data version.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Each tile is split into 2**CELL_BITS cells per side
+CELL_BITS = 6
+MIN_TILE_ZOOM = 0
+MAX_TILE_ZOOM = 14
+MAX_CELL_LEVEL = MAX_TILE_ZOOM + CELL_BITS
+MAX_MERCATOR_LAT = 85.05112878
+MAX_CACHED_TILES = 4096
+
+# Column counted per cell and optional column summed per cell
+MAP_DATASETS = {
+    'volunteers': {'group': 'status_category', 'sum': None},
+    'applicants': {'group': 'status_category', 'sum': None},
+    'donors': {'group': 'gift_band', 'sum': 'gift_amount'},
+}
+
+
+def mercator_cells(lon: np.ndarray, lat: np.ndarray, level: int):
+    """Integer Web Mercator cell coordinates at a cell level"""
+    n = 1 << level
+    lat = np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    fx = (lon + 180.0) / 360.0
+    lat_rad = np.radians(lat)
+    fy = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+    cx = np.clip((fx * n).astype(np.int64), 0, n - 1)
+    cy = np.clip((fy * n).astype(np.int64), 0, n - 1)
+    return cx, cy
+
+
+def cell_centers(cx: np.ndarray, cy: np.ndarray, level: int):
+    """Longitude/latitude of cell centers"""
+    n = float(1 << level)
+    lon = (cx + 0.5) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (cy + 0.5) / n))))
+    return lon, lat
+
+
+class LevelAggregate:
+    """Per-cell measures at one cell level, sorted by (cx, cy)"""
+
+    def __init__(self, level: int, cx, cy, counts, sums):
+        self.level = level
+        self.cx = cx
+        self.cy = cy
+        self.counts = counts  # cells x groups
+        self.sums = sums      # cells, or None
+
+    def coarsen(self) -> "LevelAggregate":
+        """Aggregate up one level by merging 2x2 blocks of cells"""
+        level = self.level - 1
+        keys = ((self.cx >> 1) << level) | (self.cy >> 1)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.column_stack([
+            np.bincount(inverse, weights=self.counts[:, g], minlength=len(unique_keys))
+            for g in range(self.counts.shape[1])
+        ]).astype(np.int64)
+        sums = None
+        if self.sums is not None:
+            sums = np.bincount(inverse, weights=self.sums, minlength=len(unique_keys))
+        return LevelAggregate(level, unique_keys >> level, unique_keys & ((1 << level) - 1), counts, sums)
+
+
+class DatasetTiles:
+    """Aggregates for every cell level of one dataset"""
+
+    def __init__(self, df: pd.DataFrame, group_column: str, sum_column: Optional[str]):
+        lon = df['x'].to_numpy(dtype=np.float64, na_value=np.nan)
+        lat = df['y'].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~(np.isnan(lon) | np.isnan(lat))
+
+        groups = df[group_column] if group_column in df.columns else pd.Series('All', index=df.index)
+        codes, self.group_names = pd.factorize(groups.astype(object).fillna('Other').to_numpy()[valid], sort=True)
+        self.group_names = [str(name) for name in self.group_names]
+        self.sum_column = sum_column if sum_column in df.columns else None
+        self.points = int(valid.sum())
+
+        cx, cy = mercator_cells(lon[valid], lat[valid], MAX_CELL_LEVEL)
+        keys = (cx << MAX_CELL_LEVEL) | cy
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+        group_count = max(len(self.group_names), 1)
+        counts = np.bincount(
+            inverse * group_count + codes, minlength=len(unique_keys) * group_count
+        ).reshape(len(unique_keys), group_count)
+        sums = None
+        if self.sum_column:
+            weights = pd.to_numeric(df[self.sum_column], errors='coerce').fillna(0).to_numpy()[valid]
+            sums = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+
+        finest = LevelAggregate(
+            MAX_CELL_LEVEL, unique_keys >> MAX_CELL_LEVEL,
+            unique_keys & ((1 << MAX_CELL_LEVEL) - 1), counts, sums
+        )
+        self.levels: Dict[int, LevelAggregate] = {MAX_CELL_LEVEL: finest}
+        for level in range(MAX_CELL_LEVEL - 1, MIN_TILE_ZOOM + CELL_BITS - 1, -1):
+            self.levels[level] = self.levels[level + 1].coarsen()
+
+    def tile(self, z: int, x: int, y: int) -> pd.DataFrame:
+        """Cells falling inside one slippy-map tile"""
+        level = z + CELL_BITS
+        aggregate = self.levels[level]
+        lo_x, hi_x = x << CELL_BITS, (x + 1) << CELL_BITS
+        lo_y, hi_y = y << CELL_BITS, (y + 1) << CELL_BITS
+
+        # Cells are sorted by cx then cy, so the tile's columns are one contiguous run
+        start = np.searchsorted(aggregate.cx, lo_x, side='left')
+        end = np.searchsorted(aggregate.cx, hi_x, side='left')
+        cy = aggregate.cy[start:end]
+        selected = np.arange(start, end)[(cy >= lo_y) & (cy < hi_y)]
+
+        cx, cy = aggregate.cx[selected], aggregate.cy[selected]
+        lon, lat = cell_centers(cx, cy, level)
+        counts = aggregate.counts[selected]
+        cells = pd.DataFrame({
+            'cell_x': cx,
+            'cell_y': cy,
+            'lon': np.round(lon, 6),
+            'lat': np.round(lat, 6),
+            'count': counts.sum(axis=1),
+        })
+        for i, name in enumerate(self.group_names):
+            cells[name] = counts[:, i]
+        if aggregate.sums is not None:
+            cells[f'{self.sum_column}_sum'] = np.round(aggregate.sums[selected], 2)
+        return cells
+
+
+class TileService:
+    """Precomputed tiles for all map datasets with an LRU of served tiles"""
+
+    def __init__(self, max_tiles: int = MAX_CACHED_TILES):
+        self.max_tiles = max_tiles
+        self.version = None
+        self.datasets: Dict[str, DatasetTiles] = {}
+        self._cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rebuild(self, data: Dict[str, pd.DataFrame], version: int):
+        self.install(self.build(data), version)
+
+    def build(self, data: Dict[str, pd.DataFrame]) -> Dict[str, DatasetTiles]:
+        """Aggregates for every map dataset, without touching the served version"""
+        datasets = {}
+        for name, config in MAP_DATASETS.items():
+            df = data.get(name)
+            if df is None or 'x' not in df.columns or 'y' not in df.columns:
+                continue
+            try:
+                datasets[name] = DatasetTiles(df, config['group'], config['sum'])
+                logger.info(f"Built map aggregates for {name} over {datasets[name].points} points")
+            except Exception as e:
+                logger.error(f"Error building map aggregates for {name}: {e}")
+        return datasets
+
+    def install(self, datasets: Dict[str, DatasetTiles], version: int):
+        """Serve previously built aggregates as a new data version"""
+        with self._lock:
+            self.datasets = datasets
+            self.version = version
+            # Tiles from older versions can never be served again
+            self._cache.clear()
+
+    def tile(self, dataset: str, z: int, x: int, y: int) -> pd.DataFrame:
+        key = (self.version, dataset, z, x, y)
+        with self._lock:
+            cells = self._cache.get(key)
+            if cells is not None:
+                self._cache.move_to_end(key)
+                return cells
+            tiles = self.datasets[dataset]
+
+        cells = tiles.tile(z, x, y)
+        with self._lock:
+            if key[0] == self.version:
+                self._cache[key] = cells
+                while len(self._cache) > self.max_tiles:
+                    self._cache.popitem(last=False)
+        return cells
+
+    def stats(self) -> Dict:
+        return {
+            "data_version": self.version,
+            "cached_tiles": len(self._cache),
+            "datasets": {
+                name: {"points": tiles.points, "groups": tiles.group_names}
+                for name, tiles in self.datasets.items()
+            },
+        }
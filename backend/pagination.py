@@ -0,0 +1,60 @@
+"""
+Cursor pagination and field projection helpers
+Cursors are opaque tokens carrying the last row's stable key and a
+fingerprint of the filters that produced the page.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Stable per-row key used to resume paging
+ROW_KEY = 'ObjectId'
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or does not match the query"""
+
+
+def filter_fingerprint(dataset: str, filters: Dict[str, Optional[str]]) -> str:
+    """Short hash identifying a dataset and its active filters"""
+    active = sorted((col, value) for col, value in filters.items() if value)
+    payload = json.dumps([dataset, active], separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def encode_cursor(key: Any, position: int, fingerprint: str) -> str:
+    # Unwrap numpy scalars so the key is JSON serializable
+    key = key.item() if hasattr(key, 'item') else key
+    payload = json.dumps({"k": key, "p": int(position), "f": fingerprint}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, position, cursor_fingerprint = payload["k"], int(payload["p"]), payload["f"]
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+    if cursor_fingerprint != fingerprint:
+        raise InvalidCursor("Cursor does not match the requested filters")
+
+    return {"key": key, "position": position}
+
+
+def parse_fields(fields: Optional[str], df: pd.DataFrame) -> Optional[List[str]]:
+    """Validate a comma-separated field list against the frame's columns"""
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return requested
@@ -0,0 +1,545 @@
+"""
+Ad-hoc aggregate queries
+Validates a group-by/filter/aggregate spec against the columns of a cached
+dataset, compiles it to one parameterized SQL statement, and runs it on
+an in-process DuckDB database that scans the live DataFrames without
+copying them. Falls back to an equivalent vectorized pandas plan when
+duckdb is not installed. Compiled queries and results are cached per
+data version.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+QUERY_DATASETS = ('volunteers', 'applicants', 'donors', 'biomed')
+
+AGGREGATES = ('count', 'count_distinct', 'sum', 'avg', 'min', 'max', 'median', 'quantile')
+# Aggregates that need a numeric column; min/max also take dates
+NUMERIC_AGGREGATES = ('sum', 'avg', 'median', 'quantile')
+ORDERED_AGGREGATES = ('min', 'max')
+
+COMPARISONS = {'eq': '=', 'ne': '<>', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+OPERATORS = tuple(COMPARISONS) + ('in', 'not_in', 'between', 'is_null', 'not_null')
+# Operators that only make sense on ordered (numeric or date) columns
+RANGE_OPERATORS = ('lt', 'le', 'gt', 'ge', 'between')
+
+# Date bucket -> pandas period frequency; DuckDB's date_trunc uses the bucket name
+BUCKETS = {'year': 'Y', 'quarter': 'Q', 'month': 'M', 'week': 'W', 'day': 'D'}
+
+MAX_GROUP_BY = 4
+MAX_FILTERS = 16
+MAX_AGGREGATES = 16
+MAX_IN_VALUES = 1000
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+MAX_CACHED_PLANS = 512
+MAX_CACHED_RESULTS = 256
+
+
+class InvalidQuery(ValueError):
+    """The spec does not describe a valid query over the dataset"""
+
+
+def column_kind(series: pd.Series) -> str:
+    """'numeric', 'datetime' or 'text', which decides the allowed operators and aggregates"""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return 'text'
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return 'datetime'
+    return 'text'
+
+
+def dataset_columns(df: pd.DataFrame) -> Dict[str, str]:
+    return {str(col): column_kind(df[col]) for col in df.columns}
+
+
+def quote(identifier: str) -> str:
+    """SQL identifier quoting; only used on names checked against the frame's columns"""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class GroupKey:
+    def __init__(self, column: str, bucket: Optional[str]):
+        self.column = column
+        self.bucket = bucket
+        self.name = f"{column}_{bucket}" if bucket else column
+
+
+class Filter:
+    def __init__(self, column: str, op: str, value: Any):
+        self.column = column
+        self.op = op
+        self.value = value
+
+
+class Aggregate:
+    def __init__(self, fn: str, column: Optional[str], q: Optional[float], name: str):
+        self.fn = fn
+        self.column = column
+        self.q = q
+        self.name = name
+
+
+class QuerySpec:
+    """A validated query with values coerced to each column's type"""
+
+    def __init__(self, dataset, group_by, filters, aggregates, order_by, limit):
+        self.dataset = dataset
+        self.group_by: List[GroupKey] = group_by
+        self.filters: List[Filter] = filters
+        self.aggregates: List[Aggregate] = aggregates
+        self.order_by: List[tuple] = order_by
+        self.limit: int = limit
+
+    @property
+    def output_columns(self) -> List[str]:
+        return [key.name for key in self.group_by] + [agg.name for agg in self.aggregates]
+
+
+def _as_list(value, field: str) -> list:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise InvalidQuery(f"{field} must be a list")
+    return value
+
+
+def _column(columns: Dict[str, str], name, field: str) -> str:
+    if not isinstance(name, str) or name not in columns:
+        raise InvalidQuery(f"Unknown column in {field}: {name!r}")
+    return name
+
+
+def _coerce(value, kind: str, column: str):
+    """A filter value as the Python type DuckDB and pandas compare against the column"""
+    if value is None or isinstance(value, (list, dict)):
+        raise InvalidQuery(f"Invalid value for {column}: {value!r}")
+    if kind == 'numeric':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidQuery(f"{column} takes numeric values, got {value!r}")
+        return value
+    if kind == 'datetime':
+        try:
+            stamp = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            stamp = pd.NaT
+        if pd.isna(stamp):
+            raise InvalidQuery(f"{column} takes dates, got {value!r}")
+        return stamp.to_pydatetime()
+    return str(value)
+
+
+def _parse_group_key(item, columns: Dict[str, str]) -> GroupKey:
+    if isinstance(item, str):
+        return GroupKey(_column(columns, item, 'group_by'), None)
+    if not isinstance(item, dict):
+        raise InvalidQuery("group_by entries must be column names or {column, bucket} objects")
+    column = _column(columns, item.get('column'), 'group_by')
+    bucket = item.get('bucket')
+    if bucket is not None:
+        if bucket not in BUCKETS:
+            raise InvalidQuery(f"bucket must be one of {', '.join(BUCKETS)}")
+        if columns[column] != 'datetime':
+            raise InvalidQuery(f"Only date columns can be bucketed, not {column}")
+    return GroupKey(column, bucket)
+
+
+def _parse_filter(item, columns: Dict[str, str]) -> Filter:
+    if not isinstance(item, dict):
+        raise InvalidQuery("filters entries must be {column, op, value} objects")
+    column = _column(columns, item.get('column'), 'filters')
+    kind = columns[column]
+    op = item.get('op', 'eq')
+    if op not in OPERATORS:
+        raise InvalidQuery(f"op must be one of {', '.join(OPERATORS)}")
+    if op in RANGE_OPERATORS and kind == 'text':
+        raise InvalidQuery(f"{op} needs a numeric or date column, not {column}")
+
+    value = item.get('value')
+    if op in ('is_null', 'not_null'):
+        value = None
+    elif op in ('in', 'not_in'):
+        if not isinstance(value, list) or not value or len(value) > MAX_IN_VALUES:
+            raise InvalidQuery(f"{op} takes a list of 1 to {MAX_IN_VALUES} values")
+        value = [_coerce(member, kind, column) for member in value]
+    elif op == 'between':
+        if not isinstance(value, list) or len(value) != 2:
+            raise InvalidQuery("between takes a [low, high] list")
+        value = [_coerce(member, kind, column) for member in value]
+    else:
+        value = _coerce(value, kind, column)
+    return Filter(column, op, value)
+
+
+def _parse_aggregate(item, columns: Dict[str, str]) -> Aggregate:
+    if isinstance(item, str):
+        item = {'fn': item}
+    if not isinstance(item, dict):
+        raise InvalidQuery("aggregates entries must be {fn, column} objects")
+    fn = item.get('fn')
+    if fn not in AGGREGATES:
+        raise InvalidQuery(f"fn must be one of {', '.join(AGGREGATES)}")
+
+    column = item.get('column')
+    if column is None:
+        if fn != 'count':
+            raise InvalidQuery(f"{fn} needs a column")
+    else:
+        column = _column(columns, column, 'aggregates')
+        kind = columns[column]
+        if fn in NUMERIC_AGGREGATES and kind != 'numeric':
+            raise InvalidQuery(f"{fn} needs a numeric column, not {column}")
+        if fn in ORDERED_AGGREGATES and kind == 'text':
+            raise InvalidQuery(f"{fn} needs a numeric or date column, not {column}")
+
+    q = None
+    if fn == 'quantile':
+        q = item.get('q')
+        if isinstance(q, bool) or not isinstance(q, (int, float)) or not 0 <= q <= 1:
+            raise InvalidQuery("quantile needs q between 0 and 1")
+        q = float(q)
+
+    default = fn if column is None else f"{fn}_{column}"
+    if q is not None:
+        default = f"p{round(q * 100, 2):g}_{column}"
+    name = item.get('as') or default
+    if not isinstance(name, str):
+        raise InvalidQuery("as must be a string")
+    return Aggregate(fn, column, q, name)
+
+
+def parse_spec(payload: Dict[str, Any], frames: Dict[str, pd.DataFrame]) -> QuerySpec:
+    """Validate a query payload against the live frames"""
+    if not isinstance(payload, dict):
+        raise InvalidQuery("Query must be a JSON object")
+    dataset = payload.get('dataset')
+    if dataset not in QUERY_DATASETS:
+        raise InvalidQuery(f"dataset must be one of {', '.join(QUERY_DATASETS)}")
+    if dataset not in frames:
+        raise InvalidQuery(f"No {dataset} data available")
+    columns = dataset_columns(frames[dataset])
+
+    group_by = [_parse_group_key(item, columns) for item in _as_list(payload.get('group_by'), 'group_by')]
+    filters = [_parse_filter(item, columns) for item in _as_list(payload.get('filters'), 'filters')]
+    aggregates = [_parse_aggregate(item, columns) for item in _as_list(payload.get('aggregates'), 'aggregates')]
+    if not aggregates:
+        aggregates = [Aggregate('count', None, None, 'count')]
+    if len(group_by) > MAX_GROUP_BY or len(filters) > MAX_FILTERS or len(aggregates) > MAX_AGGREGATES:
+        raise InvalidQuery(
+            f"At most {MAX_GROUP_BY} group_by, {MAX_FILTERS} filters and {MAX_AGGREGATES} aggregates"
+        )
+
+    spec = QuerySpec(dataset, group_by, filters, aggregates, [], DEFAULT_LIMIT)
+    outputs = spec.output_columns
+    if len(set(outputs)) != len(outputs):
+        raise InvalidQuery("Output column names must be unique; name aggregates with 'as'")
+
+    for item in _as_list(payload.get('order_by'), 'order_by'):
+        if isinstance(item, str):
+            item = {'column': item}
+        if not isinstance(item, dict) or item.get('column') not in outputs:
+            raise InvalidQuery(f"order_by must name output columns: {', '.join(outputs)}")
+        spec.order_by.append((item['column'], bool(item.get('desc', False))))
+
+    limit = payload.get('limit', DEFAULT_LIMIT)
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_LIMIT:
+        raise InvalidQuery(f"limit must be between 1 and {MAX_LIMIT}")
+    spec.limit = limit
+    return spec
+
+
+def sort_keys(spec: QuerySpec) -> List[tuple]:
+    """Requested ordering, then the group keys so ties come back in a stable order"""
+    keys = list(spec.order_by)
+    ordered = {name for name, _ in keys}
+    keys += [(key.name, False) for key in spec.group_by if key.name not in ordered]
+    return keys
+
+
+def compile_sql(spec: QuerySpec) -> tuple:
+    """SQL text and its positional parameters"""
+    select, params = [], []
+    for key in spec.group_by:
+        expr = quote(key.column)
+        if key.bucket:
+            expr = f"date_trunc('{key.bucket}', {expr})"
+        select.append(f"{expr} AS {quote(key.name)}")
+
+    for agg in spec.aggregates:
+        column = quote(agg.column) if agg.column else None
+        if agg.fn == 'count':
+            expr = f"count({column or '*'})"
+        elif agg.fn == 'count_distinct':
+            expr = f"count(DISTINCT {column})"
+        elif agg.fn == 'quantile':
+            expr = f"quantile_cont({column}, {agg.q!r})"
+        else:
+            expr = f"{agg.fn}({column})"
+        select.append(f"{expr} AS {quote(agg.name)}")
+
+    where = []
+    for condition in spec.filters:
+        column = quote(condition.column)
+        if condition.op in COMPARISONS:
+            where.append(f"{column} {COMPARISONS[condition.op]} ?")
+            params.append(condition.value)
+        elif condition.op in ('in', 'not_in'):
+            negate = 'NOT ' if condition.op == 'not_in' else ''
+            where.append(f"{column} {negate}IN ({', '.join('?' * len(condition.value))})")
+            params.extend(condition.value)
+        elif condition.op == 'between':
+            where.append(f"{column} BETWEEN ? AND ?")
+            params.extend(condition.value)
+        else:
+            where.append(f"{column} IS {'NOT ' if condition.op == 'not_null' else ''}NULL")
+
+    sql = f"SELECT {', '.join(select)} FROM {quote(spec.dataset)}"
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    if spec.group_by:
+        sql += f" GROUP BY {', '.join(str(i + 1) for i in range(len(spec.group_by)))}"
+    keys = sort_keys(spec)
+    if keys:
+        sql += " ORDER BY " + ", ".join(f"{quote(name)} {'DESC' if desc else 'ASC'} NULLS LAST" for name, desc in keys)
+    sql += f" LIMIT {spec.limit}"
+    return sql, params
+
+
+def _filter_mask(df: pd.DataFrame, condition: Filter) -> np.ndarray:
+    series = df[condition.column]
+    if condition.op == 'is_null':
+        return series.isna().to_numpy()
+    if condition.op == 'not_null':
+        return series.notna().to_numpy()
+
+    value = condition.value
+    if condition.op == 'eq':
+        mask = series == value
+    elif condition.op == 'ne':
+        mask = series != value
+    elif condition.op == 'lt':
+        mask = series < value
+    elif condition.op == 'le':
+        mask = series <= value
+    elif condition.op == 'gt':
+        mask = series > value
+    elif condition.op == 'ge':
+        mask = series >= value
+    elif condition.op == 'between':
+        mask = (series >= value[0]) & (series <= value[1])
+    else:
+        mask = series.isin(value)
+        if condition.op == 'not_in':
+            mask = ~mask
+    # SQL comparisons never match NULL, including <> and NOT IN
+    return mask.fillna(False).to_numpy(dtype=bool) & series.notna().to_numpy()
+
+
+def _aggregate(grouped, agg: Aggregate, count_column: str):
+    if agg.fn == 'count':
+        return grouped[count_column].size() if agg.column is None else grouped[agg.column].count()
+    column = grouped[agg.column]
+    if agg.fn == 'count_distinct':
+        return column.nunique()
+    if agg.fn == 'sum':
+        return column.sum(min_count=1)
+    if agg.fn == 'avg':
+        return column.mean()
+    if agg.fn == 'quantile':
+        return column.quantile(agg.q)
+    return getattr(column, agg.fn)()
+
+
+def run_pandas(df: pd.DataFrame, spec: QuerySpec) -> pd.DataFrame:
+    """The compiled query's semantics as a vectorized pandas plan"""
+    mask = np.ones(len(df), dtype=bool)
+    for condition in spec.filters:
+        mask &= _filter_mask(df, condition)
+    rows = df[mask] if not mask.all() else df
+
+    work = {}
+    for key in spec.group_by:
+        series = rows[key.column]
+        if key.bucket:
+            series = series.dt.to_period(BUCKETS[key.bucket]).dt.start_time
+        work[key.name] = series
+    # Without group_by, one group spanning every row, as SQL aggregates without GROUP BY
+    key_names = list(work) or ['_all']
+    if not spec.group_by:
+        work['_all'] = np.zeros(len(rows), dtype=np.int8)
+    for agg in spec.aggregates:
+        if agg.column is not None and agg.column not in work:
+            work[agg.column] = rows[agg.column]
+
+    grouped = pd.DataFrame(work, copy=False).groupby(key_names, dropna=False, observed=True, sort=False)
+    result = pd.DataFrame({agg.name: _aggregate(grouped, agg, key_names[0]) for agg in spec.aggregates})
+    if spec.group_by:
+        result = result.reset_index()
+    elif result.empty:
+        result = pd.DataFrame({agg.name: [0 if agg.fn.startswith('count') else None] for agg in spec.aggregates})
+    else:
+        result = result.reset_index(drop=True)
+
+    keys = sort_keys(spec)
+    if keys:
+        result = result.sort_values(
+            [name for name, _ in keys], ascending=[not desc for _, desc in keys],
+            na_position='last', kind='stable'
+        )
+    return result.head(spec.limit).reset_index(drop=True)
+
+
+class CompiledQuery:
+    def __init__(self, spec: QuerySpec, sql: str, params: list):
+        self.spec = spec
+        self.sql = sql
+        self.params = params
+
+
+class QueryEngine:
+    """Runs query specs against the live data version, caching plans and results per version"""
+
+    def __init__(self, threads: int = 0, max_plans: int = MAX_CACHED_PLANS, max_results: int = MAX_CACHED_RESULTS):
+        self.threads = threads
+        self.max_plans = max_plans
+        self.max_results = max_results
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.version = 0
+        self._database = None
+        self._plans: "OrderedDict[tuple, CompiledQuery]" = OrderedDict()
+        self._results: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def engine(self) -> str:
+        return "duckdb" if duckdb is not None else "pandas"
+
+    def _connect(self):
+        if self._database is None:
+            self._database = duckdb.connect(":memory:")
+            if self.threads > 0:
+                self._database.execute(f"SET threads TO {int(self.threads)}")
+        return self._database
+
+    def install(self, data: Dict[str, pd.DataFrame], version: int):
+        """Query a new data version; plans and results of older versions are dropped"""
+        with self._lock:
+            self.frames = {name: df for name, df in data.items() if name in QUERY_DATASETS}
+            self.version = version
+            self._plans.clear()
+            self._results.clear()
+
+    @staticmethod
+    def cache_key(payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(canonical.encode()).hexdigest()
+
+    def _lookup(self, cache: OrderedDict, key: tuple):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _store(self, cache: OrderedDict, key: tuple, value, limit: int):
+        with self._lock:
+            # Skip results computed against a version that was replaced meanwhile
+            if key[0] != self.version:
+                return
+            cache[key] = value
+            while len(cache) > limit:
+                cache.popitem(last=False)
+
+    def compile(self, key: tuple, payload: Dict[str, Any], frames: Dict[str, pd.DataFrame]) -> CompiledQuery:
+        plan = self._lookup(self._plans, key)
+        if plan is None:
+            spec = parse_spec(payload, frames)
+            plan = CompiledQuery(spec, *compile_sql(spec))
+            self._store(self._plans, key, plan, self.max_plans)
+        return plan
+
+    def _run(self, plan: CompiledQuery, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        df = frames[plan.spec.dataset]
+        if duckdb is None:
+            return run_pandas(df, plan.spec)
+        # Each query gets its own cursor; the frame is scanned in place, not copied
+        cursor = self._connect().cursor()
+        try:
+            cursor.register(plan.spec.dataset, df)
+            return cursor.execute(plan.sql, plan.params).fetchdf()
+        finally:
+            cursor.close()
+
+    def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Validated, cached query result as a frame plus envelope fields"""
+        with self._lock:
+            frames, version = self.frames, self.version
+
+        key = (version, self.cache_key(payload))
+        plan = self.compile(key, payload, frames)
+        result = self._lookup(self._results, key)
+        cached = result is not None
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+            with telemetry.stage(f"query.{self.engine}"):
+                result = self._run(plan, frames)
+            self._store(self._results, key, result, self.max_results)
+
+        return {
+            "result": result,
+            "meta": {
+                "dataset": plan.spec.dataset,
+                "columns": plan.spec.output_columns,
+                "row_count": len(result),
+                "engine": self.engine,
+                "sql": plan.sql,
+                "data_version": version,
+                "cached": cached,
+            }
+        }
+
+    def schema(self) -> Dict[str, Any]:
+        """Queryable columns and their kinds, plus the operators and aggregates a spec may use"""
+        with self._lock:
+            frames = self.frames
+        return {
+            "datasets": {name: dataset_columns(df) for name, df in frames.items()},
+            "operators": list(OPERATORS),
+            "aggregates": list(AGGREGATES),
+            "buckets": list(BUCKETS),
+            "max_limit": MAX_LIMIT,
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "engine": self.engine,
+                "threads": self.threads,
+                "data_version": self.version,
+                "cached_plans": len(self._plans),
+                "cached_results": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,214 @@
+"""
+Response cache tier
+Caches encoded responses of read endpoints keyed by path, normalized query
+parameters, negotiated encoding and data version. An in-process LRU/TTL
+tier sits in front of Redis (shared across workers); when Redis is missing
+or failing, the local tier is used alone. Responses carry ETags so clients
+revalidate with If-None-Match and receive 304s.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 1024
+# Do not cache bodies larger than this
+MAX_CACHED_BYTES = 8 * 1024 * 1024
+# Seconds to stop using Redis after an error
+REDIS_RETRY_SECONDS = 30
+
+# Headers of the original response replayed on cache hits
+REPLAYED_HEADERS = ('content-type', 'content-encoding', 'vary')
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, status_code: int, headers: Dict[str, str], etag: str):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.etag = etag
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    candidates = [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+    return '*' in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Two-tier (local LRU/TTL, then Redis) cache of encoded responses"""
+
+    def __init__(
+        self,
+        cached_prefixes: Iterable[str],
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        key_prefix: str = "commmob:response:"
+    ):
+        self.cached_prefixes = tuple(cached_prefixes)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self.redis = None
+        self.redis_disabled_until = 0.0
+        self.version = "0"
+        # key -> (expires_at, CachedResponse)
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "not_modified": 0, "redis_errors": 0}
+
+    def attach_redis(self, client):
+        self.redis = client
+
+    def set_version(self, version: str):
+        """Switch to a new data version; entries from older versions become unreachable"""
+        with self._lock:
+            self.version = version
+            self._local.clear()
+
+    def is_cacheable(self, request: Request) -> bool:
+        return request.method == "GET" and request.url.path.startswith(self.cached_prefixes)
+
+    def key_for(self, request: Request) -> str:
+        params = sorted(request.query_params.multi_items())
+        negotiated = [request.headers.get('accept', ''), request.headers.get('accept-encoding', '')]
+        digest = hashlib.sha1(
+            json.dumps([request.url.path, params, negotiated], separators=(',', ':')).encode()
+        ).hexdigest()
+        return f"{self.key_prefix}{self.version}:{digest}"
+
+    # Local tier
+
+    def _local_get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _local_set(self, key: str, entry: CachedResponse):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    # Redis tier
+
+    def _redis_usable(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self.redis_disabled_until
+
+    def _redis_failed(self, e: Exception):
+        self.stats["redis_errors"] += 1
+        self.redis_disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning(f"Redis cache error, using in-process cache for {REDIS_RETRY_SECONDS}s: {e}")
+
+    def _redis_get(self, key: str) -> Optional[CachedResponse]:
+        values = self.redis.hmget(key, "meta", "body")
+        if not values or values[0] is None or values[1] is None:
+            return None
+        meta = json.loads(values[0])
+        return CachedResponse(values[1], meta["status_code"], meta["headers"], meta["etag"])
+
+    def _redis_set(self, key: str, entry: CachedResponse):
+        meta = json.dumps({"status_code": entry.status_code, "headers": entry.headers, "etag": entry.etag})
+        pipeline = self.redis.pipeline()
+        pipeline.hset(key, mapping={"meta": meta, "body": entry.body})
+        pipeline.expire(key, self.ttl_seconds)
+        pipeline.execute()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._local_get(key)
+        if entry is not None:
+            self.stats["local_hits"] += 1
+            return entry
+
+        if self._redis_usable():
+            try:
+                entry = await asyncio.to_thread(self._redis_get, key)
+            except Exception as e:
+                self._redis_failed(e)
+                entry = None
+            if entry is not None:
+                self.stats["redis_hits"] += 1
+                self._local_set(key, entry)
+                return entry
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, entry: CachedResponse):
+        self._local_set(key, entry)
+        if self._redis_usable():
+            try:
+                await asyncio.to_thread(self._redis_set, key, entry)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def describe(self) -> Dict:
+        lookups = self.stats["local_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["local_hits"] + self.stats["redis_hits"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "local_entries": len(self._local),
+            "redis": self._redis_usable(),
+            "version": self.version,
+        }
+
+    def respond(self, request: Request, entry: CachedResponse, cache_status: str) -> Response:
+        headers = dict(entry.headers)
+        headers["ETag"] = entry.etag
+        headers["X-Cache"] = cache_status
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.stats["not_modified"] += 1
+            headers.pop("content-type", None)
+            headers.pop("content-encoding", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, status_code=entry.status_code, headers=headers)
+
+    async def middleware(self, request: Request, call_next):
+        """HTTP middleware serving cacheable GETs from the cache"""
+        if not self.is_cacheable(request):
+            return await call_next(request)
+
+        key = self.key_for(request)
+        entry = await self.get(key)
+        if entry is not None:
+            return self.respond(request, entry, "HIT")
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {
+            name: value for name, value in response.headers.items() if name in REPLAYED_HEADERS
+        }
+        entry = CachedResponse(body, response.status_code, headers, make_etag(body))
+        # Only store if the data did not change while the response was computed
+        if len(body) <= MAX_CACHED_BYTES and key == self.key_for(request):
+            await self.set(key, entry)
+        return self.respond(request, entry, "MISS")
@@ -0,0 +1,113 @@
+"""
+Compact dtype schemas for cached datasets
+Declares per-dataset columns and storage dtypes applied at ingest, and
+reports the resident memory of each cached DataFrame.
+"""
+
+import logging
+import os
+from typing import Any, Dict
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: drop source columns that no schema declares (undeclared columns are kept as parsed by default)
+PRUNE_COLUMNS = os.getenv("DATA_PRUNE_COLUMNS", "0") == "1"
+
+DATASET_SCHEMAS = {
+    'volunteers': {
+        'categories': [
+            'Chapter Name', 'State', 'Current Status', 'Current Positions',
+            'County of Residence', 'status_category'
+        ],
+        'float32': ['x', 'y'],
+        'small_ints': ['days_since_login'],
+        'keep': [
+            'ObjectId', 'Zip', 'Vol Start Dt', 'Volunteer Since Date', 'Last Login'
+        ],
+    },
+    'applicants': {
+        'categories': [
+            'City', 'State', 'Current Status', 'Workflow Type', 'BGC Status',
+            'Attend Orient. Step', 'status_category'
+        ],
+        'float32': ['x', 'y'],
+        'small_ints': ['days_to_start', 'days_to_inactive', 'Days To Vol Start'],
+        'keep': [
+            'ObjectId', 'Application Dt', 'Vol Start Dt', 'Inactive Dt'
+        ],
+    },
+    'donors': {
+        'categories': ['gift_band'],
+        'float32': ['x', 'y'],
+        'small_ints': [],
+        'keep': ['Gift $', 'gift_amount'],
+    },
+    'biomed': {
+        'categories': ['Account Type', 'Status', 'City', 'St'],
+        'float32': ['x', 'y'],
+        'small_ints': ['Year'],
+        'keep': [
+            'Sponsor Ext ID', 'Account Name', 'Address', 'Zip',
+            'Drives', 'RBC Products Collected', 'RBC Product Projection'
+        ],
+    },
+}
+
+
+def declared_columns(name: str):
+    """All columns a dataset schema knows about"""
+    schema = DATASET_SCHEMAS[name]
+    return schema['categories'] + schema['float32'] + schema['small_ints'] + schema['keep']
+
+
+def to_small_int(series: pd.Series) -> pd.Series:
+    """Convert a day-count column to a nullable 32-bit integer"""
+    return pd.to_numeric(series, errors='coerce').round().astype('Int32')
+
+
+def apply_schema(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Prune undeclared columns and convert the rest to compact dtypes"""
+    schema = DATASET_SCHEMAS.get(name)
+    if schema is None:
+        return df
+
+    try:
+        if PRUNE_COLUMNS:
+            declared = set(declared_columns(name))
+            pruned = [col for col in df.columns if col not in declared]
+            if pruned:
+                logger.info(f"Pruning {len(pruned)} unused {name} columns: {pruned}")
+                df = df.drop(columns=pruned)
+
+        for col in schema['categories']:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+
+        for col in schema['float32']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+
+        for col in schema['small_ints']:
+            if col in df.columns:
+                df[col] = to_small_int(df[col])
+
+        return df
+    except Exception as e:
+        logger.error(f"Error applying {name} schema: {e}")
+        return df
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, Any]:
+    """Per-column dtype and deep memory usage of a DataFrame"""
+    usage = df.memory_usage(deep=True, index=True)
+    return {
+        "rows": len(df),
+        "total_bytes": int(usage.sum()),
+        "index_bytes": int(usage['Index']),
+        "columns": {
+            col: {"dtype": str(df[col].dtype), "bytes": int(usage[col])}
+            for col in df.columns
+        },
+    }
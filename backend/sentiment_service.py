@@ -0,0 +1,285 @@
+"""
+Micro-batched sentiment inference
+Requests enqueue texts on one dedicated inference thread that groups them
+into batches (up to MAX_BATCH_SIZE texts, or whatever arrived within
+MAX_WAIT_MS of the first) and runs the transformers pipeline once per
+batch with a bounded number of torch threads. Results are cached by text
+hash. Bulk mode scores every distinct value of a dataset column and stores
+the labels so they can be joined back onto the frame after reloads.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_DIR = Path(os.getenv("SENTIMENT_DIR", "data/.sentiment"))
+# Longest input in tokens; RoBERTa accepts at most 512
+MAX_TOKENS = 512
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def hash_texts(values: pd.Series) -> np.ndarray:
+    """Vectorized 64-bit hashes used to join stored scores onto a column"""
+    return pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+
+
+class SentimentService:
+    """Single inference thread fed by a queue of (text, future) pairs"""
+
+    def __init__(
+        self,
+        load_pipeline: Callable[[], Any],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        torch_threads: int = 2,
+        cache_size: int = 10000
+    ):
+        self.load_pipeline = load_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self.torch_threads = torch_threads
+        self.cache_size = cache_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {"texts": 0, "cache_hits": 0, "batches": 0, "batched_texts": 0, "errors": 0}
+        self.last_batch_ms = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="sentiment-inference", daemon=True)
+                self._thread.start()
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def submit(self, text: str) -> concurrent.futures.Future:
+        """Future for one text's {label, score}, answered from cache when possible"""
+        self.stats["texts"] += 1
+        key = text_key(text)
+        future = concurrent.futures.Future()
+        cached = self._cached(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            future.set_result(cached)
+            return future
+        self._ensure_started()
+        self._queue.put((key, text, future))
+        return future
+
+    async def score(self, texts: List[str]) -> List[Dict[str, Any]]:
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        return await asyncio.gather(*futures)
+
+    def score_blocking(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Score from a non-event-loop thread, e.g. a bulk job"""
+        return [future.result() for future in [self.submit(text) for text in texts]]
+
+    def _next_batch(self) -> List:
+        """Block for one item, then collect more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        try:
+            import torch
+            # Intra-op threads for the whole process; leaves cores for request handling
+            torch.set_num_threads(self.torch_threads)
+        except ImportError:
+            pass
+
+        while True:
+            batch = self._next_batch()
+            try:
+                pipeline = self.load_pipeline()
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            # Identical texts within a batch are inferred once
+            pending: Dict[str, List] = OrderedDict()
+            for key, text, future in batch:
+                pending.setdefault(key, [text, []])[1].append(future)
+
+            started = time.perf_counter()
+            try:
+                texts = [text for text, _ in pending.values()]
+                outputs = pipeline(texts, batch_size=len(texts), truncation=True, max_length=MAX_TOKENS)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Sentiment batch failed: {e}")
+                for _, futures in pending.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["batched_texts"] += len(texts)
+            self.last_batch_ms = round((time.perf_counter() - started) * 1000, 2)
+            for (key, (_, futures)), output in zip(pending.items(), outputs):
+                result = {"label": output["label"], "score": round(float(output["score"]), 4)}
+                self._store(key, result)
+                for future in futures:
+                    future.set_result(result)
+
+    def describe(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "torch_threads": self.torch_threads,
+            "queued": self._queue.qsize(),
+            "cached": len(self._cache),
+            "avg_batch_size": round(self.stats["batched_texts"] / batches, 2) if batches else None,
+            "last_batch_ms": self.last_batch_ms,
+            **self.stats,
+        }
+
+    # Bulk scoring of dataset columns
+
+    def score_column(self, dataset: str, df: pd.DataFrame, column: str, key_column: Optional[str] = None,
+                     chunk_size: int = 1024) -> Dict[str, Any]:
+        """Score every distinct non-empty value of a column and store the labels.
+
+        With key_column the labels are stored per row under that key, so they
+        can be attached to frames that no longer carry the text column.
+        """
+        values = df[column].astype(str).str.strip().where(df[column].notna(), "")
+        distinct = pd.Series(values[values != ""].unique())
+        labels, scores = [], []
+        started = time.perf_counter()
+        for start in range(0, len(distinct), chunk_size):
+            results = self.score_blocking(distinct.iloc[start:start + chunk_size].tolist())
+            labels.extend(result["label"] for result in results)
+            scores.extend(result["score"] for result in results)
+
+        scored = pd.DataFrame({
+            "text_hash": hash_texts(distinct),
+            "label": pd.Categorical(labels),
+            "score": np.asarray(scores, dtype=np.float32),
+        })
+        if key_column is not None:
+            # One entry per source row, in file order, empty text included
+            positions = pd.Index(distinct).get_indexer(values)
+            scored = pd.DataFrame({
+                "row_key": df[key_column].to_numpy(),
+                "label": scored["label"].array.take(positions, allow_fill=True),
+                "score": np.where(positions >= 0, scored["score"].to_numpy()[positions], np.nan).astype(np.float32),
+            })
+        save_scores(dataset, column, scored, key_column)
+        return {
+            "dataset": dataset,
+            "column": column,
+            "distinct_texts": len(distinct),
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+
+
+def scores_path(dataset: str, column: str) -> Path:
+    safe_column = "".join(ch if ch.isalnum() else "_" for ch in column)
+    return SENTIMENT_DIR / f"{dataset}__{safe_column}.feather"
+
+
+def save_scores(dataset: str, column: str, scored: pd.DataFrame, key_column: Optional[str] = None):
+    SENTIMENT_DIR.mkdir(parents=True, exist_ok=True)
+    path = scores_path(dataset, column)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    table = pa.Table.from_pandas(scored, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), b"commmob.column": column.encode()}
+    if key_column is not None:
+        metadata[b"commmob.key"] = key_column.encode()
+    table = table.replace_schema_metadata(metadata)
+    feather.write_feather(table, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"Stored sentiment for {len(scored)} {'rows' if key_column else 'distinct values'} of {dataset}.{column}")
+
+
+def key_positions(stored: pd.Series, current: pd.Series) -> np.ndarray:
+    """Stored row for each current row by key; repeated keys pair up in file order"""
+    if stored.is_unique:
+        return pd.Index(stored.to_numpy()).get_indexer(current.to_numpy())
+    stored_keys = pd.MultiIndex.from_arrays([stored.to_numpy(), stored.groupby(stored, dropna=False).cumcount().to_numpy()])
+    current_keys = pd.MultiIndex.from_arrays([current.to_numpy(), current.groupby(current, dropna=False).cumcount().to_numpy()])
+    return stored_keys.get_indexer(current_keys)
+
+
+def attach_scores(dataset: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Join stored scores onto their rows as <column>_sentiment and <column>_sentiment_score"""
+    if feather is None or not SENTIMENT_DIR.exists():
+        return df
+    for path in SENTIMENT_DIR.glob(f"{dataset}__*.feather"):
+        try:
+            table = feather.read_table(path)
+            metadata = table.schema.metadata or {}
+            column = metadata.get(b"commmob.column", b"").decode()
+            key_column = metadata.get(b"commmob.key", b"").decode()
+            scored = table.to_pandas()
+            if key_column:
+                # Scored from the source file; rows are matched on their key
+                if key_column not in df.columns:
+                    continue
+                positions = key_positions(scored["row_key"], df[key_column])
+            else:
+                if column not in df.columns:
+                    continue
+                lookup = pd.Index(scored["text_hash"].to_numpy())
+                positions = lookup.get_indexer(hash_texts(df[column].astype(str).str.strip()))
+                positions[df[column].isna().to_numpy()] = -1
+            found = positions >= 0
+            labels = pd.Categorical.from_codes(
+                np.where(found, scored["label"].cat.codes.to_numpy()[positions], -1),
+                categories=scored["label"].cat.categories
+            )
+            df[f"{column}_sentiment"] = labels
+            df[f"{column}_sentiment_score"] = np.where(found, scored["score"].to_numpy()[positions], np.nan).astype(np.float32)
+        except Exception as e:
+            logger.warning(f"Could not attach sentiment scores from {path}: {e}")
+    return df
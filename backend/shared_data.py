@@ -0,0 +1,183 @@
+"""
+Shared-memory data plane for multi-worker deployments
+One worker (whichever holds the loader lock) builds the enhanced frames
+and writes them as single-chunk, uncompressed Arrow IPC files under a
+versioned directory, then points the CURRENT handle at it. Every worker
+memory-maps those files, so numeric and datetime columns are backed by
+the shared page cache instead of a private copy per process.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# "private" loads data in every worker; "shared" attaches workers to one copy
+DATA_PLANE = os.getenv("DATA_PLANE", "private")
+SHARED_DIR = Path(os.getenv("SHARED_DATA_DIR", "data/.shared"))
+# Version directories kept for workers still attached to an older handle
+KEEP_VERSIONS = 3
+
+HANDLE_FILE = "CURRENT"
+LOCK_FILE = "loader.lock"
+
+_lock_handle = None
+
+
+def is_enabled() -> bool:
+    return DATA_PLANE == "shared" and feather is not None
+
+
+def try_become_loader() -> bool:
+    """Take the process-lifetime loader lock if no other worker holds it"""
+    global _lock_handle
+    if _lock_handle is not None:
+        return True
+    if fcntl is None:
+        # Without file locks every worker loads its own data
+        return True
+
+    SHARED_DIR.mkdir(parents=True, exist_ok=True)
+    handle = open(SHARED_DIR / LOCK_FILE, "a+")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    handle.truncate(0)
+    handle.write(str(os.getpid()))
+    handle.flush()
+    _lock_handle = handle
+    logger.info(f"Worker {os.getpid()} is the shared data loader")
+    return True
+
+
+def is_loader() -> bool:
+    return _lock_handle is not None or fcntl is None
+
+
+def loader_pid() -> Optional[int]:
+    """Process id recorded by the worker holding the loader lock"""
+    try:
+        return int((SHARED_DIR / LOCK_FILE).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def to_table(df: pd.DataFrame) -> "pa.Table":
+    """Arrow table that converts back to pandas without copying where possible"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        # Keep NaN as a value rather than a null so float columns map zero-copy
+        if isinstance(df[name].dtype, np.dtype) and df[name].dtype.kind == 'f':
+            table = table.set_column(i, table.field(i), pa.array(df[name].to_numpy(), from_pandas=False))
+    return table.combine_chunks()
+
+
+def read_handle() -> Optional[Dict[str, Any]]:
+    """The currently published version, or None"""
+    try:
+        with open(SHARED_DIR / HANDLE_FILE) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def publish(version: int, frames: Dict[str, pd.DataFrame], signature: str) -> Dict[str, Any]:
+    """Write frames for a version and atomically point the handle at them"""
+    version_dir = SHARED_DIR / f"v{version}"
+    tmp_dir = SHARED_DIR / f"v{version}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    datasets = {}
+    for name, df in frames.items():
+        table = to_table(df)
+        # One record batch per file so columns map to a single contiguous buffer
+        feather.write_feather(
+            table, tmp_dir / f"{name}.arrow", compression="uncompressed", chunksize=max(table.num_rows, 1)
+        )
+        datasets[name] = {"rows": table.num_rows, "bytes": (tmp_dir / f"{name}.arrow").stat().st_size}
+
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(tmp_dir, version_dir)
+
+    handle = {
+        "version": version,
+        "directory": version_dir.name,
+        "signature": signature,
+        "datasets": datasets,
+        "loader_pid": os.getpid(),
+        "published_at": time.time(),
+    }
+    tmp_handle = SHARED_DIR / f"{HANDLE_FILE}.{os.getpid()}.tmp"
+    with open(tmp_handle, "w") as out:
+        json.dump(handle, out)
+    os.replace(tmp_handle, SHARED_DIR / HANDLE_FILE)
+    logger.info(f"Published shared data version {version} to {version_dir}")
+
+    prune(keep=version_dir.name)
+    return handle
+
+
+def prune(keep: str):
+    """Remove the oldest version directories; open memory maps stay valid after unlink"""
+    versions = sorted(
+        (path for path in SHARED_DIR.glob("v*") if path.is_dir() and path.name[1:].isdigit()),
+        key=lambda path: int(path.name[1:])
+    )
+    for path in versions[:-KEEP_VERSIONS]:
+        if path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def attach(handle: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    """Memory-map every dataset of a published version"""
+    version_dir = SHARED_DIR / handle["directory"]
+    frames = {}
+    for name in handle["datasets"]:
+        table = feather.read_table(version_dir / f"{name}.arrow", memory_map=True)
+        # split_blocks keeps one block per column so mapped buffers are not consolidated
+        frames[name] = table.to_pandas(split_blocks=True)
+    logger.info(f"Attached shared data version {handle['version']} ({', '.join(frames)})")
+    return frames
+
+
+def current_handle() -> Optional[Dict[str, Any]]:
+    """The version published by the running loader; handles left by earlier runs are ignored"""
+    handle = read_handle()
+    if handle is not None and handle.get("loader_pid") == loader_pid():
+        return handle
+    return None
+
+
+def wait_for_handle(timeout_seconds: float, poll_seconds: float = 0.5) -> Optional[Dict[str, Any]]:
+    """Wait for the running loader to publish a version"""
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        handle = current_handle()
+        if handle is not None:
+            return handle
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll_seconds)
@@ -0,0 +1,485 @@
+"""
+Mergeable streaming sketches
+Summarizes datasets in bounded memory as rows arrive: KLL sketches for
+quantiles of the day measures, HyperLogLog for distinct counts and a
+count-min sketch with heavy-hitter candidates for top-k values. Quantile
+and distinct sketches are kept per group (state), so any set of groups
+can be merged into a region, and every sketch serializes to plain JSON so
+sketches built by different workers can be merged too.
+"""
+
+import base64
+import copy
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ingest import CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+KLL_K = 200
+# Smallest capacity of any KLL level
+KLL_MIN_CAPACITY = 8
+HLL_PRECISION = 12
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+# Values tracked as top-k candidates by each count-min sketch
+CMS_CANDIDATES = 64
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+UNKNOWN_GROUP = "Unknown"
+
+SKETCH_DEFINITIONS = {
+    'volunteers': {
+        'group': 'State',
+        'quantiles': ['days_since_login'],
+        'distinct': ['State', 'Chapter Name', 'County of Residence', 'Zip'],
+        'top': ['State', 'Chapter Name'],
+    },
+    'applicants': {
+        'group': 'State',
+        'quantiles': ['days_to_start', 'days_to_inactive'],
+        'distinct': ['State', 'City'],
+        'top': ['State', 'Workflow Type'],
+    },
+}
+
+# Time-relative measures are sketched from the timestamp they count from,
+# so the sketch stays valid as days pass
+RECENCY_COLUMNS = {'days_since_login': 'Last Login'}
+
+# Odd 64-bit multipliers, one per count-min row (multiply-shift hashing)
+CMS_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+     0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9],
+    dtype=np.uint64
+)
+
+
+def hash_column(series: pd.Series):
+    """64-bit hashes of the values' text, aligned to the rows, plus a mask of non-missing rows
+
+    Hashing the text rather than category codes keeps hashes equal across
+    frames and workers.
+    """
+    codes, uniques = pd.factorize(series)
+    unique_hashes = pd.util.hash_array(np.asarray(pd.Index(uniques).astype(str), dtype=object))
+    present = codes >= 0
+    hashes = np.zeros(len(codes), dtype=np.uint64)
+    hashes[present] = unique_hashes[codes[present]]
+    return hashes, present
+
+
+def _encode(array: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode()
+
+
+def _decode(text: str, dtype) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype=dtype).copy()
+
+
+class KLLSketch:
+    """Quantile sketch with rank error around 1.5% at k=200, independent of row count"""
+
+    def __init__(self, k: int = KLL_K, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        # Items at level h stand for 2**h rows each
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(KLL_MIN_CAPACITY, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so weights are conserved exactly
+                keep = len(items) % 2
+                promoted = items[keep:][int(self._rng.integers(2))::2]
+                self.levels[level] = items[:keep]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                compacted = True
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        if self.n == 0:
+            return [None for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        results = []
+        for q in qs:
+            if q <= 0:
+                results.append(self.min)
+            elif q >= 1:
+                results.append(self.max)
+            else:
+                index = int(np.searchsorted(cumulative, q * self.n, side='left'))
+                results.append(float(items[min(index, len(items) - 1)]))
+        return results
+
+    def retained(self) -> int:
+        return int(sum(len(items) for items in self.levels))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k, "n": self.n,
+            "min": self.min if self.n else None, "max": self.max if self.n else None,
+            "levels": [_encode(items.astype(np.float64)) for items in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=state["k"])
+        sketch.n = state["n"]
+        if sketch.n:
+            sketch.min, sketch.max = state["min"], state["max"]
+        sketch.levels = [_decode(items, np.float64) for items in state["levels"]] or [np.empty(0)]
+        return sketch
+
+
+class HyperLogLog:
+    """Distinct-count sketch; 2**p one-byte registers, about 1.04/sqrt(2**p) relative error"""
+
+    def __init__(self, p: int = HLL_PRECISION):
+        if not 11 <= p <= 18:
+            raise ValueError("HyperLogLog precision must be between 11 and 18")
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # The bits after the index, whose top 53 bits convert to float64 exactly
+        rest = ((hashes << np.uint64(self.p)) >> np.uint64(11)).astype(np.float64)
+        _, bit_length = np.frexp(rest)
+        # Position of the first set bit after the index bits
+        rank = np.minimum(53 - bit_length + 1, 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches of precision {self.p} and {other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": _encode(self.registers)}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(p=state["p"])
+        sketch.registers = _decode(state["registers"], np.uint8)
+        return sketch
+
+
+class CountMinSketch:
+    """Frequency sketch that never undercounts, plus the candidate values with the highest estimates"""
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH, candidates: int = CMS_CANDIDATES):
+        self.width = width
+        self.depth = depth
+        self.max_candidates = candidates
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates: Dict[str, int] = {}
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        mixed = hashes[None, :] * CMS_MULTIPLIERS[:self.depth, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def _estimate_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def _refresh_candidates(self, labels: Dict[str, int]):
+        """Re-estimate candidates and keep the ones with the highest counts"""
+        if not labels:
+            return
+        names = list(labels)
+        hashes = np.array([labels[name] for name in names], dtype=np.uint64)
+        estimates = self._estimate_hashes(hashes)
+        ranked = sorted(zip(names, estimates.tolist(), hashes.tolist()), key=lambda item: -item[1])
+        self.candidates = {name: hashed for name, _, hashed in ranked[:self.max_candidates]}
+
+    def update(self, series: pd.Series):
+        codes, uniques = pd.factorize(series)
+        if not len(uniques):
+            return
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        labels = pd.Index(uniques).astype(str)
+        hashes = pd.util.hash_array(np.asarray(labels, dtype=object))
+        columns = self._columns(hashes)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self._refresh_candidates({**self.candidates, **dict(zip(labels, hashes.tolist()))})
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches of different shapes")
+        self.table += other.table
+        self._refresh_candidates({**self.candidates, **other.candidates})
+        return self
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        if not self.candidates:
+            return []
+        names = list(self.candidates)
+        estimates = self._estimate_hashes(np.array(list(self.candidates.values()), dtype=np.uint64))
+        ranked = sorted(zip(names, estimates.tolist()), key=lambda item: (-item[1], item[0]))
+        return [{"value": name, "count": int(count)} for name, count in ranked[:n]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "width": self.width, "depth": self.depth,
+            "table": _encode(self.table), "candidates": list(self.candidates),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(width=state["width"], depth=state["depth"])
+        sketch.table = _decode(state["table"], np.int64).reshape(sketch.depth, sketch.width)
+        labels = state["candidates"]
+        hashes = pd.util.hash_array(np.asarray(labels, dtype=object)) if labels else []
+        sketch.candidates = dict(zip(labels, [int(h) for h in hashes]))
+        return sketch
+
+
+class DatasetSketches:
+    """Per-group quantile and distinct sketches and dataset-wide top-k sketches for one dataset"""
+
+    def __init__(self, name: str, definition: Dict[str, Any]):
+        self.name = name
+        self.definition = definition
+        self.rows = 0
+        self.quantile_sketches: Dict[str, Dict[str, KLLSketch]] = {col: {} for col in definition['quantiles']}
+        self.distinct_sketches: Dict[str, Dict[str, HyperLogLog]] = {col: {} for col in definition['distinct']}
+        self.top_sketches: Dict[str, CountMinSketch] = {col: CountMinSketch() for col in definition['top']}
+
+    def _measure(self, df: pd.DataFrame, column: str) -> Optional[np.ndarray]:
+        source = RECENCY_COLUMNS.get(column, column)
+        if source not in df.columns:
+            return None
+        if column in RECENCY_COLUMNS:
+            # Day number of the timestamp; days-since is taken from it at query time
+            return ((df[source] - pd.Timestamp(0)).dt.days).astype('float64').to_numpy()
+        return pd.to_numeric(df[source], errors='coerce').astype('float64').to_numpy()
+
+    def update(self, df: pd.DataFrame):
+        """Fold a batch of new rows into every sketch"""
+        group_column = self.definition['group']
+        if group_column in df.columns:
+            codes, uniques = pd.factorize(df[group_column])
+            labels = [str(value) for value in uniques] + [UNKNOWN_GROUP]
+        else:
+            codes, labels = np.full(len(df), -1), [UNKNOWN_GROUP]
+        # Missing groups (code -1) sort first and take the last label
+        codes = np.where(codes < 0, len(labels) - 1, codes)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(labels)))])
+        groups = [(labels[g], order[bounds[g]:bounds[g + 1]]) for g in range(len(labels)) if bounds[g + 1] > bounds[g]]
+
+        for column, per_group in self.quantile_sketches.items():
+            values = self._measure(df, column)
+            if values is None:
+                continue
+            for label, rows in groups:
+                per_group.setdefault(label, KLLSketch()).update(values[rows])
+
+        for column, per_group in self.distinct_sketches.items():
+            if column not in df.columns:
+                continue
+            hashes, present = hash_column(df[column])
+            for label, rows in groups:
+                per_group.setdefault(label, HyperLogLog()).update_hashes(hashes[rows[present[rows]]])
+
+        for column, sketch in self.top_sketches.items():
+            if column in df.columns:
+                sketch.update(df[column])
+
+        self.rows += len(df)
+
+    def update_frame(self, df: pd.DataFrame, start: int = 0):
+        """Fold rows from start onwards in ingest-sized batches"""
+        for offset in range(start, len(df), CHUNK_ROWS):
+            self.update(df.iloc[offset:offset + CHUNK_ROWS])
+
+    def groups(self) -> List[str]:
+        labels = set()
+        for per_group in list(self.quantile_sketches.values()) + list(self.distinct_sketches.values()):
+            labels.update(per_group)
+        return sorted(labels)
+
+    @staticmethod
+    def _select(per_group: Dict[str, Any], groups: Optional[List[str]]) -> List[Any]:
+        return [per_group[label] for label in (per_group if groups is None else groups) if label in per_group]
+
+    def quantiles(self, column: str, qs=DEFAULT_QUANTILES, groups: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Count and quantiles of a measure over the given groups (all when None), merged on the fly"""
+        if column not in self.quantile_sketches:
+            raise KeyError(f"No quantile sketch for {self.name}.{column}")
+        merged = KLLSketch()
+        for sketch in self._select(self.quantile_sketches[column], groups):
+            merged.merge(sketch)
+
+        if column in RECENCY_COLUMNS:
+            # Days since = today - timestamp day, so the q-quantile comes from the (1 - q)-quantile
+            today = (pd.Timestamp.now().normalize() - pd.Timestamp(0)).days
+            values = [None if v is None else today - v for v in merged.quantiles([1 - q for q in qs])]
+            low, high = (today - merged.max, today - merged.min) if merged.n else (None, None)
+        else:
+            values = merged.quantiles(qs)
+            low, high = (merged.min, merged.max) if merged.n else (None, None)
+
+        result = {"count": merged.n, "min": low, "max": high}
+        for q, value in zip(qs, values):
+            result[f"p{q * 100:g}"] = None if value is None else round(value, 1)
+        return result
+
+    def distinct(self, column: str, groups: Optional[List[str]] = None) -> int:
+        if column not in self.distinct_sketches:
+            raise KeyError(f"No distinct-count sketch for {self.name}.{column}")
+        merged = HyperLogLog()
+        for sketch in self._select(self.distinct_sketches[column], groups):
+            merged.merge(sketch)
+        return merged.estimate()
+
+    def top(self, column: str, n: int = 10) -> List[Dict[str, Any]]:
+        if column not in self.top_sketches:
+            raise KeyError(f"No top-k sketch for {self.name}.{column}")
+        return self.top_sketches[column].top(n)
+
+    def summary(self, qs=DEFAULT_QUANTILES, top_n: int = 10) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "group_by": self.definition['group'],
+            "groups": len(self.groups()),
+            "quantiles": {col: self.quantiles(col, qs) for col in self.quantile_sketches},
+            "distinct": {col: self.distinct(col) for col in self.distinct_sketches},
+            "top": {col: self.top(col, top_n) for col in self.top_sketches},
+        }
+
+    def memory_bytes(self) -> int:
+        total = sum(sketch.retained() * 8 for per_group in self.quantile_sketches.values() for sketch in per_group.values())
+        total += sum(sketch.registers.nbytes for per_group in self.distinct_sketches.values() for sketch in per_group.values())
+        total += sum(sketch.table.nbytes for sketch in self.top_sketches.values())
+        return int(total)
+
+    def merge(self, other: "DatasetSketches") -> "DatasetSketches":
+        """Fold in sketches of other rows of the same dataset, e.g. built by another worker"""
+        for column, per_group in other.quantile_sketches.items():
+            target = self.quantile_sketches.setdefault(column, {})
+            for label, sketch in per_group.items():
+                target[label] = target[label].merge(sketch) if label in target else copy.deepcopy(sketch)
+        for column, per_group in other.distinct_sketches.items():
+            target = self.distinct_sketches.setdefault(column, {})
+            for label, sketch in per_group.items():
+                target[label] = target[label].merge(sketch) if label in target else copy.deepcopy(sketch)
+        for column, sketch in other.top_sketches.items():
+            if column in self.top_sketches:
+                self.top_sketches[column].merge(sketch)
+            else:
+                self.top_sketches[column] = copy.deepcopy(sketch)
+        self.rows += other.rows
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dataset": self.name,
+            "definition": self.definition,
+            "rows": self.rows,
+            "quantiles": {col: {label: s.to_dict() for label, s in groups.items()} for col, groups in self.quantile_sketches.items()},
+            "distinct": {col: {label: s.to_dict() for label, s in groups.items()} for col, groups in self.distinct_sketches.items()},
+            "top": {col: s.to_dict() for col, s in self.top_sketches.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "DatasetSketches":
+        sketches = cls(state["dataset"], state["definition"])
+        sketches.rows = state["rows"]
+        sketches.quantile_sketches = {
+            col: {label: KLLSketch.from_dict(s) for label, s in groups.items()} for col, groups in state["quantiles"].items()
+        }
+        sketches.distinct_sketches = {
+            col: {label: HyperLogLog.from_dict(s) for label, s in groups.items()} for col, groups in state["distinct"].items()
+        }
+        sketches.top_sketches = {col: CountMinSketch.from_dict(s) for col, s in state["top"].items()}
+        return sketches
+
+
+def build_sketches(
+    data: Dict[str, pd.DataFrame],
+    modes: Dict[str, str],
+    previous: Dict[str, DatasetSketches]
+) -> Dict[str, DatasetSketches]:
+    """Sketches for a data version, folding in only appended rows when a source just grew"""
+    sketches = {}
+    for name, definition in SKETCH_DEFINITIONS.items():
+        df = data.get(name)
+        if df is None:
+            continue
+        prior = previous.get(name)
+        mode = modes.get(name)
+        try:
+            if prior is not None and mode == 'reused' and prior.rows == len(df):
+                sketches[name] = prior
+                continue
+            if prior is not None and mode == 'appended' and prior.rows <= len(df):
+                # The live version keeps reading the previous sketches while these are updated
+                current, start = copy.deepcopy(prior), prior.rows
+            else:
+                current, start = DatasetSketches(name, definition), 0
+            current.update_frame(df, start)
+            sketches[name] = current
+            logger.info(f"Sketched {len(df) - start} {name} rows ({current.memory_bytes() / 1e3:.0f} KB of sketches)")
+        except Exception as e:
+            logger.error(f"Error building {name} sketches: {e}")
+    return sketches
@@ -0,0 +1,118 @@
+"""
+Columnar snapshot cache for enhanced datasets
+Persists enhanced DataFrames as Arrow IPC (Feather) files keyed on the
+fingerprint of their source CSV so restarts can skip CSV parsing.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+import schemas
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the enhance functions change so stale snapshots are discarded
+SNAPSHOT_FORMAT_VERSION = 3
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "data/.snapshots"))
+SNAPSHOTS_ENABLED = os.getenv("DATA_SNAPSHOTS", "1") != "0"
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def is_available() -> bool:
+    """Whether snapshots can be read and written in this environment"""
+    return SNAPSHOTS_ENABLED and feather is not None
+
+
+def file_fingerprint(path: Path) -> Dict[str, Any]:
+    """Fingerprint a source file by path, size, mtime and content hash"""
+    stat = path.stat()
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "path": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+        # Snapshots hold the frame after schema pruning
+        "pruned": schemas.PRUNE_COLUMNS,
+    }
+
+
+def _snapshot_paths(name: str):
+    return SNAPSHOT_DIR / f"{name}.feather", SNAPSHOT_DIR / f"{name}.json"
+
+
+def load_snapshot(name: str, fingerprint: Dict[str, Any]) -> Optional[pd.DataFrame]:
+    """Load a snapshot if its recorded fingerprint matches the source file"""
+    if not is_available():
+        return None
+
+    data_path, manifest_path = _snapshot_paths(name)
+    if not data_path.exists() or not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as handle:
+            manifest = json.load(handle)
+
+        if manifest.get("fingerprint") != fingerprint:
+            logger.info(f"Snapshot for {name} is stale, reparsing source")
+            return None
+
+        # Memory-map the IPC file so pages are faulted in lazily
+        table = feather.read_table(data_path, memory_map=True)
+        df = table.to_pandas()
+        logger.info(f"Loaded {name} snapshot ({len(df)} rows) from {data_path}")
+        return df
+    except Exception as e:
+        logger.warning(f"Could not read snapshot for {name}: {e}")
+        return None
+
+
+def save_snapshot(name: str, fingerprint: Dict[str, Any], df: pd.DataFrame) -> bool:
+    """Atomically write a snapshot and its fingerprint manifest"""
+    if not is_available():
+        return False
+
+    data_path, manifest_path = _snapshot_paths(name)
+    tmp_data_path = data_path.with_suffix(f".feather.{os.getpid()}.tmp")
+    tmp_manifest_path = manifest_path.with_suffix(f".json.{os.getpid()}.tmp")
+
+    try:
+        SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+
+        # Uncompressed so the file can be memory-mapped on load
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, tmp_data_path, compression="uncompressed")
+        with open(tmp_manifest_path, "w") as handle:
+            json.dump({"name": name, "rows": len(df), "fingerprint": fingerprint}, handle)
+
+        # Data first, then manifest, so a reader never sees a manifest for a partial file
+        os.replace(tmp_data_path, data_path)
+        os.replace(tmp_manifest_path, manifest_path)
+        logger.info(f"Saved {name} snapshot to {data_path}")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not write snapshot for {name}: {e}")
+        for path in (tmp_data_path, tmp_manifest_path):
+            path.unlink(missing_ok=True)
+        return False
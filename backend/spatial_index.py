@@ -0,0 +1,107 @@
+"""
+Spatial index for volunteer and applicant locations
+Answers radius, bounding-box and k-nearest queries over the x/y (lon/lat)
+columns without scanning every row: a haversine BallTree serves distance
+queries and a longitude-sorted array serves viewport boxes. Indexes are
+built on the first query against a data version, so loading data never
+imports sklearn.
+"""
+
+import logging
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_MILES = 3958.8
+
+SPATIAL_DATASETS = ['volunteers', 'applicants']
+
+
+class SpatialIndex:
+    """Geocoded rows of one frame, indexed for distance and box queries"""
+
+    def __init__(self, df: pd.DataFrame, ball_tree_cls):
+        lon = df['x'].to_numpy(dtype=np.float64, na_value=np.nan)
+        lat = df['y'].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~(np.isnan(lon) | np.isnan(lat))
+        valid &= (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+        self.row_count = len(df)
+        self.positions = np.flatnonzero(valid)
+        self.lon = lon[valid]
+        self.lat = lat[valid]
+        self.tree = ball_tree_cls(np.radians(np.column_stack([self.lat, self.lon])), metric='haversine')
+
+        # Longitude-sorted view for bounding boxes
+        self.lon_order = np.argsort(self.lon, kind='stable')
+        self.lon_sorted = self.lon[self.lon_order]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _query_point(self, lat: float, lon: float) -> np.ndarray:
+        return np.radians([[lat, lon]])
+
+    def within_radius(self, lat: float, lon: float, miles: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions within the radius, nearest first, with distances in miles"""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ind, dist = self.tree.query_radius(
+            self._query_point(lat, lon), r=miles / EARTH_RADIUS_MILES,
+            return_distance=True, sort_results=True
+        )
+        return self.positions[ind[0]], dist[0] * EARTH_RADIUS_MILES
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions of the k nearest rows, nearest first, with distances in miles"""
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        dist, ind = self.tree.query(self._query_point(lat, lon), k=k)
+        return self.positions[ind[0]], dist[0] * EARTH_RADIUS_MILES
+
+    def within_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> np.ndarray:
+        """Sorted row positions inside the box"""
+        if min_lon <= max_lon:
+            start = np.searchsorted(self.lon_sorted, min_lon, side='left')
+            end = np.searchsorted(self.lon_sorted, max_lon, side='right')
+            candidates = self.lon_order[start:end]
+        else:
+            # Box crosses the antimeridian
+            candidates = np.concatenate([
+                self.lon_order[np.searchsorted(self.lon_sorted, min_lon, side='left'):],
+                self.lon_order[:np.searchsorted(self.lon_sorted, max_lon, side='right')],
+            ])
+        lat = self.lat[candidates]
+        candidates = candidates[(lat >= min_lat) & (lat <= max_lat)]
+        return np.sort(self.positions[candidates])
+
+
+class SpatialIndexCache:
+    """Spatial indexes of the current data version, built on first use"""
+
+    def __init__(self):
+        self.version = None
+        self._indexes: Dict[str, SpatialIndex] = {}
+        # Serializes builds so concurrent first queries share one index
+        self._lock = threading.Lock()
+
+    def get(self, name: str, df: pd.DataFrame, version: int, ball_tree_cls) -> SpatialIndex:
+        """Return the index of a dataset for this version, building it if needed"""
+        with self._lock:
+            if self.version is None or version > self.version:
+                self.version = version
+                self._indexes = {}
+            elif version != self.version:
+                # A request that started before a reload; its frame is no longer current
+                return SpatialIndex(df, ball_tree_cls)
+            index = self._indexes.get(name)
+            if index is None:
+                index = SpatialIndex(df, ball_tree_cls)
+                self._indexes[name] = index
+                logger.info(f"Built spatial index for {name} over {len(index)} points")
+            return index
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator
+Writes schema-faithful Volunteer 2025.csv and Applicants 2025.csv files
+(same headers, MM/DD/YYYY dates and value vocabularies as the real
+extracts) at any row count, plus proportionally sized donor and Biomed
+files. Rows are generated and written in chunks so multi-million-row
+files do not need the whole dataset in memory.
+
+Usage: python synthetic_data.py 100k --out /tmp/bench/data
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 250_000
+# Donor and Biomed files scale with the volunteer row count
+DONOR_FRACTION = 0.1
+BIOMED_FRACTION = 0.01
+
+# State, approximate centroid (lon, lat) and relative weight
+STATES = [
+    ('CA', -119.4, 36.8, 12), ('TX', -99.9, 31.0, 9), ('FL', -81.5, 27.7, 7), ('NY', -75.5, 42.9, 6),
+    ('PA', -77.2, 41.2, 4), ('IL', -89.4, 40.6, 4), ('OH', -82.9, 40.4, 4), ('GA', -83.6, 32.2, 3),
+    ('NC', -79.0, 35.8, 3), ('MI', -84.5, 44.3, 3), ('NV', -116.4, 38.8, 2), ('UT', -111.1, 39.3, 2),
+    ('AZ', -111.1, 34.0, 2), ('CO', -105.8, 39.1, 2), ('WA', -120.7, 47.8, 2), ('KY', -84.3, 37.8, 1),
+    ('TN', -86.6, 35.5, 2), ('OR', -120.6, 43.8, 1), ('NM', -105.9, 34.5, 1), ('ID', -114.7, 44.1, 1),
+]
+STATE_CODES = np.array([state[0] for state in STATES])
+STATE_LON = np.array([state[1] for state in STATES])
+STATE_LAT = np.array([state[2] for state in STATES])
+STATE_WEIGHTS = np.array([state[3] for state in STATES], dtype=float) / sum(state[3] for state in STATES)
+
+CHAPTERS = ['Central Texas', 'Southern Nevada', 'Greater Salt Lake', 'Los Angeles Region', 'Greater New York',
+            'South Florida', 'Northern California Coastal', 'Chicago & Northern Illinois', 'Kentucky Region']
+COUNTIES = ['Travis', 'Clark', 'Salt Lake', 'Los Angeles', 'Kings', 'Miami-Dade', 'Cook', 'Jefferson', 'Maricopa']
+CITIES = ['Austin', 'Las Vegas', 'Salt Lake City', 'Los Angeles', 'New York', 'Miami', 'Chicago', 'Louisville', 'Phoenix']
+POSITIONS = ['Disaster Action Team', 'Blood Donor Ambassador', 'Disaster Health Services', 'Shelter Associate',
+             'Transportation Specialist', 'Youth Leadership', 'Service to the Armed Forces', 'Home Fire Campaign']
+
+VOLUNTEER_STATUSES = (['General Volunteer', 'Prospective Volunteer', 'Youth Under 18', 'Employee', 'Event Based Volunteer'],
+                      [0.55, 0.2, 0.1, 0.1, 0.05])
+APPLICANT_STATUSES = (['General Volunteer', 'Inactive Prospective Volunteer', 'Lapsed Volunteer', 'Prospective Volunteer'],
+                      [0.35, 0.35, 0.1, 0.2])
+WORKFLOWS = (['Standard', 'Fast Track', 'Youth', 'Event Based'], [0.6, 0.25, 0.1, 0.05])
+BGC_STATUSES = (['Completed', 'Pending', 'Not Required', 'Expired'], [0.6, 0.25, 0.1, 0.05])
+
+DATE_FORMAT = '%m/%d/%Y'
+EPOCH = np.datetime64('2019-01-01')
+
+
+def parse_rows(text: str) -> int:
+    """Row count from '10k', '1m' or '2500'"""
+    text = text.strip().lower().replace('_', '')
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def choice(rng, options, n):
+    values, weights = options
+    return rng.choice(values, size=n, p=weights)
+
+
+def coordinates(rng, n):
+    """State codes with coordinates scattered around each state's centroid"""
+    states = rng.choice(len(STATES), size=n, p=STATE_WEIGHTS)
+    lon = STATE_LON[states] + rng.normal(0, 1.2, n)
+    lat = STATE_LAT[states] + rng.normal(0, 0.9, n)
+    return STATE_CODES[states], lon, lat
+
+
+def dates(rng, n, start_days, span_days, missing=0.0):
+    """Formatted dates, blank for a fraction of rows"""
+    values = EPOCH + rng.integers(start_days, start_days + span_days, n).astype('timedelta64[D]')
+    text = pd.Series(values).dt.strftime(DATE_FORMAT)
+    if missing:
+        text[rng.random(n) < missing] = ''
+    return text
+
+
+def volunteer_chunk(rng, start, n):
+    states, lon, lat = coordinates(rng, n)
+    lon[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({
+        'ObjectId': np.arange(start + 1, start + n + 1),
+        'Chapter Name': rng.choice(CHAPTERS, n),
+        'State': states,
+        'Current Status': choice(rng, VOLUNTEER_STATUSES, n),
+        'Current Positions': rng.choice(POSITIONS, n),
+        'x': lon.round(6),
+        'y': lat.round(6),
+        'Zip': rng.integers(10000, 99999, n),
+        'County of Residence': rng.choice(COUNTIES, n),
+        'Vol Start Dt': dates(rng, n, 0, 2000),
+        'Volunteer Since Date': dates(rng, n, 0, 2000, missing=0.3),
+        'Last Login': dates(rng, n, 1500, 700, missing=0.05),
+    })
+
+
+def applicant_chunk(rng, start, n):
+    states, lon, lat = coordinates(rng, n)
+    applied = EPOCH + rng.integers(1000, 2300, n).astype('timedelta64[D]')
+    days_to_start = rng.gamma(2.0, 15.0, n).round().astype(int) + 1
+    started = pd.Series(applied + days_to_start.astype('timedelta64[D]')).dt.strftime(DATE_FORMAT)
+    not_started = rng.random(n) < 0.4
+    started[not_started] = ''
+    inactive = pd.Series(applied + rng.integers(60, 500, n).astype('timedelta64[D]')).dt.strftime(DATE_FORMAT)
+    inactive[rng.random(n) < 0.7] = ''
+    return pd.DataFrame({
+        'ObjectId': np.arange(start + 1, start + n + 1),
+        'City': rng.choice(CITIES, n),
+        'State': states,
+        'Current Status': choice(rng, APPLICANT_STATUSES, n),
+        'Workflow Type': choice(rng, WORKFLOWS, n),
+        'Application Dt': pd.Series(applied).dt.strftime(DATE_FORMAT),
+        'Vol Start Dt': started,
+        'Inactive Dt': inactive,
+        'Days To Vol Start': np.where(not_started, '', days_to_start.astype(str)),
+        'BGC Status': choice(rng, BGC_STATUSES, n),
+        'Attend Orient. Step': rng.choice(['Yes', 'No', ''], n, p=[0.6, 0.2, 0.2]),
+        'x': lon.round(6),
+        'y': lat.round(6),
+    })
+
+
+def donor_chunk(rng, start, n):
+    _, lon, lat = coordinates(rng, n)
+    gifts = np.maximum(5000, rng.lognormal(9.4, 0.8, n)).round(-2)
+    return pd.DataFrame({
+        # The real extract has a padded header and padded currency strings
+        ' Gift $ ': [f" ${gift:,.0f} " for gift in gifts],
+        'X': lon.round(7),
+        'Y': lat.round(7),
+    })
+
+
+def biomed_chunk(rng, start, n):
+    states, lon, lat = coordinates(rng, n)
+    projection = rng.integers(20, 2000, n)
+    return pd.DataFrame({
+        'Sponsor Ext ID': [f"BIO{start + i + 1:07d}" for i in range(n)],
+        'Account Name': [f"Sponsor {start + i + 1}" for i in range(n)],
+        'Account Type': rng.choice(['Community', 'Education', 'Faith Based', 'Business', 'Government'], n),
+        'Status': rng.choice(['Complete', 'Scheduled', 'Cancelled'], n, p=[0.7, 0.2, 0.1]),
+        'Drives': rng.integers(1, 30, n),
+        'RBC Products Collected': (projection * rng.uniform(0.6, 1.2, n)).round().astype(int),
+        'RBC Product Projection': projection,
+        'Lat': lat.round(6),
+        'Long': lon.round(6),
+        'Address': [f"{100 + i % 9900} Main St" for i in range(n)],
+        'City': rng.choice(CITIES, n),
+        'St': states,
+        'Zip': rng.integers(10000, 99999, n),
+        'Year': rng.choice([2023, 2024, 2025], n),
+    })
+
+
+DATASETS = {
+    'Volunteer 2025.csv': (volunteer_chunk, 1.0, 'utf-8'),
+    'Applicants 2025.csv': (applicant_chunk, 1.0, 'utf-8'),
+    '>$5K donors past 12 months.csv': (donor_chunk, DONOR_FRACTION, 'utf-8-sig'),
+    'Biomed.csv': (biomed_chunk, BIOMED_FRACTION, 'utf-8-sig'),
+}
+
+
+def write_dataset(path: Path, make_chunk, rows: int, rng, encoding: str = 'utf-8'):
+    """Write a CSV in CHUNK_ROWS pieces"""
+    with open(path, 'w', encoding=encoding, newline='') as out:
+        for start in range(0, max(rows, 1), CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            if n <= 0:
+                break
+            make_chunk(rng, start, n).to_csv(out, index=False, header=start == 0)
+
+
+def generate(out_dir: Path, rows: int, seed: int = 0) -> dict:
+    """Write every synthetic dataset for a volunteer/applicant row count; returns file sizes"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    sizes = {}
+    for filename, (make_chunk, fraction, encoding) in DATASETS.items():
+        path = out_dir / filename
+        write_dataset(path, make_chunk, max(int(rows * fraction), 1), rng, encoding)
+        sizes[filename] = path.stat().st_size
+        logger.info(f"Wrote {path} ({sizes[filename] / 1e6:.1f} MB)")
+    return sizes
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Generate synthetic CommMob data files")
+    parser.add_argument("rows", help="volunteer and applicant rows, e.g. 10k, 100k, 1m, 5m")
+    parser.add_argument("--out", default="data", help="output directory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(Path(args.out), parse_rows(args.rows), args.seed)
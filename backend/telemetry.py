@@ -0,0 +1,197 @@
+"""
+Prometheus metrics and stage timers
+Records per-route latency, in-flight requests and response sizes from an
+ASGI middleware, times named stages inside the hot paths (CSV parsing,
+enhancement, filtering, clustering, serialization), and exports the
+describe() counters of registered components such as the response cache
+and WebSocket hub as gauges at scrape time. Everything is a no-op when
+prometheus-client is not installed. With several workers, each scrape
+reports the worker that answered it.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+        PlatformCollector, ProcessCollector, generate_latest
+    )
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    CollectorRegistry = None
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "commmob"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = tuple(100 * 4 ** i for i in range(12))  # 100 B to ~420 MB
+
+UNMATCHED_ROUTE = "unmatched"
+
+_components: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def is_available() -> bool:
+    return CollectorRegistry is not None
+
+
+if is_available():
+    REGISTRY = CollectorRegistry()
+    ProcessCollector(registry=REGISTRY)
+    PlatformCollector(registry=REGISTRY)
+
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "Request latency by route", ["method", "route"],
+        namespace=NAMESPACE, buckets=LATENCY_BUCKETS, registry=REGISTRY
+    )
+    REQUESTS = Counter(
+        "http_requests", "Requests by route and status", ["method", "route", "status"],
+        namespace=NAMESPACE, registry=REGISTRY
+    )
+    IN_FLIGHT = Gauge(
+        "http_requests_in_flight", "Requests being handled", ["method", "route"],
+        namespace=NAMESPACE, registry=REGISTRY
+    )
+    RESPONSE_SIZE = Histogram(
+        "http_response_size_bytes", "Response body size by route", ["method", "route"],
+        namespace=NAMESPACE, buckets=SIZE_BUCKETS, registry=REGISTRY
+    )
+    STAGE_SECONDS = Histogram(
+        "stage_duration_seconds", "Time spent in a hot-path stage", ["stage"],
+        namespace=NAMESPACE, buckets=STAGE_BUCKETS, registry=REGISTRY
+    )
+    FRAME_BYTES = Gauge(
+        "dataframe_memory_bytes", "Deep memory usage of a cached dataset", ["dataset"],
+        namespace=NAMESPACE, registry=REGISTRY
+    )
+    FRAME_ROWS = Gauge(
+        "dataframe_rows", "Rows in a cached dataset", ["dataset"],
+        namespace=NAMESPACE, registry=REGISTRY
+    )
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block of work as one observation of a named stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if is_available():
+            STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def record_frames(sizes: Dict[str, int], rows: Dict[str, int]):
+    """Set memory and row gauges for the datasets of the live version"""
+    if not is_available():
+        return
+    FRAME_BYTES.clear()
+    FRAME_ROWS.clear()
+    for name, size in sizes.items():
+        FRAME_BYTES.labels(name).set(size)
+    for name, count in rows.items():
+        FRAME_ROWS.labels(name).set(count)
+
+
+def register_component(name: str, describe: Callable[[], Optional[Dict[str, Any]]]):
+    """Export a component's numeric describe() fields as commmob_<name>_<field> gauges"""
+    _components[name] = describe
+
+
+def _metric_name(*parts: str) -> str:
+    name = "_".join(parts).lower()
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float))
+
+
+class ComponentCollector:
+    """Reads registered components at scrape time; nested dicts become a 'name' label"""
+
+    def collect(self):
+        for component, describe in list(_components.items()):
+            try:
+                fields = describe() or {}
+            except Exception as e:
+                logger.warning(f"Could not describe {component} for metrics: {e}")
+                continue
+            labelled: Dict[str, List] = {}
+            for field, value in fields.items():
+                if _is_number(value):
+                    yield GaugeMetricFamily(_metric_name(NAMESPACE, component, field), f"{component} {field}", value=float(value))
+                elif isinstance(value, dict):
+                    for member, stats in value.items():
+                        if not isinstance(stats, dict):
+                            continue
+                        for stat, number in stats.items():
+                            if _is_number(number):
+                                labelled.setdefault(_metric_name(NAMESPACE, component, field, stat), []).append((member, number))
+            for metric, samples in labelled.items():
+                family = GaugeMetricFamily(metric, metric, labels=["name"])
+                for member, number in samples:
+                    family.add_metric([str(member)], float(number))
+                yield family
+
+
+if is_available():
+    REGISTRY.register(ComponentCollector())
+
+
+def exposition() -> tuple:
+    """Body and content type of a scrape"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight count and response size per route template"""
+
+    def __init__(self, app, routes: List):
+        self.app = app
+        self.routes = routes
+
+    def route_for(self, scope) -> str:
+        # Route templates keep label cardinality bounded, e.g. /api/map/tiles/{dataset}/{z}/{x}/{y}
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_available():
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self.route_for(scope)
+        status = {"code": 500}
+        size = {"bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                size["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            RESPONSE_SIZE.labels(method, route).observe(size["bytes"])
+            REQUESTS.labels(method, route, str(status["code"])).inc()
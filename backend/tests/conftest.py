@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend modules are imported by their flat names, as main.py does
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
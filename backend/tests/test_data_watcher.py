@@ -0,0 +1,97 @@
+import os
+
+from data_watcher import APPENDED, MISSING, REPLACED, UNCHANGED, detect_change, read_appended, scan_source
+
+HEADER = "id,name\n"
+
+
+def write_rows(path, start, stop):
+    path.write_text(HEADER + "".join(f"{i},row{i}\n" for i in range(start, stop)))
+
+
+def append_text(path, text):
+    with open(path, "a") as handle:
+        handle.write(text)
+
+
+def touch_later(path, state):
+    # Make sure the change is visible even on coarse mtime clocks
+    os.utime(path, ns=(state.mtime_ns + 1_000_000_000, state.mtime_ns + 1_000_000_000))
+
+
+def test_unchanged_file(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 10)
+    state = scan_source(path, 10)
+    assert detect_change(state, path) == UNCHANGED
+
+
+def test_appended_rows_are_read_from_the_offset(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 10)
+    state = scan_source(path, 10)
+
+    append_text(path, "10,row10\n11,row11\n")
+    assert detect_change(state, path) == APPENDED
+
+    delta, state = read_appended(state)
+    assert delta["id"].tolist() == [10, 11]
+    assert state.rows == 12
+    assert detect_change(state, path) == UNCHANGED
+
+    # The digest carried forward still matches after a second append
+    append_text(path, "12,row12\n")
+    assert detect_change(state, path) == APPENDED
+
+
+def test_partial_last_line_waits_for_the_next_poll(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 3)
+    state = scan_source(path, 3)
+
+    append_text(path, "3,row3\n4,ro")
+    delta, state = read_appended(state)
+    assert delta["id"].tolist() == [3]
+
+    append_text(path, "w4\n")
+    assert detect_change(state, path) == APPENDED
+    delta, state = read_appended(state)
+    assert delta["name"].tolist() == ["row4"]
+
+
+def test_edit_in_the_middle_is_a_rewrite(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 50_000)
+    state = scan_source(path, 50_000)
+
+    # Same length, far from both ends of the file, plus an appended row
+    content = path.read_bytes().replace(b"25000,row25000\n", b"25000,edit2500\n")
+    path.write_bytes(content + b"50000,row50000\n")
+    assert detect_change(state, path) == REPLACED
+
+
+def test_shrunk_file_is_a_rewrite(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 10)
+    state = scan_source(path, 10)
+
+    write_rows(path, 0, 5)
+    assert detect_change(state, path) == REPLACED
+
+
+def test_changed_header_is_a_rewrite(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 10)
+    state = scan_source(path, 10)
+
+    path.write_text(path.read_text().replace("id,name", "id,nick") + "10,row10\n")
+    touch_later(path, state)
+    assert detect_change(state, path) == REPLACED
+
+
+def test_missing_file(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, 0, 3)
+    state = scan_source(path, 3)
+    path.unlink()
+    assert detect_change(state, path) == MISSING
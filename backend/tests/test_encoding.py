@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.requests import Request
+
+import encoding
+from encoding import COLUMNAR_JSON, JSON, MSGPACK, frame_response, negotiate, negotiate_encoding, parse_accept
+
+
+def make_request(accept=None, accept_encoding=None):
+    headers = []
+    if accept is not None:
+        headers.append((b"accept", accept.encode()))
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_accept_orders_by_quality_then_header_order():
+    header = f"{JSON};q=0.5, {COLUMNAR_JSON}, application/x-msgpack;q=0.9"
+    assert parse_accept(header) == [COLUMNAR_JSON, MSGPACK, JSON]
+
+
+def test_accept_drops_q_zero():
+    assert parse_accept(f"{COLUMNAR_JSON};q=0, {JSON}") == [JSON]
+    assert negotiate(make_request(accept=f"{COLUMNAR_JSON};q=0")) == JSON
+
+
+def test_accept_falls_back_to_json():
+    assert negotiate(make_request()) == JSON
+    assert negotiate(make_request(accept="text/html")) == JSON
+    assert negotiate(make_request(accept=f"text/html, {COLUMNAR_JSON};q=0.1")) == COLUMNAR_JSON
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", None)
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(encoding, "brotli", object())
+
+
+def test_encoding_q_zero_is_never_chosen(no_brotli):
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*;q=0.5, gzip;q=0") is None
+
+
+def test_encoding_wildcard(no_brotli):
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("*;q=0") is None
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("") is None
+
+
+def test_encoding_prefers_brotli_on_ties(with_brotli):
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+    assert negotiate_encoding("br;q=0, *") == "gzip"
+
+
+def test_encoding_is_not_a_substring_match(no_brotli):
+    assert negotiate_encoding("x-gzip-like") is None
+
+
+def test_frame_response_honors_both_headers(no_brotli):
+    frame = pd.DataFrame({"id": np.arange(500), "name": [f"row{i}" for i in range(500)]})
+
+    response = frame_response(make_request(accept=JSON, accept_encoding="gzip"), {"data": frame}, {"total": 500})
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body))["total"] == 500
+
+    response = frame_response(make_request(accept=JSON, accept_encoding="gzip;q=0"), {"data": frame})
+    assert "content-encoding" not in response.headers
+    assert len(json.loads(response.body)["data"]) == 500
+
+
+def test_float32_columns_are_written_at_float32_precision():
+    frame = pd.DataFrame({"x": np.array([0.1, -83.06893], dtype=np.float32)})
+    for media_type in (JSON, COLUMNAR_JSON):
+        response = frame_response(make_request(accept=media_type), {"data": frame})
+        body = response.body.decode()
+        assert "0.1" in body and "-83.06893" in body
+        assert "0.10000000149" not in body
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex, select_page
+from pagination import InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint
+
+
+def frame(ids):
+    return pd.DataFrame({
+        "ObjectId": ids,
+        "State": ["CA" if i % 3 else "NV" for i in ids],
+        "Current Status": ["Active"] * len(ids),
+    })
+
+
+def walk(df, filters, limit):
+    """Every ObjectId served by following next cursors from the first page"""
+    index = FilterIndex(df, ["State", "Current Status"], key_column="ObjectId")
+    fingerprint = filter_fingerprint("volunteers", filters)
+    seen, after = [], None
+    while True:
+        page = select_page(df, index, filters, 0, limit, after=after)
+        seen.extend(page.rows["ObjectId"].tolist())
+        if len(page.positions) == 0 or page.start + len(page.positions) >= page.total:
+            return seen
+        last = int(page.positions[-1])
+        after = decode_cursor(encode_cursor(df["ObjectId"].iat[last], last, fingerprint), fingerprint)
+
+
+def test_cursor_round_trip():
+    fingerprint = filter_fingerprint("volunteers", {"State": "CA"})
+    cursor = encode_cursor(np.int64(42), 7, fingerprint)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, fingerprint) == {"key": 42, "position": 7}
+    assert decode_cursor(encode_cursor("BIO0000001", 0, fingerprint), fingerprint)["key"] == "BIO0000001"
+
+
+def test_cursor_is_bound_to_its_filters():
+    cursor = encode_cursor(1, 0, filter_fingerprint("volunteers", {"State": "CA"}))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, filter_fingerprint("volunteers", {"State": "NV"}))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, filter_fingerprint("applicants", {"State": "CA"}))
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "e30", "eyJrIjoxfQ"])
+def test_malformed_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, filter_fingerprint("volunteers", {}))
+
+
+def test_fingerprint_ignores_order_and_inactive_filters():
+    assert filter_fingerprint("volunteers", {"State": "CA", "Current Status": None}) == \
+        filter_fingerprint("volunteers", {"State": "CA"})
+    assert filter_fingerprint("volunteers", {"a": "1", "b": "2"}) == filter_fingerprint("volunteers", {"b": "2", "a": "1"})
+
+
+@pytest.mark.parametrize("filters", [{}, {"State": "CA"}, {"State": "NV", "Current Status": "Active"}])
+def test_cursor_walk_serves_every_row_once(filters):
+    df = frame(list(range(1, 101)))
+    expected = df
+    for column, value in filters.items():
+        expected = expected[expected[column] == value]
+    assert walk(df, filters, limit=7) == expected["ObjectId"].tolist()
+
+
+def test_cursor_resumes_by_key_after_rows_shift():
+    fingerprint = filter_fingerprint("volunteers", {})
+    df = frame(list(range(1, 21)))
+    page = select_page(df, FilterIndex(df, ["State"], key_column="ObjectId"), {}, 0, 5)
+    cursor = encode_cursor(df["ObjectId"].iat[int(page.positions[-1])], int(page.positions[-1]), fingerprint)
+
+    # Rows inserted ahead of the cursor move the last served row to a new position
+    shifted = frame([101, 102, 103] + list(range(1, 21)))
+    index = FilterIndex(shifted, ["State"], key_column="ObjectId")
+    page = select_page(shifted, index, {}, 0, 5, after=decode_cursor(cursor, fingerprint))
+    assert page.rows["ObjectId"].tolist() == [6, 7, 8, 9, 10]
+
+
+def test_duplicate_keys_resume_near_the_hint():
+    df = frame([1, 2, 2, 3, 2, 4])
+    index = FilterIndex(df, ["State"], key_column="ObjectId")
+    assert index.position_of(2, 2) == 2
+    # A stale hint picks the matching row closest to it instead of raising
+    assert index.position_of(2, 5) == 4
+    assert index.position_of(2, 0) == 1
+    assert index.position_of(99, 3) == 3
+
+    fingerprint = filter_fingerprint("volunteers", {})
+    after = decode_cursor(encode_cursor(2, 5, fingerprint), fingerprint)
+    page = select_page(df, index, {}, 0, 10, after=after)
+    assert page.rows["ObjectId"].tolist() == [4]
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import query_engine
+from query_engine import InvalidQuery, QueryEngine, compile_sql, parse_spec, run_pandas
+
+STATES = ['CA', 'NV', 'TX', None]
+STATUSES = ['General Volunteer', 'Inactive Prospective Volunteer', 'Lapsed Volunteer']
+
+PARITY_QUERIES = [
+    {"group_by": ["State"]},
+    {
+        "group_by": ["State", "Current Status"],
+        "aggregates": [
+            "count",
+            {"fn": "avg", "column": "days_to_start"},
+            {"fn": "sum", "column": "days_to_start"},
+            {"fn": "min", "column": "Application Dt"},
+            {"fn": "max", "column": "Application Dt"},
+            {"fn": "count_distinct", "column": "City"},
+            {"fn": "count", "column": "days_to_start"},
+        ],
+        "order_by": [{"column": "count", "desc": True}],
+    },
+    {
+        "group_by": [{"column": "Application Dt", "bucket": "month"}],
+        "filters": [{"column": "Application Dt", "op": "between", "value": ["2024-03-01", "2024-09-30"]}],
+        "aggregates": [{"fn": "median", "column": "days_to_start"}],
+    },
+    {
+        "group_by": [{"column": "Application Dt", "bucket": "week"}, "Workflow Type"],
+        "aggregates": [{"fn": "avg", "column": "x"}],
+        "limit": 20,
+    },
+    {
+        "group_by": [{"column": "Application Dt", "bucket": "quarter"}],
+        "filters": [
+            {"column": "State", "op": "ne", "value": "CA"},
+            {"column": "Current Status", "op": "not_in", "value": ["Lapsed Volunteer"]},
+        ],
+    },
+    {
+        "filters": [{"column": "days_to_start", "op": "gt", "value": 10}],
+        "aggregates": [
+            {"fn": "quantile", "column": "days_to_start", "q": 0.9},
+            {"fn": "max", "column": "days_to_start"},
+            "count",
+        ],
+    },
+    {
+        "group_by": ["City"],
+        "filters": [{"column": "State", "op": "is_null"}],
+        "aggregates": ["count", {"fn": "sum", "column": "days_to_start", "as": "total_days"}],
+        "order_by": ["total_days"],
+    },
+    {
+        "filters": [{"column": "State", "op": "eq", "value": "nowhere"}],
+        "aggregates": ["count", {"fn": "avg", "column": "days_to_start"}],
+    },
+    {
+        "group_by": ["Workflow Type"],
+        "filters": [{"column": "Application Dt", "op": "ge", "value": "2024-06-01"}],
+        "aggregates": [{"fn": "min", "column": "days_to_start"}],
+        "order_by": [{"column": "min_days_to_start", "desc": True}],
+    },
+]
+
+
+@pytest.fixture(scope="module")
+def applicants():
+    rng = np.random.default_rng(7)
+    n = 2000
+    applied = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    days = pd.array(rng.integers(-3, 120, n), dtype="Int32")
+    days[rng.random(n) < 0.2] = pd.NA
+    return pd.DataFrame({
+        "State": pd.Categorical(rng.choice(STATES, n)),
+        "Current Status": pd.Categorical(rng.choice(STATUSES, n)),
+        "Workflow Type": pd.Categorical(rng.choice(['Standard', 'Youth', None], n)),
+        "City": rng.choice(['Reno', 'Austin', 'Fresno', 'Dallas'], n).astype(object),
+        "Application Dt": applied.where(rng.random(n) > 0.05),
+        "days_to_start": days,
+        "x": rng.uniform(-120, -90, n).astype(np.float32),
+    })
+
+
+def normalize(df):
+    """Rows as plain Python values, so both engines' dtypes compare equal"""
+    rows = []
+    for record in df.astype(object).to_dict("records"):
+        row = {}
+        for name, value in record.items():
+            if value is None or value is pd.NA or (not isinstance(value, str) and pd.isna(value)):
+                value = None
+            elif isinstance(value, (pd.Timestamp, np.datetime64)) or hasattr(value, "isoformat"):
+                value = pd.Timestamp(value).tz_localize(None).isoformat()
+            elif isinstance(value, (float, np.floating)):
+                value = round(float(value), 3)
+            elif isinstance(value, (int, np.integer)):
+                value = float(value)
+            else:
+                value = str(value)
+            row[name] = value
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("payload", PARITY_QUERIES, ids=range(len(PARITY_QUERIES)))
+def test_duckdb_and_pandas_agree(applicants, payload):
+    duckdb = pytest.importorskip("duckdb")
+    spec = parse_spec({"dataset": "applicants", **payload}, {"applicants": applicants})
+    sql, params = compile_sql(spec)
+
+    connection = duckdb.connect(":memory:")
+    connection.register("applicants", applicants)
+    expected = connection.execute(sql, params).fetchdf()
+
+    actual = run_pandas(applicants, spec)
+    assert list(actual.columns) == list(expected.columns)
+    assert normalize(actual) == normalize(expected)
+
+
+def test_pandas_fallback_through_the_engine(applicants, monkeypatch):
+    monkeypatch.setattr(query_engine, "duckdb", None)
+    engine = QueryEngine()
+    engine.install({"applicants": applicants}, version=1)
+    payload = {"dataset": "applicants", "group_by": ["State"], "order_by": [{"column": "count", "desc": True}]}
+
+    first = engine.execute(payload)
+    assert first["meta"]["engine"] == "pandas"
+    assert not first["meta"]["cached"]
+    assert first["result"]["count"].sum() == len(applicants)
+    assert engine.execute(payload)["meta"]["cached"]
+
+    # A new data version drops cached results
+    engine.install({"applicants": applicants.head(10)}, version=2)
+    second = engine.execute(payload)
+    assert not second["meta"]["cached"]
+    assert second["result"]["count"].sum() == 10
+
+
+@pytest.mark.parametrize("payload", [
+    {"dataset": "unknown"},
+    {"dataset": "applicants", "group_by": ["missing"]},
+    {"dataset": "applicants", "aggregates": [{"fn": "avg", "column": "City"}]},
+    {"dataset": "applicants", "filters": [{"column": "City", "op": "gt", "value": "A"}]},
+    {"dataset": "applicants", "filters": [{"column": "days_to_start", "op": "eq", "value": "1; DROP"}]},
+    {"dataset": "applicants", "group_by": [{"column": "City", "bucket": "month"}]},
+    {"dataset": "applicants", "aggregates": [{"fn": "quantile", "column": "days_to_start", "q": 2}]},
+    {"dataset": "applicants", "limit": 0},
+    {"dataset": "applicants", "order_by": ["City"]},
+])
+def test_invalid_queries_are_rejected(applicants, payload):
+    with pytest.raises(InvalidQuery):
+        parse_spec(payload, {"applicants": applicants})
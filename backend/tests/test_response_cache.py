@@ -0,0 +1,114 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from response_cache import ResponseCache, etag_matches
+
+
+class FailingRedis:
+    def hmget(self, *args):
+        raise ConnectionError("redis down")
+
+    def pipeline(self):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+def served():
+    """An app whose /api/data response changes with the data it reads"""
+    cache = ResponseCache(["/api/"], ttl_seconds=60)
+    state = {"value": 1, "calls": 0}
+    app = FastAPI()
+    app.middleware("http")(cache.middleware)
+
+    @app.get("/api/data")
+    def data(limit: int = 10):
+        state["calls"] += 1
+        return {"value": state["value"], "limit": limit}
+
+    @app.get("/health")
+    def health():
+        state["calls"] += 1
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        yield client, cache, state
+
+
+def test_repeat_get_is_served_from_the_cache(served):
+    client, cache, state = served
+    first = client.get("/api/data")
+    second = client.get("/api/data")
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert second.json() == first.json() and state["calls"] == 1
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_query_parameters_are_part_of_the_key(served):
+    client, cache, state = served
+    assert client.get("/api/data?limit=5").json()["limit"] == 5
+    assert client.get("/api/data?limit=6").json()["limit"] == 6
+    assert state["calls"] == 2
+
+
+def test_new_version_invalidates_cached_responses(served):
+    client, cache, state = served
+    before = client.get("/api/data")
+    state["value"] = 2
+    # Stale until the data version moves on
+    assert client.get("/api/data").json()["value"] == 1
+
+    cache.set_version("1-abc")
+    after = client.get("/api/data")
+    assert after.headers["x-cache"] == "MISS"
+    assert after.json()["value"] == 2
+    assert after.headers["etag"] != before.headers["etag"]
+    assert cache.describe()["local_entries"] == 1
+
+
+def test_response_computed_across_a_version_change_is_not_stored(served):
+    client, cache, state = served
+
+    @client.app.get("/api/slow")
+    def slow():
+        # The data is reloaded while this response is being computed
+        cache.set_version("reloaded")
+        return {"value": state["value"]}
+
+    assert client.get("/api/slow").headers["x-cache"] == "MISS"
+    assert client.get("/api/slow").headers["x-cache"] == "MISS"
+
+
+def test_if_none_match_returns_304_until_the_body_changes(served):
+    client, cache, state = served
+    etag = client.get("/api/data").headers["etag"]
+    revalidated = client.get("/api/data", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+
+    state["value"] = 3
+    cache.set_version("2")
+    changed = client.get("/api/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["value"] == 3
+
+
+def test_uncacheable_paths_bypass_the_cache(served):
+    client, cache, state = served
+    client.get("/health")
+    assert "x-cache" not in client.get("/health").headers
+    assert state["calls"] == 2
+
+
+def test_failing_redis_falls_back_to_the_local_tier(served):
+    client, cache, state = served
+    cache.attach_redis(FailingRedis())
+    assert client.get("/api/data").status_code == 200
+    assert client.get("/api/data").headers["x-cache"] == "HIT"
+    assert cache.stats["redis_errors"] == 1
+    assert cache.describe()["redis"] is False
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('*', '"c"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from sketches import SKETCH_DEFINITIONS, CountMinSketch, DatasetSketches, HyperLogLog, KLLSketch, build_sketches
+
+QS = [0.1, 0.5, 0.9, 0.99]
+# Rank error allowed on top of the sketch's ~1.5%
+RANK_TOLERANCE = 0.03
+
+
+def rank_of(values, estimate):
+    return np.searchsorted(np.sort(values), estimate, side='right') / len(values)
+
+
+def assert_quantiles_close(values, sketch):
+    for q, estimate in zip(QS, sketch.quantiles(QS)):
+        assert abs(rank_of(values, estimate) - q) <= RANK_TOLERANCE
+
+
+def make_applicants(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'State': rng.choice(['CA', 'NY', 'TX', 'WA'], size=rows, p=[0.4, 0.3, 0.2, 0.1]),
+        'City': [f"city{i}" for i in rng.integers(0, 3000, size=rows)],
+        'Workflow Type': rng.choice(['Standard', 'Express', 'Youth'], size=rows, p=[0.7, 0.2, 0.1]),
+        'days_to_start': rng.exponential(30, size=rows).round(),
+        'days_to_inactive': rng.exponential(300, size=rows).round(),
+    })
+
+
+def test_kll_quantiles_within_rank_error():
+    values = np.random.default_rng(1).lognormal(3, 1, size=100_000)
+    sketch = KLLSketch()
+    for batch in np.array_split(values, 37):
+        sketch.update(batch)
+    assert sketch.n == len(values)
+    assert sketch.retained() < 2_000
+    assert_quantiles_close(values, sketch)
+
+
+def test_kll_merge_matches_concatenated_data():
+    rng = np.random.default_rng(2)
+    left, right = rng.normal(0, 1, size=40_000), rng.normal(5, 2, size=60_000)
+    merged = KLLSketch(seed=1)
+    merged.update(left)
+    other = KLLSketch(seed=2)
+    other.update(right)
+    merged.merge(other)
+
+    both = np.concatenate([left, right])
+    assert merged.n == len(both)
+    assert (merged.min, merged.max) == (both.min(), both.max())
+    assert_quantiles_close(both, merged)
+
+
+def test_kll_serialization_round_trip():
+    sketch = KLLSketch()
+    sketch.update(np.arange(10_000, dtype=float))
+    restored = KLLSketch.from_dict(sketch.to_dict())
+    assert restored.n == sketch.n
+    assert restored.quantiles(QS) == sketch.quantiles(QS)
+    assert KLLSketch.from_dict(KLLSketch().to_dict()).quantiles([0.5]) == [None]
+
+
+def test_hyperloglog_estimate_and_merge():
+    hashes = pd.util.hash_array(np.arange(50_000).astype(str).astype(object))
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update_hashes(hashes[:30_000])
+    # Overlapping halves: the union has 50k distinct values, not 60k
+    right.update_hashes(hashes[20_000:])
+    assert abs(left.estimate() - 30_000) / 30_000 < 0.05
+    assert abs(left.merge(right).estimate() - 50_000) / 50_000 < 0.05
+
+
+def test_hyperloglog_small_cardinality_is_exact_enough():
+    sketch = HyperLogLog()
+    sketch.update_hashes(pd.util.hash_array(np.array(['a', 'b', 'c', 'a'], dtype=object)))
+    assert sketch.estimate() == 3
+
+
+def test_count_min_top_values_and_merge():
+    rng = np.random.default_rng(3)
+    values = pd.Series(rng.choice(['heavy', 'medium', *[f"rare{i}" for i in range(500)]], size=20_000,
+                                  p=[0.3, 0.1, *[0.6 / 500] * 500]))
+    left, right = CountMinSketch(), CountMinSketch()
+    left.update(values[:8_000])
+    right.update(values[8_000:])
+    top = left.merge(right).top(2)
+
+    exact = values.value_counts()
+    assert [item["value"] for item in top] == ['heavy', 'medium']
+    # Count-min never undercounts
+    for item in top:
+        assert item["count"] >= exact[item["value"]]
+        assert item["count"] - exact[item["value"]] < 0.01 * len(values)
+
+
+def test_dataset_sketches_merge_matches_single_pass():
+    df = make_applicants(20_000)
+    whole = DatasetSketches('applicants', SKETCH_DEFINITIONS['applicants'])
+    whole.update_frame(df)
+    first = DatasetSketches('applicants', SKETCH_DEFINITIONS['applicants'])
+    first.update_frame(df.iloc[:7_000])
+    second = DatasetSketches('applicants', SKETCH_DEFINITIONS['applicants'])
+    second.update_frame(df.iloc[7_000:].reset_index(drop=True))
+    merged = first.merge(second)
+
+    assert merged.rows == len(df)
+    assert merged.groups() == whole.groups() == ['CA', 'NY', 'TX', 'WA']
+    for state in ['CA', 'TX']:
+        result = merged.quantiles('days_to_start', QS, groups=[state])
+        values = df.loc[df['State'] == state, 'days_to_start'].to_numpy()
+        assert result["count"] == len(values)
+        for q in QS:
+            assert abs(rank_of(values, result[f"p{q * 100:g}"]) - q) <= RANK_TOLERANCE
+    assert abs(merged.distinct('City') - df['City'].nunique()) / df['City'].nunique() < 0.05
+    assert merged.top('State', 1) == whole.top('State', 1)
+
+
+def test_dataset_sketches_serialization_round_trip():
+    sketches = DatasetSketches('applicants', SKETCH_DEFINITIONS['applicants'])
+    sketches.update_frame(make_applicants(5_000))
+    restored = DatasetSketches.from_dict(sketches.to_dict())
+    assert restored.summary() == sketches.summary()
+
+
+def test_build_sketches_folds_in_only_appended_rows():
+    df = make_applicants(12_000)
+    previous = build_sketches({'applicants': df.iloc[:9_000]}, {}, {})
+    appended = build_sketches({'applicants': df}, {'applicants': 'appended'}, previous)
+    rebuilt = build_sketches({'applicants': df}, {}, {})
+
+    # The previous version's sketches are left untouched for readers
+    assert previous['applicants'].rows == 9_000
+    assert appended['applicants'].rows == rebuilt['applicants'].rows == len(df)
+    assert appended['applicants'].quantiles('days_to_start')["count"] == len(df)
+    assert appended['applicants'].top('Workflow Type') == rebuilt['applicants'].top('Workflow Type')
+
+    reused = build_sketches({'applicants': df}, {'applicants': 'reused'}, appended)
+    assert reused['applicants'] is appended['applicants']
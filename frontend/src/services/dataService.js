@@ -247,8 +247,33 @@ class DataService {
     return data;
   }
 
-  // Get dashboard metrics
+  // Get dashboard metrics, precomputed by the backend when it is reachable
   async getDashboardMetrics() {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/dashboard/metrics`);
+      if (response.ok) {
+        const { metrics } = await response.json();
+        return {
+          totalVolunteers: metrics.total_volunteers,
+          totalApplicants: metrics.total_applicants,
+          activeVolunteers: metrics.active_volunteers,
+          conversionRate: Number(metrics.conversion_rate).toFixed(1),
+          geographicCoverage: metrics.geographic_coverage,
+          avgDaysToStart: Number(metrics.avg_days_to_start).toFixed(1),
+          totalDonors: metrics.total_donors,
+          totalDonations: metrics.total_donations,
+          avgDonationAmount: Number(metrics.avg_donation_amount).toFixed(2),
+          topDonationAmount: metrics.top_donation_amount,
+          totalBloodDrives: metrics.total_blood_drives,
+          totalProductsCollected: metrics.total_products_collected,
+          avgProductsPerDrive: Number(metrics.avg_products_per_drive).toFixed(1),
+          completedDrives: metrics.completed_drives
+        };
+      }
+    } catch (error) {
+      console.warn('Backend metrics unavailable, computing from CSV files:', error);
+    }
+
     const [volunteers, applicants, donors, biomed] = await Promise.all([
       this.getVolunteerData(),
       this.getApplicantData(),
@@ -275,7 +300,7 @@ class DataService {
       activeVolunteers: volunteers.filter(v => v['Current Status'] === 'General Volunteer').length,
       conversionRate: ((volunteers.length / applicants.length) * 100).toFixed(1),
       geographicCoverage: new Set(volunteers.map(v => v.State).filter(Boolean)).size,
-      avgDaysToStart: this.calculateAverageDays(applicants, 'Days To Vol Start'),
+      avgDaysToStart: this.calculateAverageDays(applicants, 'Application Dt', 'Vol Start Dt'),
       
       // Donor metrics
       totalDonors: donors.length,
@@ -291,11 +316,11 @@ class DataService {
     };
   }
 
-  // Calculate average days for a field
-  calculateAverageDays(data, field) {
+  // Calculate average days between two date fields, as the backend does
+  calculateAverageDays(data, fromField, toField) {
     const days = data
-      .map(item => parseInt(item[field]))
-      .filter(d => !isNaN(d) && d > 0);
+      .map(item => Math.round((new Date(item[toField]) - new Date(item[fromField])) / 86400000))
+      .filter(d => !isNaN(d));
     
     return days.length > 0 ? (days.reduce((a, b) => a + b, 0) / days.length).toFixed(1) : 0;
   }